@@ -0,0 +1,86 @@
+"""Async read endpoints for high fan-out storefront lookups.
+
+These are plain Django async views on the async ORM (DRF views are
+sync-only), so under ``config.asgi`` many concurrent lookups share one
+event loop instead of holding a worker thread each. Authentication
+accepts the API's ``Authorization: Token <key>`` header or a session.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+
+from apps.inventory.models import StockBalance
+from apps.inventory.scan import ascan
+
+MAX_PRODUCTS = 500
+
+
+async def _authenticate(request):
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword == 'Token' and key.strip():
+        token = await Token.objects.select_related('user').filter(key=key.strip()).afirst()
+        user = token.user if token is not None else None
+    else:
+        user = await sync_to_async(get_user)(request)
+    if user is None or not user.is_authenticated or not user.is_active:
+        return None
+    return user
+
+
+def _error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _ids(values):
+    return [int(value) for value in values]
+
+
+async def availability(request):
+    """On-hand/reserved/available per warehouse.
+
+    ``?product=<id>`` and/or ``?sku=<sku>`` (repeatable) select products;
+    ``?warehouse=<id>`` narrows the warehouses.
+    """
+    if request.method != 'GET':
+        return _error('Method not allowed.', 405)
+    user = await _authenticate(request)
+    if user is None:
+        return _error('Authentication credentials were not provided.', 401)
+
+    try:
+        product_ids = _ids(request.GET.getlist('product'))
+        warehouse_ids = _ids(request.GET.getlist('warehouse'))
+    except ValueError:
+        return _error('product and warehouse must be integer ids.', 400)
+    skus = request.GET.getlist('sku')
+    if not product_ids and not skus:
+        return _error('Pass at least one product or sku.', 400)
+    if len(product_ids) + len(skus) > MAX_PRODUCTS:
+        return _error(f'At most {MAX_PRODUCTS} products per request.', 400)
+
+    balances = StockBalance.objects.filter(company_id=user.company_id)
+    if product_ids:
+        balances = balances.filter(product_id__in=product_ids)
+    if skus:
+        balances = balances.filter(product__sku__in=skus)
+    if warehouse_ids:
+        balances = balances.filter(warehouse_id__in=warehouse_ids)
+    rows = balances.values(
+        'product_id', 'warehouse_id', 'on_hand', 'reserved', 'available'
+    ).order_by('product_id', 'warehouse_id')
+    return JsonResponse({'results': [row async for row in rows]})
+
+
+async def product_lookup(request, code):
+    """Async twin of ``ScanView``: product and stock per location for a barcode or SKU."""
+    if request.method != 'GET':
+        return _error('Method not allowed.', 405)
+    user = await _authenticate(request)
+    if user is None:
+        return _error('Authentication credentials were not provided.', 401)
+
+    result = await ascan(user.company_id, code)
+    if result is None:
+        return _error(f'No product for code {code}', 404)
+    return JsonResponse(result)
@@ -0,0 +1,247 @@
+"""Bulk create/update for API collections.
+
+``POST <collection>/bulk/`` with a JSON array creates rows, ``PATCH``
+with objects carrying ``id`` updates them. Every model referenced by the
+payload is fetched with one query, items are validated by the viewset's
+serializer without further queries and rows are written with
+``bulk_create``/``bulk_update`` in one transaction.
+
+``?mode=atomic`` (default) writes nothing if any item fails;
+``?mode=partial`` writes the valid items and reports the rest.
+"""
+import copy
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+BULK_MODES = ('atomic', 'partial')
+
+
+class PreloadedRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves primary keys against objects fetched once for the whole payload."""
+
+    def __init__(self, objects, **kwargs):
+        self.objects = objects
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def _ids(items, name):
+    ids = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            ids.add(int(item[name]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return ids
+
+
+def _key_value(model, attrs, instance, name):
+    field = model._meta.get_field(name)
+    if name in attrs:
+        value = attrs[name]
+    elif instance is not None:
+        return getattr(instance, field.attname)
+    else:
+        value = field.get_default()
+    return value.pk if field.is_relation and value is not None else value
+
+
+class BulkWriteMixin:
+    """Adds ``<collection>/bulk/`` to a ``CompanyScopedViewSet``.
+
+    ``bulk_scopes`` maps a relation (model field name) to the lookup that
+    ties the related model to the user's company; ``bulk_unique`` lists the
+    field tuples that must stay unique, checked with one query each.
+    ``after_bulk_write`` receives ``(before, after)`` pairs inside the
+    transaction, ``before`` being ``None`` for created rows.
+    """
+    bulk_scopes = {}
+    bulk_unique = ()
+
+    def get_bulk_queryset(self):
+        return self.scope(self.get_serializer_class().Meta.model.objects.all())
+
+    def after_bulk_write(self, changes):
+        pass
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        limit = getattr(settings, 'BULK_MAX_ITEMS', 5000)
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty JSON array.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > limit:
+            return Response(
+                {'detail': f'At most {limit} items per request, got {len(items)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        mode = request.query_params.get('mode', 'atomic')
+        if mode not in BULK_MODES:
+            return Response(
+                {'detail': f'mode must be one of: {", ".join(BULK_MODES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        updating = request.method == 'PATCH'
+        serializer = self._bulk_serializer(items, partial=updating)
+        model = serializer.Meta.model
+
+        try:
+            # Rows being updated are locked from validation until the write,
+            # so concurrent writers cannot change them in between
+            with transaction.atomic():
+                instances = self._bulk_instances(items) if updating else {}
+                rows, errors = self._bulk_validate(serializer, model, items, instances, updating)
+                if (errors and mode == 'atomic') or not rows:
+                    return Response(
+                        self._bulk_report(mode, len(items), [], errors, updating),
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                written = self._bulk_write(model, rows, updating)
+        except IntegrityError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+
+        code = status.HTTP_200_OK if updating or errors else status.HTTP_201_CREATED
+        return Response(self._bulk_report(mode, len(items), written, errors, updating), status=code)
+
+    def _bulk_instances(self, items):
+        """The rows addressed by a PATCH, locked in primary key order."""
+        queryset = self.get_bulk_queryset().select_for_update(of=('self',)).filter(
+            pk__in=_ids(items, 'id')
+        ).order_by('pk')
+        return {instance.pk: instance for instance in queryset}
+
+    def _bulk_validate(self, serializer, model, items, instances, updating):
+        errors = {}
+        rows = []
+        for index, item in enumerate(items):
+            instance = None
+            if updating:
+                pk = item.get('id') if isinstance(item, dict) else None
+                try:
+                    instance = instances.get(int(pk))
+                except (TypeError, ValueError):
+                    pass
+                if instance is None:
+                    errors[index] = {'id': [f'Unknown id: {pk}']}
+                    continue
+            try:
+                attrs = serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+                continue
+            rows.append((index, attrs, instance))
+
+        errors.update(self._unique_errors(model, rows))
+        return [row for row in rows if row[0] not in errors], errors
+
+    def _bulk_serializer(self, items, partial):
+        serializer = self.get_serializer_class()(context=self.get_serializer_context(), partial=partial)
+        fields = serializer.fields
+        if self.company_field == 'company':
+            fields.pop('company', None)
+        company_id = self.request.user.company_id
+
+        for name, field in list(fields.items()):
+            # Uniqueness is checked for the whole payload in _unique_errors
+            field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+            if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+            queryset = field.get_queryset().model._default_manager.all()
+            if field.source in self.bulk_scopes:
+                queryset = queryset.filter(**{self.bulk_scopes[field.source]: company_id})
+            kwargs = {key: value for key, value in field._kwargs.items() if key != 'queryset'}
+            fields[name] = PreloadedRelatedField(
+                queryset.in_bulk(_ids(items, name)),
+                queryset=queryset.none(),
+                **kwargs
+            )
+        serializer.validators = []
+        return serializer
+
+    def _unique_errors(self, model, rows):
+        errors = {}
+        for names in self.bulk_unique:
+            keys = {}
+            for index, attrs, instance in rows:
+                key = tuple(_key_value(model, attrs, instance, name) for name in names)
+                if key in keys:
+                    errors[index] = {names[0]: [f'Duplicate {", ".join(names)} in this request.']}
+                else:
+                    keys[key] = (index, instance)
+            if not keys:
+                continue
+
+            attnames = [model._meta.get_field(name).attname for name in names]
+            existing = model._default_manager.filter(**{
+                f'{attname}__in': {key[position] for key in keys}
+                for position, attname in enumerate(attnames)
+            }).values_list('pk', *attnames)
+            for pk, *values in existing:
+                index, instance = keys.get(tuple(values), (None, None))
+                if index is not None and (instance is None or instance.pk != pk):
+                    errors[index] = {names[0]: [f'{model._meta.verbose_name} with this {", ".join(names)} already exists.']}
+        return errors
+
+    def _bulk_write(self, model, rows, updating):
+        changes = []
+        if updating:
+            now = timezone.now()
+            auto_now = [
+                field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+            ]
+            changed = set(auto_now)
+            for index, attrs, instance in rows:
+                before = copy.copy(instance)
+                for name, value in attrs.items():
+                    setattr(instance, name, value)
+                for name in auto_now:
+                    setattr(instance, name, now)
+                changed.update(attrs)
+                changes.append((before, instance))
+            model._default_manager.bulk_update(
+                [instance for _, _, instance in rows], sorted(changed), batch_size=1000
+            )
+        else:
+            company = self.request.user.company if self.company_field == 'company' else None
+            for index, attrs, _ in rows:
+                instance = model(**attrs)
+                if company is not None:
+                    instance.company = company
+                changes.append((None, instance))
+            model._default_manager.bulk_create([after for _, after in changes], batch_size=1000)
+
+        self.after_bulk_write(changes)
+        return [(index, after) for (index, _, _), (_, after) in zip(rows, changes)]
+
+    def _bulk_report(self, mode, total, written, errors, updating):
+        outcome = 'updated' if updating else 'created'
+        results = [{'index': index, 'status': outcome, 'id': instance.pk} for index, instance in written]
+        results.extend(
+            {'index': index, 'status': 'error', 'errors': detail} for index, detail in errors.items()
+        )
+        results.sort(key=lambda result: result['index'])
+        return {
+            'mode': mode,
+            'total': total,
+            outcome: len(written),
+            'failed': len(errors),
+            'results': results,
+        }
@@ -0,0 +1,64 @@
+"""ETag / Last-Modified for API list and retrieve actions.
+
+Validators are aggregated over the same filtered queryset the action
+serves (unused annotations and prefetches are dropped from the aggregate)
+plus the viewset's ``conditional_related`` sources, so a 304 costs one
+small query per source and never reaches the serializer.
+"""
+from apps.inventory.conditional import Fingerprint, not_modified, set_validators, validators
+
+
+class ConditionalGetMixin:
+    """``conditional_related`` maps to callables ``(view, pk)`` returning
+    querysets with ``updated_at`` that also feed the response; ``pk`` is
+    ``None`` for ``list``.
+
+    ``conditional_nested`` (keyed by serializer field, applied only when the
+    serializer emits it) maps to callables taking the served queryset and
+    returning its nested rows that have no ``updated_at``. A retrieve
+    fingerprints them; a list that emits them is served without validators,
+    as hashing every nested row of every match would cost more than the
+    response.
+    """
+    conditional_related = ()
+    conditional_nested = {}
+
+    def conditional_querysets(self, pk=None):
+        queryset = self.get_queryset()
+        if pk is None:
+            queryset = self.filter_queryset(queryset)
+        else:
+            queryset = queryset.filter(pk=pk)
+        names = set(self.get_serializer().fields) if self.conditional_nested else set()
+        nested = [rows for name, rows in self.conditional_nested.items() if name in names]
+        if nested and pk is None:
+            return None
+        return (
+            [queryset] +
+            [related(self, pk) for related in self.conditional_related] +
+            [Fingerprint(rows(queryset)) for rows in nested]
+        )
+
+    def _conditional(self, request, lookup, handler, *args, **kwargs):
+        querysets = self.conditional_querysets(lookup)
+        if querysets is None:
+            return handler(request, *args, **kwargs)
+        salt = '|'.join([
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(getattr(request.user, 'company_id', None)),
+        ])
+        etag, last_modified, rows = validators(querysets, salt=salt)
+        if lookup is not None and not rows:
+            return handler(request, *args, **kwargs)  # 404 as usual
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return set_validators(handler(request, *args, **kwargs), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, None, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self._conditional(request, lookup, super().retrieve, *args, **kwargs)
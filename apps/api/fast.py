@@ -0,0 +1,76 @@
+"""``values()``-based serialization for read-only list actions.
+
+``ModelSerializer(many=True)`` builds a model instance and runs every
+field per row. For serializers whose fields are plain columns, related
+columns (``product.name``) or annotations, ``fast_plan`` maps each field
+to a ``values()`` path and ``fast_rows`` converts the resulting dicts
+with the same fields' ``to_representation``, so the output is identical.
+Anything that needs an instance (nested serializers, method fields,
+model methods) makes the plan ``None`` and the view falls back to the
+serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+def _path(model, parts, annotations):
+    """The ``values()`` path for a serializer source, or ``None``."""
+    if len(parts) == 1 and parts[0] in annotations:
+        return parts[0]
+    current = model
+    for position, part in enumerate(parts):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if field.one_to_many or field.many_to_many or not field.concrete:
+            return None
+        last = position == len(parts) - 1
+        if field.is_relation and not last:
+            current = field.related_model
+        elif not last:
+            return None
+    return '__'.join(parts)
+
+
+def fast_plan(serializer, model, annotations=()):
+    """``[(field name, values() path, to_representation or None)]`` or ``None``."""
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, (serializers.BaseSerializer, ManyRelatedField, serializers.SerializerMethodField)):
+            return None
+        if field.source == '*':
+            return None
+        if isinstance(field, RelatedField):
+            # A foreign key renders as its raw id
+            if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                return None
+            represent = None
+        else:
+            represent = field.to_representation
+        path = _path(model, field.source.split('.'), annotations)
+        if path is None:
+            return None
+        plan.append((name, path, represent))
+    return plan
+
+
+def fast_values(queryset, plan):
+    """``queryset`` as dicts holding every path the plan reads, plus the pk."""
+    paths = {path for _, path, _ in plan}
+    paths.add(queryset.model._meta.pk.attname)
+    return queryset.values(*paths)
+
+
+def fast_rows(rows, plan):
+    result = []
+    for row in rows:
+        item = {}
+        for name, path, represent in plan:
+            value = row[path]
+            item[name] = value if value is None or represent is None else represent(value)
+        result.append(item)
+    return result
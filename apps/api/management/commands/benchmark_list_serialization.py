@@ -0,0 +1,70 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.api.views import InventoryViewSet, ProductViewSet
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.inventory.services import rebuild_stock_balances
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows/second of the serializer and values() list paths on '
+        '/api/inventory/ and /api/products/ and check their output is identical '
+        '(data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        mismatches = []
+        try:
+            with transaction.atomic():
+                user = self._seed(options['rows'])
+                self.stdout.write(f'{"endpoint":<12} {"serializer rows/s":>18} {"values() rows/s":>16} {"speedup":>8}')
+                for prefix, viewset in (('inventory', InventoryViewSet), ('products', ProductViewSet)):
+                    slow, slow_content, rows = self._measure(viewset, prefix, user, options, fast=False)
+                    fast, fast_content, _ = self._measure(viewset, prefix, user, options, fast=True)
+                    if slow_content != fast_content:
+                        mismatches.append(prefix)
+                    self.stdout.write(
+                        f'{prefix:<12} {rows / slow:>18,.0f} {rows / fast:>16,.0f} {slow / fast:>7.1f}x'
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+        if mismatches:
+            raise CommandError(f'values() output differs from the serializer for: {", ".join(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('values() output matches the serializers'))
+
+    def _seed(self, rows):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=10)
+        products = seed_products(company, rows)
+        seed_stock(products, locations, quantity=Decimal('7.5'))
+        rebuild_stock_balances(company)
+        return user
+
+    def _measure(self, viewset, prefix, user, options, fast):
+        view = viewset.as_view({'get': 'list'}, fast_list=fast)
+        best = None
+        for _ in range(options['repeat']):
+            request = APIRequestFactory().get(f'/api/{prefix}/', {'page_size': options['page_size']})
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        if response.status_code != 200:
+            raise CommandError(f'{prefix} returned {response.status_code}: {response.content[:200]}')
+        return best, response.content, len(response.data['results'])
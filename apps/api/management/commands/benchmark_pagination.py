@@ -0,0 +1,75 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.api.pagination import HybridPagination
+from apps.api.views import InventoryViewSet
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare page-N latency of page-number and cursor pagination on /api/inventory/ (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--pages', nargs='+', type=int, default=[1, 10, 100, 1000, 2000])
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=50)
+        products = seed_products(company, options['rows'])
+        seed_stock(products, locations)
+
+        factory = APIRequestFactory()
+        view = InventoryViewSet(action='list', format_kwarg=None, kwargs={})
+        view.request = Request(factory.get('/api/inventory/'))
+        view.request.user = user
+        queryset = view.get_queryset()
+        size = options['page_size']
+        pages = sorted(page for page in options['pages'] if (page - 1) * size < options['rows'])
+
+        offset_times = {}
+        for page in pages:
+            request = Request(factory.get('/api/inventory/', {'page': page, 'page_size': size}))
+            started = time.perf_counter()
+            list(HybridPagination().paginate_queryset(queryset, request, view))
+            offset_times[page] = time.perf_counter() - started
+
+        # Walk with cursors, timing the sampled pages only
+        cursor_times = {}
+        params = {'pagination': 'cursor', 'page_size': size}
+        for page in range(1, pages[-1] + 1):
+            paginator = HybridPagination()
+            request = Request(factory.get('/api/inventory/', params))
+            started = time.perf_counter()
+            list(paginator.paginate_queryset(queryset, request, view))
+            elapsed = time.perf_counter() - started
+            if page in offset_times:
+                cursor_times[page] = elapsed
+            next_link = paginator.keyset.get_next_link()
+            if next_link is None:
+                break
+            params = {'cursor': parse_qs(urlparse(next_link).query)['cursor'][0], 'page_size': size}
+
+        self.stdout.write(f'{"page":>8} {"page-number ms":>16} {"cursor ms":>12}')
+        for page in pages:
+            cursor = cursor_times.get(page)
+            self.stdout.write(
+                f'{page:>8} {offset_times[page] * 1000:>16.2f} '
+                f'{"-" if cursor is None else f"{cursor * 1000:.2f}":>12}'
+            )
@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent GETs at running servers and compare throughput, e.g. '
+        '--target wsgi=http://127.0.0.1:8000/api/scan/SKU-1/ '
+        '--target asgi=http://127.0.0.1:8001/api/async/products/SKU-1/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='name=URL (repeatable); plain http only'
+        )
+        parser.add_argument('--token', help='API token sent as "Authorization: Token <key>"')
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, _, url = target.partition('=')
+            parts = urlsplit(url)
+            if not url or parts.scheme != 'http':
+                raise CommandError(f'Expected name=http://host:port/path, got {target!r}')
+            path = parts.path + (f'?{parts.query}' if parts.query else '')
+            targets.append((name, parts.hostname, parts.port or 80, path))
+
+        self.stdout.write(
+            f'{"target":<12} {"req/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"errors":>8}'
+        )
+        for name, host, port, path in targets:
+            elapsed, latencies, errors = asyncio.run(self._run(host, port, path, options))
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+            self.stdout.write(
+                f'{name:<12} {options["requests"] / elapsed:>10.1f} '
+                f'{(statistics.median(latencies) if latencies else 0) * 1000:>9.1f} '
+                f'{p95 * 1000:>9.1f} {errors:>8}'
+            )
+
+    async def _run(self, host, port, path, options):
+        headers = f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n'
+        if options['token']:
+            headers += f'Authorization: Token {options["token"]}\r\n'
+        payload = (headers + '\r\n').encode()
+
+        remaining = options['requests']
+        latencies = []
+        errors = 0
+
+        async def fetch():
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status_line = await reader.readline()
+                await reader.read()
+                return int(status_line.split()[1])
+            finally:
+                writer.close()
+                await writer.wait_closed()
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(fetch(), options['timeout'])
+                except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                    status = None
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return time.perf_counter() - started, latencies, errors
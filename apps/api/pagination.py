@@ -0,0 +1,48 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination over the view's ``cursor_ordering``.
+
+    The ordering must be unique and indexed (normally the primary key),
+    so every page is an index range scan with no COUNT(*) and no OFFSET.
+    Client ``?ordering=`` is ignored in this mode.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', '-id')
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class HybridPagination(PageNumberPagination):
+    """Page numbers by default; keyset pagination when the client opts in.
+
+    Send ``?pagination=cursor`` for the first page and then follow the
+    ``next``/``previous`` links, which carry ``?cursor=``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def __init__(self):
+        self.keyset = None
+
+    def use_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
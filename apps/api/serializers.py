@@ -1,7 +1,7 @@
 # apps/api/serializers.py
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Sum
 
 # Import models using absolute paths
 from apps.inventory.models import (
@@ -24,16 +24,18 @@ from apps.orders.models import (
     Shipment,
     ShipmentItem
 )
+from apps.orders.credit import CreditLimitError, check_credit, check_order_credit, credit_increase
+from apps.api.shaping import DynamicFieldsMixin
 
 
 # ====================== Inventory Serializers ======================
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = ['id', 'name', 'parent', 'description', 'is_active']
 
 
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     warehouse_name = serializers.CharField(source='warehouse.name', read_only=True)
 
     class Meta:
@@ -44,7 +46,7 @@ class LocationSerializer(serializers.ModelSerializer):
         ]
 
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     location_name = serializers.CharField(source='location.name', read_only=True)
@@ -56,18 +58,40 @@ class InventorySerializer(serializers.ModelSerializer):
             'location', 'location_name', 'quantity', 'reserved',
             'batch', 'expiry_date', 'last_counted'
         ]
+        # Owned by the reservation engine (apps.orders.reservations)
+        read_only_fields = ['reserved']
 
 
 # ====================== Product Serializers ======================
-class ProductSerializer(serializers.ModelSerializer):
+class ProductListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    in_stock = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    expandable_fields = {
+        'category': (ProductCategorySerializer, {'read_only': True}),
+        'stock': (InventorySerializer, {'source': 'inventory', 'many': True, 'read_only': True}),
+    }
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'sku', 'barcode', 'category', 'category_name',
+            'unit', 'selling_price', 'min_stock', 'is_active', 'in_stock',
+            'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category = ProductCategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=ProductCategory.objects.all(),
         source='category',
         write_only=True
     )
-    in_stock = serializers.SerializerMethodField()
-    supplier_name = serializers.CharField(source='supplier.name', read_only=True)
+    # Annotated by ProductViewSet.get_queryset
+    in_stock = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    stock = InventorySerializer(source='inventory', many=True, read_only=True)
 
     class Meta:
         model = Product
@@ -75,16 +99,11 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'sku', 'barcode', 'category', 'category_id',
             'unit', 'description', 'purchase_price', 'selling_price',
             'tax_rate', 'min_stock', 'max_stock', 'weight', 'volume',
-            'is_active', 'created_at', 'updated_at', 'in_stock',
-            'supplier', 'supplier_name', 'company'
+            'is_active', 'created_at', 'updated_at', 'in_stock', 'stock',
+            'company'
         ]
         read_only_fields = ['created_at', 'updated_at', 'in_stock']
 
-    def get_in_stock(self, obj):
-        return Inventory.objects.filter(product=obj).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-
     def validate_purchase_price(self, value):
         if value < 0:
             raise serializers.ValidationError("Purchase price cannot be negative")
@@ -97,10 +116,27 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 # ====================== Warehouse Serializers ======================
-class WarehouseSerializer(serializers.ModelSerializer):
+class WarehouseListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    total_items = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    expandable_fields = {
+        'locations': (LocationSerializer, {'many': True, 'read_only': True}),
+    }
+
+    class Meta:
+        model = Warehouse
+        fields = [
+            'id', 'company', 'name', 'code', 'type', 'is_active',
+            'updated_at', 'total_items'
+        ]
+        read_only_fields = fields
+
+
+class WarehouseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     locations = LocationSerializer(many=True, read_only=True)
-    total_items = serializers.SerializerMethodField()
+    # Annotated by WarehouseViewSet.get_queryset
+    total_items = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Warehouse
@@ -112,24 +148,20 @@ class WarehouseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
 
-    def get_total_items(self, obj):
-        return Inventory.objects.filter(location__warehouse=obj).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
-
 
 # ====================== Customer/Supplier Serializers ======================
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = [
             'id', 'type', 'name', 'code', 'contact_person', 'phone',
             'email', 'address', 'tax_id', 'payment_terms', 'credit_limit',
-            'notes', 'is_active', 'company'
+            'credit_exposure', 'notes', 'is_active', 'company'
         ]
+        read_only_fields = ['credit_exposure']
 
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Supplier
         fields = [
@@ -140,7 +172,7 @@ class SupplierSerializer(serializers.ModelSerializer):
 
 
 # ====================== Purchase Order Serializers ======================
-class PurchaseOrderItemSerializer(serializers.ModelSerializer):
+class PurchaseOrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     location_name = serializers.CharField(source='location.name', read_only=True, allow_null=True)
@@ -154,11 +186,11 @@ class PurchaseOrderItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class PurchaseOrderSerializer(serializers.ModelSerializer):
+class PurchaseOrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = PurchaseOrderItemSerializer(many=True, read_only=True)
     supplier_name = serializers.CharField(source='supplier.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
-    total_amount = serializers.SerializerMethodField()
+    total_amount = serializers.DecimalField(source='gross_total', max_digits=14, decimal_places=2, read_only=True)
 
     class Meta:
         model = PurchaseOrder
@@ -166,18 +198,55 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
             'id', 'order_number', 'supplier', 'supplier_name', 'status',
             'order_date', 'expected_delivery', 'notes', 'created_by',
             'created_by_name', 'created_at', 'updated_at', 'items',
+            'net_total', 'tax_total', 'gross_total', 'line_count',
             'total_amount', 'company'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = [
+            'created_at', 'updated_at', 'net_total', 'tax_total', 'gross_total', 'line_count'
+        ]
+
+
+class PurchaseReceiveLineSerializer(serializers.Serializer):
+    item = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    batch = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    expiry_date = serializers.DateField(required=False, allow_null=True)
+    location = serializers.IntegerField(required=False, allow_null=True)
+
+
+class PurchaseReceiveSerializer(serializers.Serializer):
+    lines = PurchaseReceiveLineSerializer(many=True, required=False)
 
-    def get_total_amount(self, obj):
-        return obj.items.aggregate(
-            total=Sum('quantity') * Sum('unit_price')
-        )['total'] or 0
+
+class AvailabilityMatrixSerializer(serializers.Serializer):
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        max_length=5000
+    )
+    warehouses = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        required=False,
+        max_length=100
+    )
+
+
+class AtpQuerySerializer(serializers.Serializer):
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        max_length=1000
+    )
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+
+
+class StockAsOfQuerySerializer(serializers.Serializer):
+    products = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=5000)
+    warehouses = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=100)
 
 
 # ====================== Sales Order Serializers ======================
-class SalesOrderItemSerializer(serializers.ModelSerializer):
+class SalesOrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     location_name = serializers.CharField(source='location.name', read_only=True, allow_null=True)
@@ -186,7 +255,7 @@ class SalesOrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesOrderItem
         fields = [
-            'id', 'product', 'product_name', 'product_sku', 'quantity',
+            'id', 'order', 'product', 'product_name', 'product_sku', 'quantity',
             'unit_price', 'tax_rate', 'shipped', 'location', 'location_name',
             'notes', 'total_price'
         ]
@@ -195,31 +264,81 @@ class SalesOrderItemSerializer(serializers.ModelSerializer):
         return (obj.quantity * obj.unit_price) * (1 + obj.tax_rate / 100)
 
 
-class SalesOrderSerializer(serializers.ModelSerializer):
+class SalesOrderListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    total_amount = serializers.DecimalField(source='gross_total', max_digits=14, decimal_places=2, read_only=True)
+
+    expandable_fields = {
+        'items': (SalesOrderItemSerializer, {'many': True, 'read_only': True}),
+    }
+
+    class Meta:
+        model = SalesOrder
+        fields = [
+            'id', 'order_number', 'customer', 'customer_name', 'status',
+            'order_date', 'expected_shipment', 'carrier', 'updated_at', 'net_total',
+            'tax_total', 'gross_total', 'line_count', 'total_amount', 'company'
+        ]
+        read_only_fields = fields
+
+
+class SalesOrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = SalesOrderItemSerializer(many=True, read_only=True)
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
-    total_amount = serializers.SerializerMethodField()
+    total_amount = serializers.DecimalField(source='gross_total', max_digits=14, decimal_places=2, read_only=True)
 
     class Meta:
         model = SalesOrder
         fields = [
             'id', 'order_number', 'customer', 'customer_name', 'status',
-            'order_date', 'expected_shipment', 'shipping_address', 'notes',
+            'order_date', 'expected_shipment', 'shipping_address', 'carrier', 'notes',
             'created_by', 'created_by_name', 'created_at', 'updated_at',
-            'items', 'total_amount', 'company'
+            'items', 'net_total', 'tax_total', 'gross_total', 'line_count',
+            'total_amount', 'company'
+        ]
+        read_only_fields = [
+            'created_at', 'updated_at', 'net_total', 'tax_total', 'gross_total', 'line_count'
         ]
-        read_only_fields = ['created_at', 'updated_at']
 
-    def get_total_amount(self, obj):
-        return sum(
-            (item.quantity * item.unit_price) * (1 + item.tax_rate / 100)
-            for item in obj.items.all()
-        )
+    def validate(self, attrs):
+        self._check_credit(attrs)
+        return attrs
+
+    def save(self, **kwargs):
+        # validate() checked without a lock; repeat it with the customer locked
+        with transaction.atomic():
+            self._check_credit(self.validated_data, lock=True)
+            return super().save(**kwargs)
+
+    def _check_credit(self, attrs, lock=False):
+        order = self.instance or SalesOrder()
+        customer = attrs.get('customer') or (order.customer if order.pk else None)
+        if customer is None:
+            return
+        status = attrs.get('status', order.status)
+        try:
+            if lock:
+                check_order_credit(order, status, customer)
+            else:
+                check_credit(customer, credit_increase(order, status, customer))
+        except CreditLimitError as exc:
+            raise serializers.ValidationError({'status': str(exc)})
+
+
+class WavePlanSerializer(serializers.Serializer):
+    warehouse = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=100
+    )
+    carrier = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    cutoff = serializers.DateField(required=False)
+    max_orders = serializers.IntegerField(required=False, min_value=1, max_value=1000)
 
 
 # ====================== Shipment Serializers ======================
-class ShipmentItemSerializer(serializers.ModelSerializer):
+class ShipmentItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='order_item.product.name', read_only=True)
     product_sku = serializers.CharField(source='order_item.product.sku', read_only=True)
 
@@ -231,7 +350,7 @@ class ShipmentItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class ShipmentSerializer(serializers.ModelSerializer):
+class ShipmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = ShipmentItemSerializer(many=True, read_only=True)
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     customer_name = serializers.CharField(source='order.customer.name', read_only=True)
@@ -246,8 +365,16 @@ class ShipmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class ShipmentConfirmSerializer(serializers.Serializer):
+    shipments = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=10000
+    )
+
+
 # ====================== Transfer Serializers ======================
-class TransferItemSerializer(serializers.ModelSerializer):
+class TransferItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
 
@@ -256,7 +383,7 @@ class TransferItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_name', 'product_sku', 'quantity']
 
 
-class TransferSerializer(serializers.ModelSerializer):
+class TransferSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = TransferItemSerializer(many=True, read_only=True)
     from_warehouse_name = serializers.CharField(source='from_warehouse.name', read_only=True)
     to_warehouse_name = serializers.CharField(source='to_warehouse.name', read_only=True)
@@ -274,7 +401,7 @@ class TransferSerializer(serializers.ModelSerializer):
 
 
 # ====================== Stock Movement Serializer ======================
-class StockMovementSerializer(serializers.ModelSerializer):
+class StockMovementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     from_location_name = serializers.CharField(source='from_location.name', read_only=True, allow_null=True)
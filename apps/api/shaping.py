@@ -0,0 +1,96 @@
+"""``?fields=`` / ``?expand=`` support for serializers and viewset querysets.
+
+``?fields=id,name`` keeps only the listed serializer fields and
+``?expand=locations`` adds a relation from the serializer's
+``expandable_fields``. Both are honoured for GET requests only. Viewsets
+then derive ``only()``/``select_related()`` and the prefetches from the
+final field set, so relations the client did not ask for are never read.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def requested(request, param):
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    # name -> (serializer class, kwargs)
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+
+        expand = (requested(request, 'expand') or set()) & set(self.expandable_fields)
+        for name in expand:
+            serializer_class, options = self.expandable_fields[name]
+            self.fields[name] = serializer_class(**options)
+
+        only = requested(request, 'fields')
+        if only is not None:
+            for name in list(self.fields):
+                if name not in only and name not in expand:
+                    self.fields.pop(name)
+
+
+def only_plan(serializer, model, annotations=()):
+    """Return ``(select_related, only)`` covering the serializer's fields.
+
+    Returns ``None`` when a field depends on something that cannot be
+    derived from its source (methods, ``source='*'``); the caller then
+    leaves the queryset columns alone.
+    """
+    paths = {model._meta.pk.name}
+    related = set()
+    whole = set()
+
+    for name, field in serializer.fields.items():
+        if field.write_only or name in annotations:
+            continue
+        if isinstance(field, (ListSerializer, ManyRelatedField)):
+            continue  # reverse relations are prefetched
+        if field.source == '*':
+            return None
+
+        parts = field.source.split('.')
+        try:
+            model_field = model._meta.get_field(parts[0])
+        except FieldDoesNotExist:
+            return None
+        if model_field.one_to_many or model_field.many_to_many:
+            continue
+
+        if len(parts) == 1:
+            paths.add(parts[0])
+            if isinstance(field, BaseSerializer):
+                related.add(parts[0])
+                whole.add(parts[0])
+            continue
+
+        if not model_field.is_relation:
+            return None
+        related.add(parts[0])
+        try:
+            target = model_field.related_model._meta.get_field(parts[1])
+        except FieldDoesNotExist:
+            target = None
+        if len(parts) == 2 and target is not None and target.concrete:
+            paths.add(f'{parts[0]}__{parts[1]}')
+        else:
+            paths.add(parts[0])
+            whole.add(parts[0])
+
+    # A relation that is needed in full must not be narrowed by rel__field paths
+    paths = {
+        path for path in paths
+        if '__' not in path or path.split('__')[0] not in whole
+    }
+    return related, paths
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from rest_framework.test import APITestCase
+
+from apps.inventory.management.fixtures import seed_products, seed_stock, seed_tenant, seed_warehouse
+from apps.inventory.models import Inventory, Product, ProductCategory, Warehouse
+from apps.inventory.services import rebuild_stock_balances
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder, SalesOrderItem
+
+
+class QueryCountTests(APITestCase):
+    """Queries per endpoint and action stay flat however many rows are served.
+
+    Conditional endpoints (see ``apps.api.conditional``) spend one aggregate
+    per validator source before the action itself runs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        company, cls.user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=5)
+        seed_warehouse(company, locations=5)
+        products = seed_products(company, 30)
+        category = ProductCategory.objects.create(company=company, name='Bench')
+        Product.objects.filter(pk__in=[product.pk for product in products[::2]]).update(category=category)
+        seed_stock(products, locations, quantity=Decimal('10'))
+        seed_stock(products, locations[1:] + locations[:1], quantity=Decimal('5'))
+        rebuild_stock_balances(company)
+        customer = seed_customer(company)
+        seed_sales_orders(company, cls.user, customer, products, orders=25, lines=5)
+
+        cls.product = Product.objects.filter(company=company).first()
+        cls.warehouse = Warehouse.objects.filter(company=company).first()
+        cls.inventory = Inventory.objects.filter(product=cls.product).first()
+        cls.order = SalesOrder.objects.filter(company=company).first()
+        cls.order_item = SalesOrderItem.objects.filter(order=cls.order).first()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertQueries(self, num, url, **headers):
+        with self.assertNumQueries(num):
+            response = self.client.get(url, **headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def test_product_list(self):
+        # Validators: products, balances, categories; then count and page
+        self.assertQueries(5, '/api/products/')
+
+    def test_product_retrieve(self):
+        # Validators: product, balances, category, stock fingerprint; then product and stock
+        self.assertQueries(6, f'/api/products/{self.product.pk}/')
+
+    def test_product_list_not_modified(self):
+        etag = self.client.get('/api/products/')['ETag']
+        response = self.assertQueries(3, '/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_warehouse_list(self):
+        # Validators: warehouses, balances; then count and page
+        self.assertQueries(4, '/api/warehouses/')
+
+    def test_warehouse_retrieve(self):
+        # Validators: warehouse, balances, locations fingerprint; then warehouse and locations
+        self.assertQueries(5, f'/api/warehouses/{self.warehouse.pk}/')
+
+    def test_inventory_list(self):
+        self.assertQueries(2, '/api/inventory/')
+
+    def test_inventory_retrieve(self):
+        self.assertQueries(1, f'/api/inventory/{self.inventory.pk}/')
+
+    def test_sales_order_list(self):
+        # Validators: orders, customers; then count and page
+        self.assertQueries(4, '/api/sales-orders/')
+
+    def test_sales_order_list_with_items(self):
+        # Nested items decline validators on lists; count, page and items
+        self.assertQueries(3, '/api/sales-orders/?expand=items')
+
+    def test_sales_order_retrieve(self):
+        # Validators: order, customer, items fingerprint; then order and items
+        self.assertQueries(5, f'/api/sales-orders/{self.order.pk}/')
+
+    def test_sales_order_item_list(self):
+        self.assertQueries(2, '/api/sales-order-items/')
+
+    def test_sales_order_item_retrieve(self):
+        self.assertQueries(1, f'/api/sales-order-items/{self.order_item.pk}/')
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'products', views.ProductViewSet, basename='product')
@@ -11,5 +11,16 @@ router.register(r'sales-order-items', views.SalesOrderItemViewSet, basename='sal
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('availability/matrix/', views.AvailabilityMatrixView.as_view(), name='availability_matrix'),
+    path('atp/', views.AtpView.as_view(), name='atp'),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
+    path('waves/', views.WavePlanView.as_view(), name='wave_plan'),
+    path('stock-as-of/', views.StockAsOfView.as_view(), name='stock_as_of'),
+    path('scan/cache/', views.ScanCacheStatsView.as_view(), name='scan_cache_stats'),
+    path('scan/<str:code>/', views.ScanView.as_view(), name='scan'),
+    path('async/availability/', async_views.availability, name='async_availability'),
+    path('async/products/<str:code>/', async_views.product_lookup, name='async_product_lookup'),
+    path('shipments/confirm/', views.ShipmentConfirmAPIView.as_view(), name='shipment_confirm'),
+    path('purchase-orders/<int:pk>/receive/', views.PurchaseReceiveAPIView.as_view(), name='purchase_receive_api'),
     path('auth/', include('rest_framework.urls')),
 ]
\ No newline at end of file
@@ -1,79 +1,641 @@
-from rest_framework import viewsets
-from apps.inventory.models import Product, Warehouse, Inventory
-from apps.orders.models import SalesOrder, SalesOrderItem
+import copy
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField, OuterRef, Prefetch, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.inventory.models import (
+    Product, ProductCategory, Warehouse, Inventory, Location, PurchaseOrder, StockBalance, StockMovement
+)
+from apps.inventory.availability import availability_matrix
+from apps.inventory.changes import CheckpointExpired, changes_since, record_changes
+from apps.inventory.scan import product_cache, scan
+from apps.inventory.services import ReceiveError, apply_stock_deltas, receive_purchase_order
+from apps.inventory.snapshots import parse_moment, stock_as_of_rows
+from apps.inventory.totals import recompute_totals
+from apps.orders import atp
+from apps.orders.credit import CreditLimitError, credit_guard
+from apps.orders.models import Customer, SalesOrder, SalesOrderItem, Shipment
+from apps.orders.shipping import ShipmentError, confirm_shipments
+from apps.orders.waves import plan_waves
+from apps.api.bulk import BulkWriteMixin
+from apps.api.conditional import ConditionalGetMixin
+from apps.api.fast import fast_plan, fast_rows, fast_values
+from apps.api.shaping import only_plan, requested
 from apps.api.serializers import (
+    ProductListSerializer,
     ProductSerializer,
+    WarehouseListSerializer,
     WarehouseSerializer,
+    AtpQuerySerializer,
+    AvailabilityMatrixSerializer,
     InventorySerializer,
+    LocationSerializer,
+    PurchaseReceiveSerializer,
+    SalesOrderListSerializer,
     SalesOrderSerializer,
-    SalesOrderItemSerializer
+    SalesOrderItemSerializer,
+    ShipmentConfirmSerializer,
+    StockAsOfQuerySerializer,
+    WavePlanSerializer
 )
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+def _sum_subquery(queryset, group_by, expression):
+    return Coalesce(
+        Subquery(
+            queryset.values(group_by).annotate(total=Sum(expression)).values('total')[:1],
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def product_in_stock():
+    return _sum_subquery(StockBalance.objects.filter(product=OuterRef('pk')), 'product', 'on_hand')
+
+
+def warehouse_total_items():
+    return _sum_subquery(StockBalance.objects.filter(warehouse=OuterRef('pk')), 'warehouse', 'on_hand')
+
+
+def balances_changed(field):
+    """Conditional GET source: the StockBalance rows behind in_stock/total_items."""
+    def related(view, pk):
+        balances = StockBalance.objects.filter(company_id=getattr(view.request.user, 'company_id', None))
+        return balances if pk is None else balances.filter(**{field: pk})
+    return related
+
+
+def names_changed(model, path):
+    """Conditional GET source: the ``model`` rows whose names are joined in
+    (``category_name``, ``customer_name``); ``path`` leads back to the served rows."""
+    def related(view, pk):
+        rows = model.objects.filter(company_id=getattr(view.request.user, 'company_id', None))
+        return rows if pk is None else rows.filter(**{path: pk})
+    return related
+
+
+class CompanyScopedViewSet(viewsets.ModelViewSet):
+    """Limits every action to the user's company and shapes querysets per action.
+
+    ``list_serializer_class`` is used for ``list``; the number of queries
+    per action is pinned by ``apps.api.tests``. ``annotations`` and ``relation_prefetches`` (keyed by serializer field)
+    are applied only when the serializer actually emits that field.
+    ``fast_list`` serves ``list`` from ``values()`` when the serializer's
+    fields allow it (see ``apps.api.fast``).
+    """
+    company_field = 'company'
+    list_serializer_class = None
+    annotations = {}
+    relation_prefetches = {}
+    fast_list = False
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class is not None:
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def perform_create(self, serializer):
+        if self.company_field == 'company':
+            serializer.save(company=self.request.user.company)
+        else:
+            serializer.save()
+
+    def scope(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(**{self.company_field: user.company_id})
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_list:
+            plan = fast_plan(self.get_serializer(), self.get_serializer_class().Meta.model, self.annotations)
+            if plan is not None:
+                return self.fast_list_response(plan)
+        return super().list(request, *args, **kwargs)
+
+    def fast_list_response(self, plan):
+        rows = fast_values(self.filter_queryset(self.get_queryset()), plan)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast_rows(page, plan))
+        return Response(fast_rows(rows, plan))
+
+    def shape(self, queryset):
+        """Annotate, prefetch and narrow columns to what the serializer emits."""
+        serializer = self.get_serializer()
+        names = set(serializer.fields)
+
+        for name, annotation in self.annotations.items():
+            if name in names:
+                queryset = queryset.annotate(**{name: annotation()})
+
+        lookups = [lookup() for name, lookup in self.relation_prefetches.items() if name in names]
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+
+        if requested(self.request, 'fields') is not None:
+            plan = only_plan(serializer, queryset.model, self.annotations)
+            if plan is not None:
+                related, paths = plan
+                queryset = queryset.select_related(None).select_related(*related).only(*paths)
+        return queryset
+
+
+class ProductViewSet(ConditionalGetMixin, BulkWriteMixin, CompanyScopedViewSet):
+    cursor_ordering = 'id'
     serializer_class = ProductSerializer
+    list_serializer_class = ProductListSerializer
     queryset = Product.objects.none()  # Базовый queryset
+    fast_list = True
+    annotations = {'in_stock': product_in_stock}
+    conditional_related = (balances_changed('product'), names_changed(ProductCategory, 'products'))
+    conditional_nested = {
+        'stock': lambda products: Inventory.objects.filter(product__in=products.values('pk')),
+    }
+    bulk_scopes = {'category': 'company'}
+    bulk_unique = [('sku',)]
+    relation_prefetches = {
+        'stock': lambda: Prefetch('inventory', queryset=Inventory.objects.select_related('location')),
+    }
 
     def get_queryset(self):
-        return Product.objects.select_related(
-            'company',
-            'category',
-            'supplier'
-        ).prefetch_related(
-            'inventory',
-            'order_items',
-            'movements'
+        return self.shape(
+            self.scope(Product.objects.select_related('category'))
         ).order_by('name')
 
+    def after_bulk_write(self, changes):
+        # Bulk writes send no signals; evict what evict_scanned_product would have
+        for before, after in changes:
+            keys = {(after.company_id, after.sku), (after.company_id, after.barcode)}
+            if before is not None:
+                keys.update({(before.company_id, before.sku), (before.company_id, before.barcode)})
+            product_cache.evict_product(after.pk, keys=keys)
+
 
-class WarehouseViewSet(viewsets.ModelViewSet):
+class WarehouseViewSet(ConditionalGetMixin, CompanyScopedViewSet):
+    cursor_ordering = 'id'
     serializer_class = WarehouseSerializer
+    list_serializer_class = WarehouseListSerializer
     queryset = Warehouse.objects.none()  # Базовый queryset
+    annotations = {'total_items': warehouse_total_items}
+    conditional_related = (balances_changed('warehouse'),)
+    conditional_nested = {
+        'locations': lambda warehouses: Location.objects.filter(warehouse__in=warehouses.values('pk')),
+    }
+    relation_prefetches = {'locations': lambda: 'locations'}
 
     def get_queryset(self):
-        return Warehouse.objects.select_related(
-            'company'
-        ).prefetch_related(
-            'locations',
-            'incoming_transfers',
-            'outgoing_transfers'
-        ).order_by('name')
+        queryset = self.scope(Warehouse.objects.all())
+        if self.action != 'list':
+            queryset = queryset.select_related('company')
+        return self.shape(queryset).order_by('name')
 
 
-class InventoryViewSet(viewsets.ModelViewSet):
+class InventoryViewSet(BulkWriteMixin, CompanyScopedViewSet):
+    cursor_ordering = 'id'
     serializer_class = InventorySerializer
     queryset = Inventory.objects.none()  # Базовый queryset
+    company_field = 'location__warehouse__company'
+    fast_list = True
+    bulk_scopes = {'product': 'company', 'location': 'warehouse__company'}
+    bulk_unique = [('product', 'location', 'batch')]
 
     def get_queryset(self):
-        return Inventory.objects.select_related(
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # Whole rows, locked for the transaction update()/destroy() open, so
+            # the save cannot overwrite concurrent reservations and shipments
+            return self.scope(Inventory.objects.select_for_update(of=('self',)).select_related(
+                'product',
+                'location'
+            ))
+        return self.shape(self.scope(Inventory.objects.select_related(
             'product',
-            'location',
-            'location__warehouse'
-        ).order_by('product__name')
+            'location'
+        ))).order_by('product__name')
+
+    def get_bulk_queryset(self):
+        return self.scope(Inventory.objects.select_related('location'))
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            self.sync_stock([(None, serializer.instance)])
+
+    def perform_update(self, serializer):
+        before = copy.copy(serializer.instance)
+        serializer.save()
+        self.sync_stock([(before, serializer.instance)])
+
+    def perform_destroy(self, instance):
+        before = copy.copy(instance)
+        instance.delete()
+        self.sync_stock([(before, None)])
+
+    def after_bulk_write(self, changes):
+        self.sync_stock(changes, reference='api-bulk', notes='Bulk inventory update')
+        record_changes(self.request.user.company_id, 'inventory', [after.pk for _, after in changes])
+        atp.invalidate(
+            {after.product_id for _, after in changes} |
+            {before.product_id for before, _ in changes if before is not None}
+        )
 
+    def sync_stock(self, changes, reference='api', notes='Inventory update via API'):
+        """Keep StockBalance and the movement history in line with ``(before, after)`` rows."""
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        movements = []
+        for before, after in changes:
+            for row, sign in ((after, 1), (before, -1)):
+                if row is None:
+                    continue
+                key = (row.product_id, row.location.warehouse_id)
+                deltas[key][0] += sign * row.quantity
+                deltas[key][1] += sign * row.reserved
 
-class SalesOrderViewSet(viewsets.ModelViewSet):
+            if before is not None and after is not None and \
+                    (before.product_id, before.location_id, before.batch) == \
+                    (after.product_id, after.location_id, after.batch):
+                movements.append(self._adjustment(after, after.quantity - before.quantity, reference, notes))
+            else:
+                if after is not None:
+                    movements.append(self._adjustment(after, after.quantity, reference, notes))
+                if before is not None:
+                    movements.append(self._adjustment(before, -before.quantity, reference, notes))
+
+        StockMovement.objects.bulk_create([m for m in movements if m is not None], batch_size=1000)
+        apply_stock_deltas(self.request.user.company_id, deltas)
+
+    def _adjustment(self, row, delta, reference, notes):
+        if not delta:
+            return None
+        return StockMovement(
+            company=self.request.user.company,
+            movement_type='adjustment',
+            reference=reference,
+            product_id=row.product_id,
+            from_location=row.location if delta < 0 else None,
+            to_location=row.location if delta > 0 else None,
+            quantity=abs(delta),
+            batch=row.batch,
+            expiry_date=row.expiry_date,
+            date=timezone.now(),
+            notes=notes,
+            created_by=self.request.user
+        )
+
+
+class SalesOrderViewSet(ConditionalGetMixin, CompanyScopedViewSet):
+    cursor_ordering = '-id'
     serializer_class = SalesOrderSerializer
+    list_serializer_class = SalesOrderListSerializer
     queryset = SalesOrder.objects.none()  # Базовый queryset
+    filterset_fields = {
+        'status': ['exact'],
+        'customer': ['exact'],
+        'order_date': ['gte', 'lte'],
+        'expected_shipment': ['gte', 'lte'],
+        'carrier': ['exact'],
+        'gross_total': ['gte', 'lte'],
+    }
+    ordering_fields = ['order_date', 'created_at', 'net_total', 'gross_total', 'line_count']
+    relation_prefetches = {
+        'items': lambda: Prefetch('items', queryset=SalesOrderItem.objects.select_related('product', 'location')),
+    }
+    conditional_related = (names_changed(Customer, 'orders'),)
+    conditional_nested = {
+        'items': lambda orders: SalesOrderItem.objects.filter(order__in=orders.values('pk')),
+    }
 
     def get_queryset(self):
-        return SalesOrder.objects.select_related(
-            'company',
-            'customer',
-            'created_by'
-        ).prefetch_related(
-            'items',
-            'shipments'
-        ).order_by('-created_at')
+        queryset = self.scope(SalesOrder.objects.select_related('customer'))
+        if self.action != 'list':
+            queryset = queryset.select_related('created_by')
+        return self.shape(queryset).order_by('-created_at')
 
 
-class SalesOrderItemViewSet(viewsets.ModelViewSet):
+class SalesOrderItemViewSet(BulkWriteMixin, CompanyScopedViewSet):
+    cursor_ordering = 'id'
     serializer_class = SalesOrderItemSerializer
     queryset = SalesOrderItem.objects.none()  # Базовый queryset
+    company_field = 'order__company'
+    bulk_scopes = {
+        'order': 'company',
+        'product': 'company',
+        'location': 'warehouse__company',
+    }
 
     def get_queryset(self):
-        return SalesOrderItem.objects.select_related(
-            'order',
+        return self.shape(self.scope(SalesOrderItem.objects.select_related(
             'product',
             'location'
-        ).order_by('order')
\ No newline at end of file
+        ))).order_by('order')
+
+    def perform_create(self, serializer):
+        order = serializer.validated_data.get('order')
+        with self.credit_checked([order.pk] if order else []):
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        order = serializer.validated_data.get('order')
+        with self.credit_checked({serializer.instance.order_id, order.pk if order else None} - {None}):
+            super().perform_update(serializer)
+
+    @contextmanager
+    def credit_checked(self, order_ids):
+        # Item writes raise their order's total and so the customer's exposure
+        try:
+            with transaction.atomic(), credit_guard(order_ids):
+                yield
+        except CreditLimitError as exc:
+            raise ValidationError({'quantity': str(exc)})
+
+    def after_bulk_write(self, changes):
+        # Bulk writes send no signals, so the stored order totals are refreshed here;
+        # the ValidationError rolls the whole bulk write back
+        order_ids = {after.order_id for _, after in changes}
+        order_ids.update(before.order_id for before, _ in changes if before is not None)
+        with self.credit_checked(order_ids):
+            recompute_totals(SalesOrder, order_ids)
+        atp.invalidate({after.product_id for _, after in changes} | {
+            before.product_id for before, _ in changes if before is not None
+        })
+
+
+class StockAsOfView(APIView):
+    """Stock per product/location/batch at ``?date=`` (date or datetime).
+
+    Optional ``product`` and ``warehouse`` ids narrow the result.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            moment = parse_moment(request.query_params.get('date', ''))
+        except ValueError as exc:
+            raise ValidationError({'date': str(exc)})
+
+        serializer = StockAsOfQuerySerializer(data={
+            'products': request.query_params.getlist('product'),
+            'warehouses': request.query_params.getlist('warehouse'),
+        })
+        serializer.is_valid(raise_exception=True)
+
+        product_ids = serializer.validated_data.get('products') or None
+        location_ids = None
+        if serializer.validated_data.get('warehouses'):
+            location_ids = list(Location.objects.filter(
+                warehouse__company=request.user.company,
+                warehouse_id__in=serializer.validated_data['warehouses']
+            ).values_list('pk', flat=True))
+
+        rows = stock_as_of_rows(request.user.company, moment, product_ids, location_ids)
+        return Response({'date': moment, 'results': rows})
+
+
+class AvailabilityMatrixView(APIView):
+    """On-hand/reserved/available for many SKUs x warehouses in one call.
+
+    ``GET ?sku=A&sku=B&warehouse=W1`` or ``POST {"skus": [...], "warehouses": [...]}``
+    for long carts. Rows follow ``skus``; columns follow ``warehouses``
+    (default: every warehouse holding any of the SKUs).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return self._matrix({
+            'skus': request.query_params.getlist('sku'),
+            'warehouses': request.query_params.getlist('warehouse'),
+        })
+
+    def post(self, request):
+        return self._matrix(request.data)
+
+    def _matrix(self, data):
+        serializer = AvailabilityMatrixSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return Response(availability_matrix(
+            self.request.user.company_id,
+            serializer.validated_data['skus'],
+            serializer.validated_data.get('warehouses') or None
+        ))
+
+
+class AtpView(APIView):
+    """Time-phased available-to-promise per SKU.
+
+    ``GET ?sku=A&sku=B&quantity=10`` or ``POST {"skus": [...], "quantity": 10}``.
+    With ``quantity`` each result carries ``available_on``, the earliest
+    date that quantity can be promised (``null`` if it cannot).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        data = {'skus': request.query_params.getlist('sku')}
+        if 'quantity' in request.query_params:
+            data['quantity'] = request.query_params['quantity']
+        return self._atp(data)
+
+    def post(self, request):
+        return self._atp(request.data)
+
+    def _atp(self, data):
+        serializer = AtpQuerySerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        skus = list(dict.fromkeys(serializer.validated_data['skus']))
+        quantity = serializer.validated_data.get('quantity')
+
+        company_id = self.request.user.company_id
+        products = dict(Product.objects.filter(
+            company_id=company_id,
+            sku__in=skus
+        ).values_list('sku', 'pk'))
+        timelines = atp.atp_timelines(company_id, products.values())
+
+        results = []
+        for sku in skus:
+            if sku not in products:
+                continue
+            entry = timelines[products[sku]]
+            result = {
+                'sku': sku,
+                'product': entry['id'],
+                'on_hand': entry['on_hand'],
+                'undated_supply': entry['undated_supply'],
+                'timeline': [
+                    {'date': day, 'supply': supply, 'demand': demand, 'projected': projected, 'atp': promisable}
+                    for day, supply, demand, projected, promisable in zip(
+                        entry['days'], entry['supply'], entry['demand'], entry['projected'], entry['atp']
+                    )
+                ],
+            }
+            if quantity is not None:
+                result['available_on'] = atp.available_on(entry, quantity)
+            results.append(result)
+        return Response({
+            'results': results,
+            'unknown': [sku for sku in skus if sku not in products],
+        })
+
+
+class ChangesView(APIView):
+    """Everything changed since ``?since=<checkpoint>``, for offline clients.
+
+    Omit ``since`` for a full download. Each collection carries ``changed``
+    rows and ``deleted`` ids; pass the returned ``checkpoint`` next time.
+    A checkpoint older than the change log retention gets 410 Gone.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            checkpoint, feed = changes_since(request.user.company, request.query_params.get('since'))
+        except CheckpointExpired as exc:
+            return Response({'since': [str(exc)]}, status=status.HTTP_410_GONE)
+        except ValueError as exc:
+            raise ValidationError({'since': str(exc)})
+
+        products, deleted_products = feed['product']
+        inventory, deleted_inventory = feed['inventory']
+        locations, deleted_locations = feed['location']
+        orders, deleted_orders = feed['order']
+        context = {'request': request}
+        return Response({
+            'checkpoint': checkpoint,
+            'full': 'since' not in request.query_params,
+            'products': {
+                'changed': ProductListSerializer(
+                    products.select_related('category').annotate(in_stock=product_in_stock()),
+                    many=True, context=context
+                ).data,
+                'deleted': sorted(deleted_products),
+            },
+            'inventory': {
+                'changed': InventorySerializer(
+                    inventory.select_related('product', 'location'), many=True, context=context
+                ).data,
+                'deleted': sorted(deleted_inventory),
+            },
+            'locations': {
+                'changed': LocationSerializer(
+                    locations.select_related('warehouse'), many=True, context=context
+                ).data,
+                'deleted': sorted(deleted_locations),
+            },
+            'orders': {
+                'changed': SalesOrderListSerializer(
+                    orders.select_related('customer'),
+                    many=True, context=context
+                ).data,
+                'deleted': sorted(deleted_orders),
+            },
+        })
+
+
+class WavePlanView(APIView):
+    """Pick waves for released orders with pick lists in walk-path order.
+
+    Optional ``?warehouse=<id>`` (repeatable), ``carrier``, ``cutoff``
+    (orders due on or before that date) and ``max_orders`` per wave.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        data = {key: request.query_params[key] for key in ('carrier', 'cutoff', 'max_orders')
+                if key in request.query_params}
+        data['warehouse'] = request.query_params.getlist('warehouse')
+        serializer = WavePlanSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return Response(plan_waves(
+            request.user.company_id,
+            warehouse_ids=serializer.validated_data.get('warehouse'),
+            carrier=serializer.validated_data.get('carrier'),
+            cutoff=serializer.validated_data.get('cutoff'),
+            max_orders=serializer.validated_data.get('max_orders')
+        ))
+
+
+class ShipmentConfirmAPIView(APIView):
+    """Confirm many shipments in one transaction, e.g. a carrier's end-of-day pickup.
+
+    Body: ``{"shipments": [id, ...]}``. Shipments already shipped are skipped.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ShipmentConfirmSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        shipments = Shipment.objects.filter(
+            company=request.user.company,
+            pk__in=serializer.validated_data['shipments']
+        ).values_list('pk', flat=True)
+
+        try:
+            confirmed = confirm_shipments(shipments, request.user)
+        except ShipmentError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'confirmed': [shipment.shipment_number for shipment in confirmed],
+            'skipped': len(set(serializer.validated_data['shipments'])) - len(confirmed),
+        })
+
+
+class PurchaseReceiveAPIView(APIView):
+    """Receive many purchase order lines in one call.
+
+    Body: ``{"lines": [{"item": id, "quantity": n, "batch": ..., "expiry_date": ...}]}``;
+    omit ``lines`` to receive everything outstanding.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        order = get_object_or_404(PurchaseOrder, pk=pk, company=request.user.company)
+        serializer = PurchaseReceiveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            received = receive_purchase_order(order, request.user, serializer.validated_data.get('lines'))
+        except ReceiveError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        order.refresh_from_db(fields=['status'])
+        return Response({'received_lines': received, 'status': order.status})
+
+
+class ScanView(APIView):
+    """Resolve a scanned barcode or SKU to the product and its stock per location."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, code):
+        result = scan(request.user.company_id, code)
+        if result is None:
+            return Response({'detail': f'No product for code {code}'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result)
+
+
+class ScanCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(product_cache.stats())
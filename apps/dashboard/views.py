@@ -1,14 +1,28 @@
+from django.db.models import F, Sum
 from django.views.generic import TemplateView
-from inventory.models import Inventory
-from orders.models import SalesOrder
+from apps.inventory.models import Product, StockBalance, Warehouse
+from apps.orders.models import SalesOrder
 
 class DashboardView(TemplateView):
     template_name = 'dashboard/dashboard.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['low_stock'] = Inventory.objects.filter(
-            quantity__lt=F('product__min_stock')
-        )[:5]
-        context['recent_orders'] = SalesOrder.objects.order_by('-created_at')[:5]
-        return context
\ No newline at end of file
+        company = self.request.user.company
+        balances = StockBalance.objects.filter(company=company)
+
+        context['inventory_summary'] = {
+            'total_products': Product.objects.filter(company=company).count(),
+            'total_warehouses': Warehouse.objects.filter(company=company).count(),
+            'by_warehouse': balances.values('warehouse__name').annotate(
+                total_items=Sum('on_hand'),
+                total_value=Sum(F('on_hand') * F('product__purchase_price'))
+            ).order_by('warehouse__name'),
+        }
+        context['stock_alerts'] = balances.filter(
+            on_hand__lt=F('product__min_stock')
+        ).select_related('product', 'warehouse')[:5]
+        context['recent_orders'] = SalesOrder.objects.filter(
+            company=company
+        ).select_related('customer').order_by('-created_at')[:5]
+        return context
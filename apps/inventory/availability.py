@@ -0,0 +1,48 @@
+"""Stock availability across many products and warehouses."""
+from decimal import Decimal
+
+from django.db.models import F, Sum
+
+from .models import Inventory
+
+ZERO = Decimal('0.00')
+
+
+def availability_matrix(company_id, skus, warehouse_codes=None):
+    """On-hand, reserved and available per SKU (rows) and warehouse (columns).
+
+    One grouped query over Inventory joined to the location's warehouse,
+    whatever the number of SKUs. SKUs without stock come back as zero rows.
+    """
+    skus = list(dict.fromkeys(skus))
+    inventory = Inventory.objects.filter(
+        product__company_id=company_id,
+        product__sku__in=skus
+    )
+    if warehouse_codes:
+        warehouse_codes = list(dict.fromkeys(warehouse_codes))
+        inventory = inventory.filter(location__warehouse__code__in=warehouse_codes)
+
+    cells = {}
+    for row in inventory.values(
+        sku=F('product__sku'),
+        warehouse=F('location__warehouse__code')
+    ).annotate(
+        on_hand=Sum('quantity'),
+        reserved_total=Sum('reserved')
+    ).order_by():
+        cells[(row['sku'], row['warehouse'])] = (row['on_hand'], row['reserved_total'])
+
+    columns = warehouse_codes or sorted({warehouse for _, warehouse in cells})
+    matrix = {'on_hand': [], 'reserved': [], 'available': []}
+    for sku in skus:
+        on_hand_row, reserved_row, available_row = [], [], []
+        for warehouse in columns:
+            on_hand, reserved = cells.get((sku, warehouse), (ZERO, ZERO))
+            on_hand_row.append(on_hand)
+            reserved_row.append(reserved)
+            available_row.append(on_hand - reserved)
+        matrix['on_hand'].append(on_hand_row)
+        matrix['reserved'].append(reserved_row)
+        matrix['available'].append(available_row)
+    return dict({'skus': skus, 'warehouses': columns}, **matrix)
@@ -0,0 +1,129 @@
+"""Incremental change feed for offline clients.
+
+A sync asks for everything changed since an opaque checkpoint:
+
+* products and sales orders by ``updated_at``;
+* inventory rows, locations and every deletion through ``ChangeLog``,
+  which the signal handlers fill (bulk writes and conditional updates,
+  which send no signals, call ``record_changes`` themselves).
+
+Each window starts ``OVERLAP`` before the previous checkpoint, so rows
+committed by transactions that were still open at the last sync are not
+lost; clients apply changes as idempotent upserts.
+
+``ChangeLog`` is kept for ``RETENTION`` (``manage.py prune_change_log``
+deletes older entries); a checkpoint older than that raises
+``CheckpointExpired`` and the client has to download everything again.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.orders.models import SalesOrder
+from .models import ChangeLog, Inventory, Location, Product
+
+OVERLAP = timedelta(seconds=5)
+RETENTION = timedelta(days=getattr(settings, 'CHANGE_LOG_RETENTION_DAYS', 30))
+ENTITIES = ('product', 'inventory', 'location', 'order')
+
+
+class CheckpointExpired(ValueError):
+    pass
+
+
+def encode_checkpoint(moment):
+    payload = json.dumps({'v': 1, 't': moment.isoformat()}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_checkpoint(token):
+    """The moment stored in ``token``; raises ``ValueError`` for anything malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        moment = parse_datetime(payload['t'])
+    except (TypeError, KeyError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid checkpoint')
+    if moment is None or payload.get('v') != 1:
+        raise ValueError('Invalid checkpoint')
+    return moment
+
+
+def record_change(company_id, entity, object_id, action='changed'):
+    ChangeLog.objects.create(
+        company_id=company_id,
+        entity=entity,
+        object_id=object_id,
+        action=action
+    )
+
+
+def record_changes(company_id, entity, object_ids, action='changed'):
+    """``record_change`` for many objects at once; bulk writes send no signals."""
+    now = timezone.now()
+    ChangeLog.objects.bulk_create([
+        ChangeLog(company_id=company_id, entity=entity, object_id=object_id, action=action, changed_at=now)
+        for object_id in set(object_ids) if object_id is not None
+    ], batch_size=1000)
+
+
+def prune_change_log(retention=RETENTION):
+    """Delete change log entries older than ``retention``; returns how many."""
+    deleted, _ = ChangeLog.objects.filter(changed_at__lt=timezone.now() - retention).delete()
+    return deleted
+
+
+def _logged(company, since):
+    """``{entity: (changed ids, deleted ids)}`` from the change log."""
+    logged = {entity: (set(), set()) for entity in ENTITIES}
+    if since is None:
+        return logged
+    rows = ChangeLog.objects.filter(
+        company=company,
+        changed_at__gte=since
+    ).order_by('changed_at', 'pk').values_list('entity', 'object_id', 'action')
+    for entity, object_id, action in rows:
+        changed, deleted = logged[entity]
+        # The latest entry per object wins
+        if action == 'deleted':
+            changed.discard(object_id)
+            deleted.add(object_id)
+        else:
+            deleted.discard(object_id)
+            changed.add(object_id)
+    return logged
+
+
+def changes_since(company, checkpoint=None):
+    """Querysets and tombstones changed after ``checkpoint`` (``None``: everything).
+
+    Returns ``(next_checkpoint, {entity: (queryset, deleted ids)})``.
+    """
+    now = timezone.now()
+    since = decode_checkpoint(checkpoint) - OVERLAP if checkpoint else None
+    if since is not None and since < now - RETENTION:
+        raise CheckpointExpired('Checkpoint is older than the change log; omit since for a full download')
+    logged = _logged(company, since)
+
+    products = Product.objects.filter(company=company)
+    inventory = Inventory.objects.filter(product__company=company)
+    locations = Location.objects.filter(warehouse__company=company)
+    orders = SalesOrder.objects.filter(company=company)
+    if since is not None:
+        products = products.filter(Q(updated_at__gte=since) | Q(pk__in=logged['product'][0]))
+        inventory = inventory.filter(pk__in=logged['inventory'][0])
+        locations = locations.filter(pk__in=logged['location'][0])
+        orders = orders.filter(Q(updated_at__gte=since) | Q(pk__in=logged['order'][0]))
+
+    feed = {
+        'product': (products, logged['product'][1]),
+        'inventory': (inventory, logged['inventory'][1]),
+        'location': (locations, logged['location'][1]),
+        'order': (orders, logged['order'][1]),
+    }
+    return encode_checkpoint(now), feed
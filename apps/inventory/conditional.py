@@ -0,0 +1,97 @@
+"""Conditional GET (ETag / Last-Modified) from ``updated_at``.
+
+Validators come from one aggregate per source queryset, ``max(updated_at)``
+and the row count, so an unchanged resource is answered with 304 before
+anything is serialized or rendered. The row count catches deletions, which
+``max(updated_at)`` alone would miss.
+
+Nested rows without ``updated_at`` (locations, order and transfer lines,
+inventory) are wrapped in ``Fingerprint``: their columns are read and
+hashed. That is only affordable for the rows of a single parent, so it is
+used for detail pages and API retrieves, never for lists. Such a change
+leaves ``max(updated_at)`` alone, so responses that include a fingerprint
+carry no Last-Modified and are validated by ETag only.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class Fingerprint:
+    """Validator source for one parent's rows without ``updated_at``: every
+    column is hashed."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def digest(self):
+        columns = [field.attname for field in self.queryset.model._meta.concrete_fields]
+        rows = self.queryset.order_by('pk').values_list(*columns)
+        return hashlib.md5(repr(list(rows)).encode()).hexdigest()
+
+
+def validators(querysets, salt=''):
+    """Return ``(etag, last_modified, rows)`` for the given querysets.
+
+    ``rows`` is the count of the first queryset, the resource itself.
+    """
+    parts = [salt]
+    last_modified = None
+    fingerprinted = False
+    rows = None
+    for queryset in querysets:
+        if isinstance(queryset, Fingerprint):
+            fingerprinted = True
+            parts.append(queryset.digest())
+            continue
+        state = queryset.order_by().aggregate(changed=Max('updated_at'), rows=Count('pk'))
+        if rows is None:
+            rows = state['rows']
+        parts.append(f'{state["rows"]}:{state["changed"].isoformat() if state["changed"] else "-"}')
+        if state['changed'] and (last_modified is None or state['changed'] > last_modified):
+            last_modified = state['changed']
+    etag = '"%s"' % hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return etag, None if fingerprinted else last_modified, rows
+
+
+def not_modified(request, etag, last_modified):
+    """The 304 response for ``request``, or ``None`` when it must be served."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code != 200:
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalDetailMixin:
+    """304 for unchanged detail pages.
+
+    ``conditional_related`` maps to callables taking the object's pk and
+    returning further querysets (with ``updated_at``, or wrapped in
+    ``Fingerprint``) the page renders.
+    """
+    conditional_related = ()
+
+    def get(self, request, *args, **kwargs):
+        pk = kwargs.get(self.pk_url_kwarg)
+        querysets = [self.get_queryset().filter(pk=pk)]
+        querysets.extend(related(pk) for related in self.conditional_related)
+        etag, last_modified, rows = validators(querysets, salt=f'{request.path}|{request.user.pk}')
+        if rows:
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+        response = super().get(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified) if rows else response
@@ -45,4 +45,41 @@ class TransferItemForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if company:
-            self.fields['product'].queryset = Product.objects.filter(company=company)
\ No newline at end of file
+            self.fields['product'].queryset = Product.objects.filter(company=company)
+
+class PurchaseReceiveForm(forms.Form):
+    """One quantity/batch/expiry field set per outstanding order line."""
+
+    def __init__(self, *args, **kwargs):
+        self.items = kwargs.pop('items')
+        super().__init__(*args, **kwargs)
+
+        for item in self.items:
+            pending = item.quantity - item.received
+            self.fields[f'quantity_{item.pk}'] = forms.DecimalField(
+                min_value=0,
+                max_value=pending,
+                initial=pending,
+                required=False
+            )
+            self.fields[f'batch_{item.pk}'] = forms.CharField(max_length=50, required=False)
+            self.fields[f'expiry_{item.pk}'] = forms.DateField(
+                required=False,
+                widget=forms.DateInput(attrs={'type': 'date'})
+            )
+
+    def rows(self):
+        for item in self.items:
+            yield item, self[f'quantity_{item.pk}'], self[f'batch_{item.pk}'], self[f'expiry_{item.pk}']
+
+    def get_lines(self):
+        return [
+            {
+                'item': item.pk,
+                'quantity': self.cleaned_data[f'quantity_{item.pk}'],
+                'batch': self.cleaned_data[f'batch_{item.pk}'],
+                'expiry_date': self.cleaned_data[f'expiry_{item.pk}'],
+            }
+            for item in self.items
+            if self.cleaned_data.get(f'quantity_{item.pk}')
+        ]
@@ -0,0 +1,62 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.inventory.models import Transfer, TransferItem
+from apps.inventory.services import process_transfer
+
+
+class Command(BaseCommand):
+    help = 'Time process_transfer for transfers of different sizes (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"lines":>8} {"queries":>8} {"best ms":>10} {"ms/line":>10}')
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._run(size, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _run(self, size, repeat):
+        company, user = seed_tenant()
+        source, source_locations = seed_warehouse(company, locations=10)
+        target, _ = seed_warehouse(company, locations=1)
+        products = seed_products(company, size)
+        seed_stock(products, source_locations, quantity=Decimal(repeat * 10))
+
+        best = None
+        queries = 0
+        for attempt in range(repeat):
+            transfer = Transfer.objects.create(
+                from_warehouse=source,
+                to_warehouse=target,
+                reference=f'BENCH-{size}-{attempt}',
+                created_by=user
+            )
+            TransferItem.objects.bulk_create([
+                TransferItem(transfer=transfer, product=product, quantity=Decimal('1'))
+                for product in products
+            ])
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                process_transfer(transfer, user)
+                elapsed = time.perf_counter() - started
+            queries = len(ctx.captured_queries)
+            best = elapsed if best is None else min(best, elapsed)
+
+        self.stdout.write(
+            f'{size:>8} {queries:>8} {best * 1000:>10.1f} {best * 1000 / size:>10.3f}'
+        )
@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import time
+
+import tablib
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.resources import OpeningStockResource, ProductResource
+from apps.tenants.models import Company, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Import products or opening stock from a CSV/XLSX file in chunks. '
+        'Product columns: sku, name, category, purchase_price, selling_price, ... '
+        'Stock columns: sku, warehouse, location, batch, expiry_date, quantity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['products', 'stock'])
+        parser.add_argument('path')
+        parser.add_argument('--company', required=True, help='Company slug')
+        parser.add_argument('--user', help='Username recorded on stock movements (stock imports)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate everything, write nothing')
+        parser.add_argument('--errors', help='Write per-row errors to this CSV file')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last committed chunk')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(slug=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Company '{options['company']}' does not exist")
+
+        if options['kind'] == 'stock':
+            if not options['user']:
+                raise CommandError('--user is required for stock imports')
+            try:
+                user = User.objects.get(username=options['user'], company=company)
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist in {company}")
+            make_resource = lambda: OpeningStockResource(company=company, user=user)  # noqa: E731
+        else:
+            make_resource = lambda: ProductResource(company=company)  # noqa: E731
+
+        dataset = self._load(options['path'])
+        progress_path = f"{options['path']}.progress"
+        start = 0
+        if options['resume'] and os.path.exists(progress_path):
+            with open(progress_path) as handle:
+                start = json.load(handle)['rows_done']
+            self.stdout.write(f'Resuming after row {start}')
+
+        error_writer = None
+        error_file = None
+        if options['errors']:
+            error_file = open(options['errors'], 'a' if start else 'w', newline='')
+            error_writer = csv.writer(error_file)
+            if not start:
+                error_writer.writerow(['row', 'errors'])
+
+        totals = {'new': 0, 'update': 0, 'skip': 0, 'error': 0}
+        clean = True
+        started = time.perf_counter()
+        try:
+            for offset in range(start, len(dataset), options['chunk_size']):
+                chunk = tablib.Dataset(
+                    *dataset[offset:offset + options['chunk_size']],
+                    headers=dataset.headers
+                )
+                result = make_resource().import_data(
+                    chunk,
+                    dry_run=options['dry_run'],
+                    use_transactions=True,
+                    raise_errors=False
+                )
+                self._count(result, totals)
+                errors = self._errors(result, offset)
+                totals['error'] += len(errors)
+                if error_writer:
+                    error_writer.writerows(errors)
+
+                done = offset + len(chunk)
+                # Chunks with errors are rolled back, so --resume must restart
+                # from the first failed one; re-importing clean chunks is a no-op
+                clean = clean and not errors
+                if clean and not options['dry_run']:
+                    with open(progress_path, 'w') as handle:
+                        json.dump({'rows_done': done}, handle)
+                self.stdout.write(
+                    f'{done}/{len(dataset)} rows  '
+                    f'new={totals["new"]} updated={totals["update"]} '
+                    f'skipped={totals["skip"]} errors={totals["error"]}  '
+                    f'{time.perf_counter() - started:.1f}s'
+                )
+        finally:
+            if error_file:
+                error_file.close()
+
+        if clean and not options['dry_run'] and os.path.exists(progress_path):
+            os.remove(progress_path)
+
+        mode = 'Dry run' if options['dry_run'] else 'Import'
+        style = self.style.WARNING if totals['error'] else self.style.SUCCESS
+        self.stdout.write(style(f'{mode} finished with {totals["error"]} error(s)'))
+
+    def _load(self, path):
+        fmt = 'xlsx' if path.lower().endswith('.xlsx') else 'csv'
+        mode = 'rb' if fmt == 'xlsx' else 'r'
+        try:
+            with open(path, mode) as handle:
+                return tablib.Dataset().load(handle.read(), format=fmt)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+    def _count(self, result, totals):
+        for key in ('new', 'update', 'skip'):
+            totals[key] += result.totals.get(key, 0)
+
+    def _errors(self, result, offset):
+        rows = []
+        for number, errors in result.row_errors():
+            rows.append([offset + number, '; '.join(str(error.error) for error in errors)])
+        for invalid in result.invalid_rows:
+            messages = '; '.join(
+                f'{field}: {", ".join(map(str, field_errors))}'
+                for field, field_errors in invalid.error_dict.items()
+            )
+            rows.append([offset + invalid.number, messages])
+        return rows
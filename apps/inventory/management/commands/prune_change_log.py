@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventory.changes import RETENTION, prune_change_log
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries older than CHANGE_LOG_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_change_log()
+        self.stdout.write(f'{deleted} change log entr(ies) older than {RETENTION.days} days deleted')
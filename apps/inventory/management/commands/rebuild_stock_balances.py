@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.models import StockBalance
+from apps.inventory.services import rebuild_stock_balances
+from apps.tenants.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Recompute StockBalance rows from Inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Company slug (default: all companies)')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(slug=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Company '{options['company']}' does not exist")
+
+        rebuild_stock_balances(company)
+
+        balances = StockBalance.objects.all()
+        if company is not None:
+            balances = balances.filter(company=company)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {balances.count()} stock balances'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.snapshots import DEFAULT_PERIOD, take_due_snapshots
+from apps.tenants.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Write closing stock snapshots for every period that has ended'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Company slug (default: all active companies)')
+        parser.add_argument('--period', choices=['day', 'week', 'month'], default=DEFAULT_PERIOD)
+
+    def handle(self, *args, **options):
+        companies = Company.objects.filter(is_active=True)
+        if options['company']:
+            companies = companies.filter(slug=options['company'])
+            if not companies.exists():
+                raise CommandError(f"Company '{options['company']}' does not exist")
+
+        for company in companies:
+            snapshots = take_due_snapshots(company, period=options['period'])
+            self.stdout.write(f'{company.slug}: {len(snapshots)} snapshot(s) written')
@@ -0,0 +1,73 @@
+"""Throwaway data used by the benchmark management commands.
+
+Every command seeds inside a transaction and rolls it back at the end,
+so running a benchmark against a real database leaves no rows behind.
+"""
+import uuid
+from decimal import Decimal
+
+from django.utils import timezone
+
+from apps.inventory.models import Inventory, Location, Product, Warehouse
+from apps.tenants.models import Company, User
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed_tenant():
+    tag = uuid.uuid4().hex[:8]
+    company = Company.objects.create(name=f'Bench {tag}', slug=f'bench-{tag}')
+    user = User.objects.create(username=f'bench-{tag}', company=company)
+    return company, user
+
+
+def seed_warehouse(company, locations=1):
+    tag = uuid.uuid4().hex[:8]
+    warehouse = Warehouse.objects.create(
+        company=company,
+        name=f'Bench {tag}',
+        code=f'B{tag}',
+        address='-'
+    )
+    Location.objects.bulk_create([
+        Location(
+            warehouse=warehouse,
+            name=f'Loc {i}',
+            code=f'L{i:04d}',
+            aisle=f'{i // 100:02d}',
+            shelf=f'{i // 10 % 10:02d}',
+            bin=f'{i % 10:02d}'
+        )
+        for i in range(locations)
+    ])
+    return warehouse, list(warehouse.locations.order_by('pk'))
+
+
+def seed_products(company, count):
+    tag = uuid.uuid4().hex[:8]
+    Product.objects.bulk_create([
+        Product(
+            company=company,
+            name=f'Product {i}',
+            sku=f'{tag}-{i:06d}',
+            barcode=f'{tag}{i:06d}',
+            purchase_price=Decimal('1.00'),
+            selling_price=Decimal('2.00')
+        )
+        for i in range(count)
+    ])
+    return list(Product.objects.filter(company=company, sku__startswith=tag).order_by('pk'))
+
+
+def seed_stock(products, locations, quantity=Decimal('1000')):
+    Inventory.objects.bulk_create([
+        Inventory(
+            product=product,
+            location=locations[i % len(locations)],
+            quantity=quantity,
+            last_counted=timezone.now()
+        )
+        for i, product in enumerate(products)
+    ])
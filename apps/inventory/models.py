@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from apps.tenants.models import Company
 
@@ -95,6 +96,7 @@ class ProductCategory(models.Model):
     )
     description = models.TextField(_('Description'), blank=True)
     is_active = models.BooleanField(_('Active'), default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         app_label = 'inventory'
@@ -195,6 +197,10 @@ class Product(models.Model):
         verbose_name = _('Product')
         verbose_name_plural = _('Products')
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['company', 'barcode'], name='product_company_barcode_idx'),
+            models.Index(fields=['company', 'updated_at'], name='product_company_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -246,6 +252,11 @@ class Inventory(models.Model):
         verbose_name = _('Inventory')
         verbose_name_plural = _('Inventory')
         unique_together = ('product', 'location', 'batch')
+        indexes = [
+            models.Index(fields=['location', 'product'], name='inventory_location_product_idx'),
+            models.Index(fields=['product', 'expiry_date'], name='inventory_product_expiry_idx'),
+            models.Index(fields=['expiry_date'], name='inventory_expiry_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product} at {self.location}"
@@ -309,10 +320,12 @@ class PurchaseOrder(models.Model):
         related_name='purchase_orders',
         verbose_name=_('Company')
     )
+    # Left blank, filled from apps.tenants.numbering on save
     order_number = models.CharField(
         _('Order Number'),
         max_length=50,
-        unique=True
+        unique=True,
+        blank=True
     )
     supplier = models.ForeignKey(
         Supplier,
@@ -339,6 +352,26 @@ class PurchaseOrder(models.Model):
         related_name='created_purchase_orders',
         verbose_name=_('Created By')
     )
+    # Maintained from the items by apps.inventory.totals
+    net_total = models.DecimalField(
+        _('Net Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    tax_total = models.DecimalField(
+        _('Tax Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    gross_total = models.DecimalField(
+        _('Gross Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    line_count = models.PositiveIntegerField(_('Lines'), default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -347,6 +380,11 @@ class PurchaseOrder(models.Model):
         verbose_name = _('Purchase Order')
         verbose_name_plural = _('Purchase Orders')
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['company', 'status', 'order_date'], name='po_company_status_date_idx'),
+            models.Index(fields=['company', 'order_date'], name='po_company_date_idx'),
+            models.Index(fields=['company', 'gross_total'], name='po_company_gross_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order_number} - {self.supplier}"
@@ -482,6 +520,11 @@ class StockMovement(models.Model):
         verbose_name = _('Stock Movement')
         verbose_name_plural = _('Stock Movements')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['company', 'date'], name='movement_company_date_idx'),
+            models.Index(fields=['company', 'movement_type', 'date'], name='movement_company_type_date_idx'),
+            models.Index(fields=['product', 'date'], name='movement_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.product}"
@@ -496,7 +539,7 @@ class Transfer(models.Model):
 
     from_warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='outgoing_transfers')
     to_warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='incoming_transfers')
-    reference = models.CharField(max_length=50)
+    reference = models.CharField(max_length=50, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
     created_by = models.ForeignKey('tenants.User', on_delete=models.PROTECT)
@@ -505,6 +548,9 @@ class Transfer(models.Model):
 
     class Meta:
         app_label = 'inventory'
+        indexes = [
+            models.Index(fields=['from_warehouse', 'status'], name='transfer_from_status_idx'),
+        ]
 
     def __str__(self):
         return f"Transfer {self.reference} ({self.get_status_display()})"
@@ -519,4 +565,165 @@ class TransferItem(models.Model):
         app_label = 'inventory'
 
     def __str__(self):
-        return f"{self.product} x{self.quantity} (Transfer {self.transfer.reference})"
\ No newline at end of file
+        return f"{self.product} x{self.quantity} (Transfer {self.transfer.reference})"
+
+
+class StockBalance(models.Model):
+    """Running per-warehouse totals of Inventory, maintained by apps.inventory.services."""
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='stock_balances',
+        verbose_name=_('Company')
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_balances',
+        verbose_name=_('Product')
+    )
+    warehouse = models.ForeignKey(
+        Warehouse,
+        on_delete=models.CASCADE,
+        related_name='stock_balances',
+        verbose_name=_('Warehouse')
+    )
+    on_hand = models.DecimalField(
+        _('On Hand'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    reserved = models.DecimalField(
+        _('Reserved'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    available = models.DecimalField(
+        _('Available'),
+        max_digits=12,
+        decimal_places=2,
+        default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'inventory'
+        verbose_name = _('Stock Balance')
+        verbose_name_plural = _('Stock Balances')
+        unique_together = ('product', 'warehouse')
+
+    def __str__(self):
+        return f"{self.product} in {self.warehouse}: {self.on_hand}"
+
+
+class StockSnapshot(models.Model):
+    PERIODS = (
+        ('day', _('Day')),
+        ('week', _('Week')),
+        ('month', _('Month')),
+    )
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots',
+        verbose_name=_('Company')
+    )
+    period = models.CharField(
+        _('Period'),
+        max_length=10,
+        choices=PERIODS,
+        default='month'
+    )
+    period_end = models.DateTimeField(_('Period End'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'inventory'
+        verbose_name = _('Stock Snapshot')
+        verbose_name_plural = _('Stock Snapshots')
+        unique_together = ('company', 'period_end')
+        ordering = ['-period_end']
+
+    def __str__(self):
+        return f"{self.company} @ {self.period_end:%Y-%m-%d %H:%M}"
+
+
+class StockSnapshotLine(models.Model):
+    snapshot = models.ForeignKey(
+        StockSnapshot,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name=_('Snapshot')
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='snapshot_lines',
+        verbose_name=_('Product')
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name='snapshot_lines',
+        verbose_name=_('Location')
+    )
+    batch = models.CharField(
+        _('Batch/Lot'),
+        max_length=50,
+        blank=True
+    )
+    quantity = models.DecimalField(
+        _('Quantity'),
+        max_digits=12,
+        decimal_places=2
+    )
+
+    class Meta:
+        app_label = 'inventory'
+        verbose_name = _('Stock Snapshot Line')
+        verbose_name_plural = _('Stock Snapshot Lines')
+        unique_together = ('snapshot', 'product', 'location', 'batch')
+
+    def __str__(self):
+        return f"{self.product} at {self.location}: {self.quantity}"
+
+
+class ChangeLog(models.Model):
+    """Changes the change feed cannot read from ``updated_at``: deletions
+    (tombstones) and edits of models without that column."""
+    ENTITIES = (
+        ('product', _('Product')),
+        ('inventory', _('Inventory')),
+        ('location', _('Location')),
+        ('order', _('Sales Order')),
+    )
+    ACTIONS = (
+        ('changed', _('Changed')),
+        ('deleted', _('Deleted')),
+    )
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='change_log',
+        verbose_name=_('Company')
+    )
+    entity = models.CharField(_('Entity'), max_length=20, choices=ENTITIES)
+    object_id = models.BigIntegerField(_('Object ID'))
+    action = models.CharField(_('Action'), max_length=10, choices=ACTIONS)
+    changed_at = models.DateTimeField(_('Changed At'), default=timezone.now)
+
+    class Meta:
+        app_label = 'inventory'
+        verbose_name = _('Change Log Entry')
+        verbose_name_plural = _('Change Log')
+        indexes = [
+            models.Index(fields=['company', 'changed_at'], name='changelog_company_changed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} #{self.object_id} {self.action} at {self.changed_at:%Y-%m-%d %H:%M}"
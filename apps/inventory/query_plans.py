@@ -0,0 +1,227 @@
+"""Registry of hot queries whose plans must stay on an index.
+
+Each entry builds the queryset a view, serializer or service actually
+issues and names the table that must never be read with a full scan and
+the index the plan is expected to use. ``apps.inventory.tests`` seeds
+data, EXPLAINs every entry and fails if a plan regresses. Register new
+hot paths here when adding list views, filters or services.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from apps.orders.models import SalesOrder, Shipment, StockReservation
+from apps.orders.atp import _demand, _supply
+from apps.orders.reservations import candidate_queryset
+from apps.orders.waves import _wave_items
+from .models import (
+    ChangeLog, Inventory, Product, PurchaseOrder, StockBalance, StockMovement, StockSnapshot, Transfer
+)
+
+HOT_QUERIES = []
+
+
+def hot_query(table, index):
+    def register(build):
+        HOT_QUERIES.append((build.__name__, table, index, build))
+        return build
+    return register
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            # Tiny seeded tables would otherwise always be seq-scanned
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('EXPLAIN ' + sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan, table):
+    """Plan lines that read every row of ``table``."""
+    if connection.vendor == 'sqlite':
+        pattern = re.compile(rf'^SCAN (TABLE )?{table}\b')
+    else:
+        pattern = re.compile(rf'(Seq Scan|Full Table Scan|type: ALL).*\b{table}\b')
+    return [line for line in plan if pattern.search(line.strip())]
+
+
+@hot_query('inventory_stockmovement', 'movement_company_date_idx')
+def movements_by_company_and_date(ctx):
+    # snapshots.take_snapshot / stock_as_of
+    return StockMovement.objects.filter(
+        company=ctx['company'],
+        date__gte=ctx['since'],
+        date__lte=ctx['now']
+    )
+
+
+@hot_query('inventory_stockmovement', 'movement_company_type_date_idx')
+def movements_by_company_type_and_date(ctx):
+    return StockMovement.objects.filter(
+        company=ctx['company'],
+        movement_type='sale',
+        date__gte=ctx['since']
+    ).order_by('-date')
+
+
+@hot_query('inventory_stockmovement', 'movement_product_date_idx')
+def movements_by_product(ctx):
+    return StockMovement.objects.filter(product=ctx['product']).order_by('-date')[:50]
+
+
+@hot_query('inventory_inventory', 'inventory_location_product_idx')
+def inventory_by_product_and_location(ctx):
+    return Inventory.objects.filter(product=ctx['product'], location=ctx['location'])
+
+
+@hot_query('inventory_inventory', 'inventory_location_product_idx')
+def inventory_by_location(ctx):
+    return Inventory.objects.filter(location=ctx['location'])
+
+
+@hot_query('inventory_inventory', 'inventory_product_expiry_idx')
+def inventory_candidates_by_expiry(ctx):
+    # services.process_transfer
+    return Inventory.objects.filter(
+        product_id__in=ctx['product_ids'],
+        quantity__gt=F('reserved')
+    ).order_by('expiry_date', 'pk')
+
+
+@hot_query('inventory_inventory', 'inventory_product_expiry_idx')
+def allocation_candidates(ctx):
+    # reservations.candidate_stock (FEFO)
+    return candidate_queryset(ctx['product_ids'], ctx['company'].pk, 'fefo')
+
+
+@hot_query('inventory_inventory', 'inventory_product_expiry_idx')
+def availability_matrix_cells(ctx):
+    # availability.availability_matrix
+    return Inventory.objects.filter(
+        product__company=ctx['company'],
+        product__sku__in=[ctx['product'].sku]
+    ).values('product__sku', 'location__warehouse__code').annotate(on_hand=Sum('quantity')).order_by()
+
+
+@hot_query('inventory_inventory', 'inventory_expiry_idx')
+def inventory_expiring(ctx):
+    return Inventory.objects.filter(expiry_date__lte=ctx['today'] + timedelta(days=30))
+
+
+@hot_query('inventory_product', 'product_company_barcode_idx')
+def product_by_barcode(ctx):
+    return Product.objects.filter(company=ctx['company'], barcode=ctx['product'].barcode)
+
+
+@hot_query('inventory_stockbalance', 'inventory_stockbalance_company_id_c54e9180')
+def balances_by_company(ctx):
+    return StockBalance.objects.filter(company=ctx['company'])
+
+
+@hot_query('inventory_changelog', 'changelog_company_changed_idx')
+def change_log_since(ctx):
+    # changes.changes_since
+    return ChangeLog.objects.filter(company=ctx['company'], changed_at__gte=ctx['since'])
+
+
+@hot_query('inventory_product', 'product_company_updated_idx')
+def products_changed_since(ctx):
+    return Product.objects.filter(company=ctx['company'], updated_at__gte=ctx['since'])
+
+
+@hot_query('inventory_stocksnapshot', 'inventory_stocksnapshot_company_id_period_end_e64a3558_uniq')
+def nearest_snapshot(ctx):
+    return StockSnapshot.objects.filter(
+        company=ctx['company'],
+        period_end__lte=ctx['now']
+    ).order_by('-period_end')[:1]
+
+
+@hot_query('inventory_purchaseorder', 'po_company_status_date_idx')
+def purchase_orders_by_status(ctx):
+    return PurchaseOrder.objects.filter(company=ctx['company'], status='ordered').order_by('-order_date')
+
+
+@hot_query('inventory_transfer', 'transfer_from_status_idx')
+def pending_transfers(ctx):
+    return Transfer.objects.filter(from_warehouse=ctx['warehouse'], status='pending')
+
+
+@hot_query('orders_salesorder', 'so_company_status_date_idx')
+def sales_orders_by_status(ctx):
+    return SalesOrder.objects.filter(company=ctx['company'], status='confirmed').order_by('-order_date')
+
+
+@hot_query('orders_salesorder', 'so_company_date_idx')
+def sales_orders_by_date(ctx):
+    return SalesOrder.objects.filter(company=ctx['company'], order_date__gte=ctx['today'] - timedelta(days=30))
+
+
+@hot_query('orders_salesorder', 'so_company_created_idx')
+def recent_sales_orders(ctx):
+    # dashboard.views.DashboardView
+    return SalesOrder.objects.filter(company=ctx['company']).order_by('-created_at')[:5]
+
+
+@hot_query('orders_salesorder', 'so_company_updated_idx')
+def sales_orders_changed_since(ctx):
+    return SalesOrder.objects.filter(company=ctx['company'], updated_at__gte=ctx['since'])
+
+
+@hot_query('orders_salesorder', 'so_company_gross_idx')
+def sales_orders_by_gross_total(ctx):
+    # /api/sales-orders/?gross_total__gte=...&ordering=-gross_total
+    return SalesOrder.objects.filter(company=ctx['company'], gross_total__gte=100).order_by('-gross_total')
+
+
+@hot_query('orders_salesorder', 'so_company_status_date_idx')
+def wave_order_items(ctx):
+    # waves.plan_waves
+    return _wave_items(ctx['company'].pk, cutoff=ctx['today'])[0]
+
+
+@hot_query('orders_salesorder', 'so_company_status_date_idx')
+def atp_sales_demand(ctx):
+    # atp.build_timelines
+    return _demand(ctx['company'].pk, ctx['product_ids'])
+
+
+@hot_query('inventory_purchaseorder', 'po_company_status_date_idx')
+def atp_purchase_supply(ctx):
+    # atp.build_timelines
+    return _supply(ctx['company'].pk, ctx['product_ids'])
+
+
+@hot_query('orders_shipment', 'shipment_company_status_idx')
+def shipments_by_status(ctx):
+    return Shipment.objects.filter(company=ctx['company'], status='ready')
+
+
+@hot_query('orders_stockreservation', 'reservation_item_status_idx')
+def active_reservations_for_items(ctx):
+    return StockReservation.objects.filter(order_item__in=ctx['order_item_ids'], status='active')
+
+
+def build_context(company, warehouse, location, products, orders):
+    now = timezone.now()
+    return {
+        'company': company,
+        'warehouse': warehouse,
+        'location': location,
+        'product': products[0],
+        'product_ids': [product.pk for product in products[:20]],
+        'order_item_ids': list(
+            orders[0].items.values_list('pk', flat=True)
+        ) if orders else [],
+        'now': now,
+        'since': now - timedelta(days=30),
+        'today': timezone.localdate(),
+    }
@@ -0,0 +1,228 @@
+"""django-import-export resources for onboarding products and opening stock.
+
+The stock django-import-export widgets and ``get_instance`` each query
+once per row. These resources resolve every referenced category,
+location, product and existing row in ``before_import``, with one query
+per model for the whole dataset. The management command feeds them one
+chunk at a time, so that is one lookup per model per chunk. Writes go
+through ``use_bulk``, and rows identical to the stored ones are skipped,
+so re-importing the same file writes nothing. Bulk writes send no
+signals; ``after_import`` does what the handlers would have done.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.utils import timezone
+from import_export import fields, resources, widgets
+
+from apps.orders import atp
+from .changes import record_changes
+from .models import Inventory, Location, Product, ProductCategory, StockMovement
+from .scan import product_cache
+from .services import apply_stock_deltas
+
+
+class LookupWidget(widgets.Widget):
+    """Resolves a cell through a dict filled by the resource before import."""
+
+    def __init__(self, name, key=None):
+        self.name = name
+        self.key = key or (lambda value, row: value)
+        self.lookup = {}
+        super().__init__()
+
+    def clean(self, value, row=None, *args, **kwargs):
+        if value in (None, ''):
+            return None
+        try:
+            return self.lookup[self.key(value, row)]
+        except KeyError:
+            raise ValueError(f'Unknown {self.name}: {value}')
+
+    def render(self, value, obj=None, **kwargs):
+        return '' if value is None else str(value)
+
+
+def _column(dataset, name):
+    if name not in dataset.headers:
+        return []
+    return [value for value in dataset[name] if value not in (None, '')]
+
+
+class ProductResource(resources.ModelResource):
+    category = fields.Field(
+        attribute='category',
+        column_name='category',
+        widget=LookupWidget('category')
+    )
+
+    class Meta:
+        model = Product
+        fields = (
+            'sku', 'name', 'barcode', 'category', 'unit', 'description',
+            'purchase_price', 'selling_price', 'tax_rate', 'min_stock',
+            'max_stock', 'weight', 'volume', 'is_active',
+        )
+        import_id_fields = ('sku',)
+        use_bulk = True
+        batch_size = 1000
+        skip_unchanged = True
+        report_skipped = False
+
+    def __init__(self, company, **kwargs):
+        self.company = company
+        self.existing = {}
+        self.codes = {}
+        self.updated = set()
+        super().__init__(**kwargs)
+
+    def before_import(self, dataset, *args, **kwargs):
+        names = set(_column(dataset, 'category'))
+        categories = {
+            category.name: category
+            for category in ProductCategory.objects.filter(company=self.company, name__in=names)
+        }
+        missing = names - set(categories)
+        if missing:
+            ProductCategory.objects.bulk_create([
+                ProductCategory(company=self.company, name=name) for name in missing
+            ])
+            categories.update({
+                category.name: category
+                for category in ProductCategory.objects.filter(company=self.company, name__in=missing)
+            })
+        self.fields['category'].widget.lookup = categories
+
+        self.existing = Product.objects.filter(
+            company=self.company,
+            sku__in=set(_column(dataset, 'sku'))
+        ).in_bulk(field_name='sku')
+        self.codes = {product.pk: (product.sku, product.barcode) for product in self.existing.values()}
+
+    def get_instance(self, instance_loader, row):
+        return self.existing.get(row.get('sku'))
+
+    def before_save_instance(self, instance, *args, **kwargs):
+        instance.company = self.company
+        if instance.pk:
+            self.updated.add(instance.pk)
+
+    def after_import(self, dataset, result, *args, **kwargs):
+        # bulk_update leaves auto_now alone; conditional GETs rely on updated_at
+        if self.updated and not result.has_errors() and not result.has_validation_errors():
+            Product.objects.filter(pk__in=self.updated).update(updated_at=timezone.now())
+            # The scan cache may still hold the old codes or prices
+            for product in self.existing.values():
+                if product.pk in self.updated:
+                    product_cache.evict_product(product.pk, keys=[
+                        (self.company.pk, code) for code in (*self.codes[product.pk], product.sku, product.barcode)
+                    ])
+        self.updated = set()
+
+
+def _location_key(value, row):
+    return (row.get('warehouse'), value)
+
+
+class OpeningStockResource(resources.ModelResource):
+    """Sets absolute on-hand quantities and records the difference as adjustments."""
+    product = fields.Field(
+        attribute='product',
+        column_name='sku',
+        widget=LookupWidget('product')
+    )
+    location = fields.Field(
+        attribute='location',
+        column_name='location',
+        widget=LookupWidget('location', key=_location_key)
+    )
+
+    class Meta:
+        model = Inventory
+        fields = ('product', 'location', 'batch', 'expiry_date', 'quantity')
+        import_id_fields = ('product', 'location', 'batch')
+        use_bulk = True
+        batch_size = 1000
+        skip_unchanged = True
+        report_skipped = False
+
+    def __init__(self, company, user, **kwargs):
+        self.company = company
+        self.user = user
+        self.existing = {}
+        self.original = {}
+        self.deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        self.movements = []
+        self.products = set()
+        self.saved = []
+        super().__init__(**kwargs)
+
+    def before_import(self, dataset, *args, **kwargs):
+        products = Product.objects.filter(
+            company=self.company,
+            sku__in=set(_column(dataset, 'sku'))
+        ).in_bulk(field_name='sku')
+        self.fields['product'].widget.lookup = products
+
+        locations = {
+            (location.warehouse.code, location.code): location
+            for location in Location.objects.filter(
+                warehouse__company=self.company,
+                warehouse__code__in=set(_column(dataset, 'warehouse')),
+                code__in=set(_column(dataset, 'location'))
+            ).select_related('warehouse')
+        }
+        self.fields['location'].widget.lookup = locations
+
+        self.existing = {
+            (row.product_id, row.location_id, row.batch): row
+            for row in Inventory.objects.filter(
+                product__in=products.values(),
+                location__in=locations.values()
+            )
+        }
+        self.original = {key: row.quantity for key, row in self.existing.items()}
+
+    def get_instance(self, instance_loader, row):
+        product = self.fields['product'].clean(row)
+        location = self.fields['location'].clean(row)
+        if product is None or location is None:
+            return None
+        return self.existing.get((product.pk, location.pk, row.get('batch') or ''))
+
+    def before_save_instance(self, instance, *args, **kwargs):
+        instance.batch = instance.batch or ''
+        instance.last_counted = timezone.now()
+        self.products.add(instance.product_id)
+        self.saved.append(instance)
+        key = (instance.product_id, instance.location_id, instance.batch)
+        delta = instance.quantity - self.original.get(key, Decimal('0'))
+        if not delta:
+            return
+        self.deltas[(instance.product_id, instance.location.warehouse_id)][0] += delta
+        self.movements.append(StockMovement(
+            company=self.company,
+            movement_type='adjustment',
+            reference='opening-stock',
+            product_id=instance.product_id,
+            from_location=instance.location if delta < 0 else None,
+            to_location=instance.location if delta > 0 else None,
+            quantity=abs(delta),
+            batch=instance.batch,
+            expiry_date=instance.expiry_date,
+            date=timezone.now(),
+            notes='Opening stock import',
+            created_by=self.user
+        ))
+
+    def after_import(self, dataset, result, *args, **kwargs):
+        # Runs inside the import transaction, so a dry run rolls these back too
+        if not result.has_errors() and not result.has_validation_errors():
+            StockMovement.objects.bulk_create(self.movements, batch_size=1000)
+            apply_stock_deltas(self.company.pk, self.deltas)
+            atp.invalidate(self.products)
+            record_changes(self.company.pk, 'inventory', [row.pk for row in self.saved])
+        self.movements = []
+        self.deltas.clear()
+        self.products = set()
+        self.saved = []
@@ -0,0 +1,136 @@
+"""Barcode/SKU lookups for handheld scanners.
+
+Resolving a code to a product goes through a bounded in-process LRU
+cache; per-location stock is always read fresh. Product save/delete
+signals evict cached entries, which only reaches the current process,
+so keep SCAN_CACHE_SIZE modest when running several workers.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Inventory, Product
+
+PRODUCT_FIELDS = ('id', 'name', 'sku', 'barcode', 'unit', 'selling_price', 'is_active')
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._keys_by_product = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._keys_by_product.setdefault(value['id'], set()).add(key)
+            while len(self._data) > self.maxsize:
+                old_key, old_value = self._data.popitem(last=False)
+                keys = self._keys_by_product.get(old_value['id'])
+                if keys is not None:
+                    keys.discard(old_key)
+                    if not keys:
+                        del self._keys_by_product[old_value['id']]
+
+    def evict_product(self, product_id, keys=()):
+        """Drop every entry for ``product_id`` plus any extra ``keys``."""
+        with self._lock:
+            for key in set(self._keys_by_product.pop(product_id, ())) | set(keys):
+                value = self._data.pop(key, None)
+                if value is not None and value['id'] != product_id:
+                    self._keys_by_product.get(value['id'], set()).discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._keys_by_product.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+product_cache = LRUCache(getattr(settings, 'SCAN_CACHE_SIZE', 10000))
+
+
+def _products_for_code(company_id, code):
+    return Product.objects.filter(
+        Q(barcode=code) | Q(sku=code),
+        company_id=company_id
+    ).values(*PRODUCT_FIELDS).order_by('-is_active', 'pk')
+
+
+def _stock_for_product(product_id):
+    return Inventory.objects.filter(
+        product_id=product_id,
+        quantity__gt=0
+    ).values(
+        'location_id', 'batch', 'expiry_date', 'quantity', 'reserved',
+        location_name=F('location__name'),
+        location_code=F('location__code'),
+        warehouse_code=F('location__warehouse__code'),
+    ).order_by('location__warehouse__code', 'location__code', 'batch')
+
+
+def resolve_code(company_id, code):
+    """Return product fields for a barcode or SKU, or ``None``."""
+    if not code:
+        return None
+    key = (company_id, code)
+    product = product_cache.get(key)
+    if product is None:
+        product = _products_for_code(company_id, code).first()
+        if product is not None:
+            product_cache.set(key, product)
+    return product
+
+
+def scan(company_id, code):
+    """Product plus per-location stock for a scanned code, or ``None``."""
+    product = resolve_code(company_id, code)
+    if product is None:
+        return None
+    return dict(product, stock=list(_stock_for_product(product['id'])))
+
+
+async def aresolve_code(company_id, code):
+    """``resolve_code`` on the async ORM, sharing the same cache."""
+    if not code:
+        return None
+    key = (company_id, code)
+    product = product_cache.get(key)
+    if product is None:
+        product = await _products_for_code(company_id, code).afirst()
+        if product is not None:
+            product_cache.set(key, product)
+    return product
+
+
+async def ascan(company_id, code):
+    product = await aresolve_code(company_id, code)
+    if product is None:
+        return None
+    return dict(product, stock=[row async for row in _stock_for_product(product['id'])])
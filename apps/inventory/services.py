@@ -0,0 +1,384 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .changes import record_changes
+from .models import (
+    Inventory, Location, PurchaseOrder, PurchaseOrderItem, StockBalance,
+    StockMovement, Transfer
+)
+
+# Drafts and orders awaiting approval have not been sent to the supplier
+RECEIVABLE_STATUSES = ('ordered', 'partial')
+
+
+class StockError(Exception):
+    pass
+
+
+class TransferError(StockError):
+    pass
+
+
+class ReceiveError(StockError):
+    pass
+
+
+def apply_stock_deltas(company_id, deltas):
+    """Add on-hand/reserved deltas to StockBalance rows.
+
+    ``deltas`` maps ``(product_id, warehouse_id)`` to ``(on_hand, reserved)``.
+    Must be called inside the transaction that changes Inventory. Missing
+    rows are inserted first so the locking SELECT sees every key; the whole
+    call is three queries regardless of the number of keys. Only the rows
+    being changed are locked, always in primary key order, so concurrent
+    callers cannot deadlock on each other.
+    """
+    deltas = {key: value for key, value in deltas.items() if any(value)}
+    if not deltas:
+        return
+
+    StockBalance.objects.bulk_create(
+        [
+            StockBalance(company_id=company_id, product_id=product_id, warehouse_id=warehouse_id)
+            for product_id, warehouse_id in deltas
+        ],
+        ignore_conflicts=True
+    )
+
+    products = defaultdict(set)
+    for product_id, warehouse_id in deltas:
+        products[warehouse_id].add(product_id)
+    keys = Q()
+    for warehouse_id, product_ids in sorted(products.items()):
+        keys |= Q(warehouse_id=warehouse_id, product_id__in=product_ids)
+
+    balances = list(StockBalance.objects.select_for_update().filter(keys).order_by('pk'))
+    now = timezone.now()
+    changed = []
+    for balance in balances:
+        delta = deltas.get((balance.product_id, balance.warehouse_id))
+        if delta is None:
+            continue
+        balance.on_hand += delta[0]
+        balance.reserved += delta[1]
+        balance.available = balance.on_hand - balance.reserved
+        balance.updated_at = now
+        changed.append(balance)
+
+    StockBalance.objects.bulk_update(changed, ['on_hand', 'reserved', 'available', 'updated_at'])
+
+
+def lock_inventory(queryset):
+    """Lock the Inventory rows matched by ``queryset``, always in primary key order.
+
+    Every path that locks several Inventory rows (reservations, allocation,
+    shipping, transfers, receipts) goes through here, so concurrent
+    callers take the locks in the same order and cannot deadlock. Returns
+    the locked ids.
+
+    Writers spanning several tables lock them in one global order, each
+    table in primary key order: the document being processed (Shipment,
+    Transfer, PurchaseOrder), SalesOrder, Customer (``credit.lock_orders``),
+    SalesOrderItem, Inventory, StockReservation and StockBalance last
+    (``apply_stock_deltas``). A write takes only the tables it needs and
+    never locks a new row of an earlier table after a later one.
+    """
+    return list(queryset.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+
+def rebuild_stock_balances(company=None):
+    """Recompute StockBalance from Inventory with one grouped query.
+
+    The Inventory rows and then the balances are locked first, in the order
+    every writer takes them, so no concurrent ``apply_stock_deltas`` can
+    land between the aggregate and the rewrite.
+    """
+    inventory = Inventory.objects.all()
+    balances = StockBalance.objects.all()
+    if company is not None:
+        inventory = inventory.filter(location__warehouse__company=company)
+        balances = balances.filter(company=company)
+
+    with transaction.atomic():
+        lock_inventory(inventory)
+        list(balances.select_for_update().order_by('pk').values_list('pk', flat=True))
+        rows = inventory.values(
+            'product_id',
+            'location__warehouse_id',
+            'location__warehouse__company_id'
+        ).annotate(
+            on_hand=Sum('quantity'),
+            reserved=Sum('reserved')
+        ).order_by()
+        balances.delete()
+        StockBalance.objects.bulk_create([
+            StockBalance(
+                company_id=row['location__warehouse__company_id'],
+                product_id=row['product_id'],
+                warehouse_id=row['location__warehouse_id'],
+                on_hand=row['on_hand'],
+                reserved=row['reserved'],
+                available=row['on_hand'] - row['reserved']
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+def _destination_location(warehouse):
+    location = Location.objects.filter(
+        warehouse=warehouse,
+        is_active=True
+    ).order_by('aisle', 'shelf', 'bin', 'pk').first()
+    if location is None:
+        raise TransferError(f'Warehouse {warehouse.name} has no active locations')
+    return location
+
+
+def process_transfer(transfer, user):
+    """Move every TransferItem from the source to the destination warehouse.
+
+    Source stock is locked with one SELECT ... FOR UPDATE, all lines are
+    validated before anything is written, and the result is applied with
+    bulk_update/bulk_create, so the query count does not grow with the
+    number of lines.
+    """
+    with transaction.atomic():
+        transfer = Transfer.objects.select_for_update().select_related(
+            'from_warehouse', 'to_warehouse'
+        ).get(pk=transfer.pk)
+
+        if transfer.status != 'pending':
+            raise TransferError('Transfer has already been processed')
+
+        if transfer.from_warehouse_id == transfer.to_warehouse_id:
+            raise TransferError('Source and destination warehouses must differ')
+
+        # Several lines may reference the same product
+        requested = defaultdict(Decimal)
+        names = {}
+        for item in transfer.items.select_related('product'):
+            requested[item.product_id] += item.quantity
+            names[item.product_id] = item.product.name
+
+        if not requested:
+            raise TransferError('Transfer has no items')
+
+        to_location = _destination_location(transfer.to_warehouse)
+
+        sources = Inventory.objects.filter(
+            product_id__in=requested,
+            location__warehouse=transfer.from_warehouse,
+            quantity__gt=0
+        )
+        destinations = Inventory.objects.filter(product_id__in=requested, location=to_location)
+        lock_inventory(sources | destinations)
+
+        source_rows = defaultdict(list)
+        for row in sources.order_by('product_id', 'expiry_date', 'pk'):
+            source_rows[row.product_id].append(row)
+
+        shortages = [
+            names[product_id]
+            for product_id, quantity in requested.items()
+            if sum((row.quantity - row.reserved for row in source_rows[product_id]), Decimal('0')) < quantity
+        ]
+        if shortages:
+            raise TransferError(
+                f'Not enough stock in {transfer.from_warehouse.name} for: {", ".join(sorted(shortages))}'
+            )
+
+        destination_rows = {(row.product_id, row.batch): row for row in destinations}
+
+        now = timezone.now()
+        company_id = transfer.from_warehouse.company_id
+        changed = {}
+        created = {}
+        movements = []
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+
+        for product_id, quantity in requested.items():
+            remaining = quantity
+            deltas[(product_id, transfer.from_warehouse_id)][0] -= quantity
+            deltas[(product_id, transfer.to_warehouse_id)][0] += quantity
+            for row in source_rows[product_id]:
+                if remaining <= 0:
+                    break
+                take = min(row.quantity - row.reserved, remaining)
+                if take <= 0:
+                    continue
+                remaining -= take
+                row.quantity -= take
+                changed[row.pk] = row
+
+                key = (product_id, row.batch)
+                target = destination_rows.get(key) or created.get(key)
+                if target is None:
+                    target = Inventory(
+                        product_id=product_id,
+                        location=to_location,
+                        batch=row.batch,
+                        expiry_date=row.expiry_date,
+                        quantity=0
+                    )
+                    created[key] = target
+                target.quantity += take
+                if target.pk:
+                    changed[target.pk] = target
+
+                movements.append(StockMovement(
+                    company_id=company_id,
+                    movement_type='transfer',
+                    reference=transfer.reference,
+                    product_id=product_id,
+                    from_location_id=row.location_id,
+                    to_location=to_location,
+                    quantity=take,
+                    batch=row.batch,
+                    expiry_date=row.expiry_date,
+                    date=now,
+                    created_by=user
+                ))
+
+        Inventory.objects.bulk_update(changed.values(), ['quantity'])
+        Inventory.objects.bulk_create(created.values())
+        StockMovement.objects.bulk_create(movements)
+        apply_stock_deltas(company_id, deltas)
+        record_changes(company_id, 'inventory', [row.pk for row in (*changed.values(), *created.values())])
+
+        transfer.status = 'completed'
+        transfer.save(update_fields=['status', 'updated_at'])
+
+    return transfer
+
+
+def receive_purchase_order(order, user, lines=None):
+    """Receive purchase order lines into stock in one transaction.
+
+    ``lines`` is a list of dicts with ``item`` (PurchaseOrderItem id),
+    ``quantity`` and optional ``batch``, ``expiry_date`` and ``location``
+    (overrides the item's destination). ``None`` receives everything that
+    is still outstanding. Returns the number of lines received.
+    """
+    with transaction.atomic():
+        order = PurchaseOrder.objects.select_for_update().get(pk=order.pk)
+        if order.status not in RECEIVABLE_STATUSES:
+            raise ReceiveError(f'Order {order.order_number} is {order.get_status_display().lower()}')
+
+        items = {
+            item.pk: item
+            for item in order.items.select_for_update().select_related('product')
+        }
+
+        if lines is None:
+            lines = [
+                {'item': item.pk, 'quantity': item.quantity - item.received}
+                for item in items.values()
+                if item.received < item.quantity
+            ]
+        lines = [line for line in lines if line.get('quantity')]
+        if not lines:
+            raise ReceiveError('Nothing to receive')
+
+        location_ids = {
+            line.get('location') or items[line['item']].location_id
+            for line in lines
+            if line['item'] in items
+        }
+        locations = Location.objects.filter(
+            warehouse__company_id=order.company_id
+        ).in_bulk(location_ids - {None})
+
+        errors = []
+        outstanding = {pk: item.quantity - item.received for pk, item in items.items()}
+        for line in lines:
+            item = items.get(line['item'])
+            if item is None:
+                errors.append(f'Item {line["item"]} does not belong to order {order.order_number}')
+                continue
+            if line['quantity'] < 0:
+                errors.append(f'{item.product.name}: quantity cannot be negative')
+            elif line['quantity'] > outstanding[item.pk]:
+                errors.append(
+                    f'{item.product.name}: {line["quantity"]} exceeds outstanding {outstanding[item.pk]}'
+                )
+            outstanding[item.pk] -= line['quantity']
+            if (line.get('location') or item.location_id) not in locations:
+                errors.append(f'{item.product.name}: no valid destination location')
+        if errors:
+            raise ReceiveError('; '.join(errors))
+
+        stock = Inventory.objects.filter(
+            product_id__in={items[line['item']].product_id for line in lines},
+            location_id__in=location_ids
+        )
+        lock_inventory(stock)
+        existing = {(row.product_id, row.location_id, row.batch): row for row in stock}
+
+        now = timezone.now()
+        changed_items = {}
+        changed_stock = {}
+        created_stock = {}
+        movements = []
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+
+        for line in lines:
+            item = items[line['item']]
+            location = locations[line.get('location') or item.location_id]
+            batch = line.get('batch') or ''
+            expiry_date = line.get('expiry_date')
+            quantity = line['quantity']
+
+            item.received += quantity
+            changed_items[item.pk] = item
+
+            key = (item.product_id, location.pk, batch)
+            row = existing.get(key) or created_stock.get(key)
+            if row is None:
+                row = Inventory(
+                    product_id=item.product_id,
+                    location=location,
+                    batch=batch,
+                    expiry_date=expiry_date,
+                    quantity=0
+                )
+                created_stock[key] = row
+            row.quantity += quantity
+            if expiry_date and not row.expiry_date:
+                row.expiry_date = expiry_date
+            if row.pk:
+                changed_stock[row.pk] = row
+
+            deltas[(item.product_id, location.warehouse_id)][0] += quantity
+            movements.append(StockMovement(
+                company_id=order.company_id,
+                movement_type='purchase',
+                reference=order.order_number,
+                product_id=item.product_id,
+                to_location=location,
+                quantity=quantity,
+                batch=batch,
+                expiry_date=expiry_date,
+                date=now,
+                created_by=user
+            ))
+
+        PurchaseOrderItem.objects.bulk_update(changed_items.values(), ['received'])
+        Inventory.objects.bulk_update(changed_stock.values(), ['quantity', 'expiry_date'])
+        Inventory.objects.bulk_create(created_stock.values())
+        StockMovement.objects.bulk_create(movements)
+        apply_stock_deltas(order.company_id, deltas)
+        record_changes(
+            order.company_id, 'inventory', [row.pk for row in (*changed_stock.values(), *created_stock.values())]
+        )
+
+        if all(item.received >= item.quantity for item in items.values()):
+            order.status = 'received'
+        else:
+            order.status = 'partial'
+        order.save(update_fields=['status', 'updated_at'])
+
+    return len(lines)
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.tenants.models import Company
+from apps.tenants.numbering import assign_number
+from .changes import record_change
+from .models import Inventory, Location, Product, PurchaseOrder, PurchaseOrderItem, Transfer
+from .scan import product_cache
+from .totals import item_changed
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def evict_scanned_product(sender, instance, **kwargs):
+    # The codes may now point at this product instead of another one
+    product_cache.evict_product(instance.pk, keys=[
+        (instance.company_id, instance.sku),
+        (instance.company_id, instance.barcode),
+    ])
+
+
+def _tenant_deleted(kwargs):
+    # Deleting a company cascades here; its change log is going away too
+    return isinstance(kwargs.get('origin'), Company)
+
+
+@receiver(post_delete, sender=Product)
+def log_product_deleted(sender, instance, **kwargs):
+    if _tenant_deleted(kwargs):
+        return
+    record_change(instance.company_id, 'product', instance.pk, 'deleted')
+
+
+# Location has no updated_at and Inventory is not always saved with a
+# movement, so the change feed reads their edits from the change log
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def log_location_change(sender, instance, **kwargs):
+    if _tenant_deleted(kwargs):
+        return
+    action = 'changed' if 'created' in kwargs else 'deleted'
+    record_change(instance.warehouse.company_id, 'location', instance.pk, action)
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def log_inventory_change(sender, instance, **kwargs):
+    if _tenant_deleted(kwargs):
+        return
+    action = 'changed' if 'created' in kwargs else 'deleted'
+    record_change(_inventory_company_id(instance), 'inventory', instance.pk, action)
+
+
+def _inventory_company_id(instance):
+    # Read the company from whichever relation is already loaded
+    if Inventory.product.is_cached(instance):
+        return instance.product.company_id
+    if Inventory.location.is_cached(instance) and Location.warehouse.is_cached(instance.location):
+        return instance.location.warehouse.company_id
+    return Product.objects.filter(pk=instance.product_id).values_list('company_id', flat=True).get()
+
+
+@receiver(post_save, sender=PurchaseOrderItem)
+@receiver(post_delete, sender=PurchaseOrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    item_changed(sender, instance, **kwargs)
+
+
+@receiver(pre_save, sender=PurchaseOrder)
+def number_purchase_order(sender, instance, raw=False, **kwargs):
+    if not raw:
+        assign_number(instance, 'order_number', 'purchase_order', instance.company_id)
+
+
+@receiver(pre_save, sender=Transfer)
+def number_transfer(sender, instance, raw=False, **kwargs):
+    if not raw:
+        assign_number(instance, 'reference', 'transfer', instance.from_warehouse.company_id)
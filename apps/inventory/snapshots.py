@@ -0,0 +1,192 @@
+"""Periodic closing balances for "stock as of" queries.
+
+A snapshot stores the closing quantity per product/location/batch at a
+period boundary. Each new snapshot is built from the previous one plus
+the movements of a single period, and ``stock_as_of`` starts from the
+nearest snapshot, so neither ever replays the full movement history.
+Balances are derived from StockMovement only.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Location, Product, StockMovement, StockSnapshot, StockSnapshotLine
+
+DEFAULT_PERIOD = getattr(settings, 'STOCK_SNAPSHOT_PERIOD', 'month')
+
+
+def period_start(moment, period=DEFAULT_PERIOD):
+    """Return the start of the period that contains ``moment``."""
+    local = timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'week':
+        local -= timedelta(days=local.weekday())
+    elif period == 'month':
+        local = local.replace(day=1)
+    elif period != 'day':
+        raise ValueError(f'Unknown snapshot period: {period}')
+    return timezone.make_aware(local.replace(tzinfo=None))
+
+
+def next_period_start(moment, period=DEFAULT_PERIOD):
+    start = timezone.localtime(period_start(moment, period))
+    if period == 'day':
+        start += timedelta(days=1)
+    elif period == 'week':
+        start += timedelta(days=7)
+    else:
+        start = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(start.replace(tzinfo=None))
+
+
+def parse_moment(value):
+    """Parse a date or datetime string; a bare date means the end of that day."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.combine(day, time.max)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _replay(balances, movements):
+    """Apply movements to ``balances`` using two grouped queries."""
+    incoming = movements.filter(to_location__isnull=False).values(
+        'product_id', 'to_location_id', 'batch'
+    ).annotate(total=Sum('quantity')).order_by()
+    for row in incoming:
+        balances[(row['product_id'], row['to_location_id'], row['batch'])] += row['total']
+
+    outgoing = movements.filter(from_location__isnull=False).values(
+        'product_id', 'from_location_id', 'batch'
+    ).annotate(total=Sum('quantity')).order_by()
+    for row in outgoing:
+        balances[(row['product_id'], row['from_location_id'], row['batch'])] -= row['total']
+
+    return balances
+
+
+def _load(snapshot, product_ids=None, location_ids=None):
+    balances = defaultdict(Decimal)
+    if snapshot is None:
+        return balances
+    lines = snapshot.lines.all()
+    if product_ids is not None:
+        lines = lines.filter(product_id__in=product_ids)
+    if location_ids is not None:
+        lines = lines.filter(location_id__in=location_ids)
+    for product_id, location_id, batch, quantity in lines.values_list(
+        'product_id', 'location_id', 'batch', 'quantity'
+    ).iterator(chunk_size=5000):
+        balances[(product_id, location_id, batch)] = quantity
+    return balances
+
+
+def take_snapshot(company, period_end, period=DEFAULT_PERIOD):
+    """Write the closing balances at ``period_end`` starting from the previous snapshot."""
+    previous = StockSnapshot.objects.filter(
+        company=company,
+        period_end__lt=period_end
+    ).order_by('-period_end').first()
+
+    movements = StockMovement.objects.filter(company=company, date__lt=period_end)
+    if previous is not None:
+        movements = movements.filter(date__gte=previous.period_end)
+
+    balances = _replay(_load(previous), movements)
+
+    with transaction.atomic():
+        snapshot = StockSnapshot.objects.create(
+            company=company,
+            period=period,
+            period_end=period_end
+        )
+        StockSnapshotLine.objects.bulk_create([
+            StockSnapshotLine(
+                snapshot=snapshot,
+                product_id=product_id,
+                location_id=location_id,
+                batch=batch,
+                quantity=quantity
+            )
+            for (product_id, location_id, batch), quantity in balances.items()
+            if quantity
+        ], batch_size=1000)
+    return snapshot
+
+
+def take_due_snapshots(company, period=DEFAULT_PERIOD, until=None):
+    """Create every snapshot missing between the latest one and ``until``."""
+    boundary = period_start(until or timezone.now(), period)
+
+    latest = StockSnapshot.objects.filter(company=company).order_by('-period_end').first()
+    if latest is not None:
+        current = next_period_start(latest.period_end, period)
+    else:
+        first = StockMovement.objects.filter(company=company).order_by('date').first()
+        if first is None:
+            return []
+        current = next_period_start(first.date, period)
+
+    created = []
+    while current <= boundary:
+        created.append(take_snapshot(company, current, period))
+        current = next_period_start(current, period)
+    return created
+
+
+def stock_as_of(company, moment, product_ids=None, location_ids=None):
+    """Return ``{(product_id, location_id, batch): quantity}`` at ``moment``.
+
+    Starts from the latest snapshot taken at or before ``moment`` and
+    replays only the movements recorded after it.
+    """
+    snapshot = StockSnapshot.objects.filter(
+        company=company,
+        period_end__lte=moment
+    ).order_by('-period_end').first()
+
+    movements = StockMovement.objects.filter(company=company, date__lte=moment)
+    if snapshot is not None:
+        movements = movements.filter(date__gte=snapshot.period_end)
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+
+    balances = _replay(_load(snapshot, product_ids, location_ids), movements)
+    if location_ids is not None:
+        location_ids = set(location_ids)
+        balances = {key: value for key, value in balances.items() if key[1] in location_ids}
+    return {key: value for key, value in balances.items() if value}
+
+
+def stock_as_of_rows(company, moment, product_ids=None, location_ids=None):
+    """``stock_as_of`` flattened into dicts with product and location names."""
+    balances = stock_as_of(company, moment, product_ids, location_ids)
+    products = Product.objects.in_bulk({key[0] for key in balances})
+    locations = Location.objects.select_related('warehouse').in_bulk({key[1] for key in balances})
+
+    rows = []
+    for (product_id, location_id, batch), quantity in balances.items():
+        product = products[product_id]
+        location = locations[location_id]
+        rows.append({
+            'product': product_id,
+            'product_name': product.name,
+            'product_sku': product.sku,
+            'location': location_id,
+            'location_name': location.name,
+            'warehouse': location.warehouse_id,
+            'warehouse_name': location.warehouse.name,
+            'batch': batch,
+            'quantity': quantity,
+        })
+    rows.sort(key=lambda row: (row['product_name'], row['warehouse_name'], row['location_name'], row['batch']))
+    return rows
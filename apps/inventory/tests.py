@@ -0,0 +1,84 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.inventory.changes import (
+    RETENTION, CheckpointExpired, changes_since, encode_checkpoint, prune_change_log, record_changes
+)
+from apps.inventory.management.fixtures import seed_products, seed_stock, seed_tenant, seed_warehouse
+from apps.inventory.models import ChangeLog, Inventory, StockMovement
+from apps.inventory.query_plans import HOT_QUERIES, build_context, explain, full_scans
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.reservations import reserve_order
+
+
+class QueryPlanTests(TestCase):
+    """Every registered hot query is answered from its index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company, user = seed_tenant()
+        warehouse, locations = seed_warehouse(company, locations=20)
+        products = seed_products(company, 200)
+        seed_stock(products, locations, quantity=Decimal('50'))
+        customer = seed_customer(company)
+        orders = seed_sales_orders(company, user, customer, products, orders=20, lines=5)
+
+        now = timezone.now()
+        types = [choice for choice, _ in StockMovement.MOVEMENT_TYPES]
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                company=company,
+                movement_type=types[i % len(types)],
+                product=products[i % len(products)],
+                to_location=locations[i % len(locations)],
+                quantity=Decimal('1'),
+                date=now - timedelta(hours=i),
+                created_by=user
+            )
+            for i in range(2000)
+        ], batch_size=1000)
+
+        cls.ctx = build_context(company, warehouse, locations[0], products, orders)
+
+    def test_hot_queries_use_their_index(self):
+        for name, table, index, build in HOT_QUERIES:
+            with self.subTest(name):
+                plan = explain(build(self.ctx))
+                self.assertEqual(full_scans(plan, table), [])
+                self.assertIn(index, '\n'.join(plan))
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.company, self.user = seed_tenant()
+        _, locations = seed_warehouse(self.company)
+        self.products = seed_products(self.company, 2)
+        seed_stock(self.products, locations)
+        self.checkpoint = encode_checkpoint(timezone.now())
+
+    def test_reservations_appear_in_the_feed(self):
+        order = seed_sales_orders(self.company, self.user, seed_customer(self.company), self.products[:1])[0]
+        reserve_order(order)
+
+        _, feed = changes_since(self.company, self.checkpoint)
+
+        self.assertEqual(
+            list(feed['inventory'][0].values_list('product_id', flat=True)),
+            [self.products[0].pk]
+        )
+
+    def test_checkpoint_older_than_retention_expires(self):
+        with self.assertRaises(CheckpointExpired):
+            changes_since(self.company, encode_checkpoint(timezone.now() - RETENTION - timedelta(hours=1)))
+
+    def test_prune_keeps_entries_within_retention(self):
+        row = Inventory.objects.filter(product=self.products[0]).get()
+        record_changes(self.company.pk, 'inventory', [row.pk])
+        ChangeLog.objects.update(changed_at=timezone.now() - RETENTION - timedelta(days=1))
+        record_changes(self.company.pk, 'inventory', [row.pk])
+
+        self.assertEqual(prune_change_log(), 1)
+        self.assertEqual(ChangeLog.objects.count(), 1)
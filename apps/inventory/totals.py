@@ -0,0 +1,91 @@
+"""Stored net/tax/gross totals and line counts on sales and purchase orders.
+
+Item saves and deletes recompute their order through signal handlers;
+bulk writers (``bulk_create``/``bulk_update``, which send no signals)
+call ``recompute_totals`` themselves. Recomputing is one grouped
+aggregate over the items plus one ``bulk_update`` for any number of
+orders, which is also what ``manage.py recompute_order_totals`` runs.
+Orders whose gross total moved are announced through ``totals_changed``.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.dispatch import Signal
+from django.utils import timezone
+
+TOTAL_FIELDS = ['net_total', 'tax_total', 'gross_total', 'line_count', 'updated_at']
+# Item fields that feed the totals; saves touching only others are ignored
+PRICED_FIELDS = {'order', 'order_id', 'quantity', 'unit_price', 'tax_rate'}
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0')
+
+# Sent with ``changes=[(order_id, old_gross, new_gross)]`` after a recompute
+totals_changed = Signal()
+
+
+def _money(expression):
+    return ExpressionWrapper(expression, output_field=DecimalField(max_digits=18, decimal_places=6))
+
+
+def line_totals(items):
+    """``{order_id: (net, tax, lines)}`` for the given item queryset."""
+    rows = items.order_by().values('order_id').annotate(
+        net=Sum(_money(F('quantity') * F('unit_price'))),
+        tax=Sum(_money(F('quantity') * F('unit_price') * F('tax_rate') / 100)),
+        lines=Count('pk')
+    )
+    return {row['order_id']: (row['net'] or ZERO, row['tax'] or ZERO, row['lines']) for row in rows}
+
+
+def recompute_totals(order_model, order_ids=None, company=None, batch_size=1000):
+    """Recompute stored totals for ``order_ids`` (all orders when ``None``),
+    optionally limited to ``company``.
+
+    Returns the number of orders whose totals changed.
+    """
+    item_model = order_model._meta.get_field('items').related_model
+    orders = order_model.objects.all()
+    items = item_model.objects.all()
+    if order_ids is not None:
+        order_ids = set(order_ids)
+        if not order_ids:
+            return 0
+        orders = orders.filter(pk__in=order_ids)
+        items = items.filter(order_id__in=order_ids)
+    if company is not None:
+        orders = orders.filter(company=company)
+        items = items.filter(order__company=company)
+
+    totals = line_totals(items)
+    now = timezone.now()
+    changed = []
+    gross_changes = []
+    for order in orders.only('pk', *TOTAL_FIELDS).iterator(chunk_size=batch_size):
+        net, tax, lines = totals.get(order.pk, (ZERO, ZERO, 0))
+        net, tax = net.quantize(CENT), tax.quantize(CENT)
+        values = (net, tax, net + tax, lines)
+        if values == (order.net_total, order.tax_total, order.gross_total, order.line_count):
+            continue
+        if net + tax != order.gross_total:
+            gross_changes.append((order.pk, order.gross_total, net + tax))
+        order.net_total, order.tax_total, order.gross_total, order.line_count = values
+        order.updated_at = now
+        changed.append(order)
+
+    order_model.objects.bulk_update(changed, TOTAL_FIELDS, batch_size=batch_size)
+    if gross_changes:
+        totals_changed.send(sender=order_model, changes=gross_changes)
+    return len(changed)
+
+
+def item_changed(sender, instance, **kwargs):
+    """``post_save``/``post_delete`` handler for order item models."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not PRICED_FIELDS & set(update_fields):
+        return
+    order_model = sender._meta.get_field('order').related_model
+    # Cascading from the order (or its company): nothing left to total
+    if isinstance(kwargs.get('origin'), (order_model, order_model._meta.get_field('company').related_model)):
+        return
+    recompute_totals(order_model, [instance.order_id])
@@ -8,11 +8,18 @@ from .models import (
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import DetailView
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import F  # Добавьте этот импорт в начале файла
+from django.utils import timezone
 from django.views.generic import ListView, CreateView, DetailView
 from django.urls import reverse_lazy
-from .models import Transfer, StockMovement
-from .forms import TransferForm
+from .models import Transfer, TransferItem, StockMovement, StockBalance
+from .conditional import ConditionalDetailMixin, Fingerprint
+from .forms import PurchaseReceiveForm, TransferForm
+from .services import (
+    ReceiveError, TransferError, apply_stock_deltas, process_transfer,
+    receive_purchase_order
+)
 
 
 class TransferListView(ListView):
@@ -42,10 +49,11 @@ class TransferCreateView(CreateView):
         return super().form_valid(form)
 
 
-class TransferDetailView(DetailView):
+class TransferDetailView(ConditionalDetailMixin, DetailView):
     model = Transfer
     template_name = 'inventory/transfer_detail.html'
     context_object_name = 'transfer'
+    conditional_related = (lambda pk: Fingerprint(TransferItem.objects.filter(transfer_id=pk)),)
 
 
 class TransferProcessView(DetailView):
@@ -55,50 +63,12 @@ class TransferProcessView(DetailView):
     def post(self, request, *args, **kwargs):
         transfer = self.get_object()
 
-        if transfer.status != 'pending':
-            messages.warning(request, 'Transfer has already been processed')
+        try:
+            process_transfer(transfer, request.user)
+        except TransferError as exc:
+            messages.error(request, str(exc))
             return redirect('transfer_detail', pk=transfer.pk)
 
-        # Обработка перемещения товаров
-        for item in transfer.items.all():
-            # Проверка наличия товара на исходном складе
-            from_inventory = Inventory.objects.filter(
-                product=item.product,
-                location__warehouse=transfer.from_warehouse
-            ).first()
-
-            if not from_inventory or from_inventory.quantity < item.quantity:
-                messages.error(request,
-                               f'Not enough stock for {item.product.name} in {transfer.from_warehouse.name}')
-                return redirect('transfer_detail', pk=transfer.pk)
-
-            # Списание с исходного склада
-            from_inventory.quantity -= item.quantity
-            from_inventory.save()
-
-            # Поступление на целевой склад
-            to_inventory, created = Inventory.objects.get_or_create(
-                product=item.product,
-                location__warehouse=transfer.to_warehouse,
-                defaults={'quantity': 0}
-            )
-            to_inventory.quantity += item.quantity
-            to_inventory.save()
-
-            # Запись движения товара
-            StockMovement.objects.create(
-                product=item.product,
-                from_location=from_inventory.location,
-                to_location=to_inventory.location,
-                quantity=item.quantity,
-                movement_type='transfer',
-                reference=transfer.reference,
-                created_by=request.user
-            )
-
-        transfer.status = 'completed'
-        transfer.save()
-
         messages.success(request, 'Transfer processed successfully')
         return redirect('transfer_detail', pk=transfer.pk)
 
@@ -134,9 +104,13 @@ class WarehouseCreateView(CreateView):
     success_url = reverse_lazy('warehouse_list')
 
 
-class WarehouseDetailView(DetailView):
+class WarehouseDetailView(ConditionalDetailMixin, DetailView):
     model = Warehouse
     template_name = 'inventory/warehouse_detail.html'
+    conditional_related = (
+        lambda pk: StockBalance.objects.filter(warehouse_id=pk),
+        lambda pk: Fingerprint(Location.objects.filter(warehouse_id=pk)),
+    )
 
 
 class WarehouseUpdateView(UpdateView):
@@ -186,9 +160,14 @@ class ProductCreateView(CreateView):
     success_url = reverse_lazy('product_list')
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalDetailMixin, DetailView):
     model = Product
     template_name = 'inventory/product_detail.html'
+    conditional_related = (
+        lambda pk: StockBalance.objects.filter(product_id=pk),
+        lambda pk: ProductCategory.objects.filter(products=pk),
+        lambda pk: Fingerprint(Inventory.objects.filter(product_id=pk)),
+    )
 
 
 class ProductUpdateView(UpdateView):
@@ -286,24 +265,32 @@ class InventoryAdjustView(FormView):
         adjustment = form.cleaned_data['adjustment']
         notes = form.cleaned_data['notes']
 
-        inventory, created = Inventory.objects.get_or_create(
-            product=product,
-            location=location,
-            defaults={'quantity': 0}
-        )
-
-        inventory.quantity += adjustment
-        inventory.save()
-
-        StockMovement.objects.create(
-            product=product,
-            from_location=location if adjustment < 0 else None,
-            to_location=location if adjustment > 0 else None,
-            quantity=abs(adjustment),
-            movement_type='adjustment',
-            notes=notes,
-            created_by=self.request.user
-        )
+        with transaction.atomic():
+            inventory, created = Inventory.objects.select_for_update().get_or_create(
+                product=product,
+                location=location,
+                batch='',
+                defaults={'quantity': 0}
+            )
+
+            inventory.quantity += adjustment
+            inventory.save()
+
+            StockMovement.objects.create(
+                company=self.request.user.company,
+                product=product,
+                from_location=location if adjustment < 0 else None,
+                to_location=location if adjustment > 0 else None,
+                quantity=abs(adjustment),
+                movement_type='adjustment',
+                notes=notes,
+                date=timezone.now(),
+                created_by=self.request.user
+            )
+
+            apply_stock_deltas(self.request.user.company_id, {
+                (product.pk, location.warehouse_id): (adjustment, 0)
+            })
 
         return super().form_valid(form)
 
@@ -312,42 +299,34 @@ class PurchaseReceiveView(DetailView):
     model = PurchaseOrder
     template_name = 'inventory/purchase_receive.html'
 
+    def get_form(self, data=None):
+        items = self.object.items.filter(
+            received__lt=F('quantity')
+        ).select_related('product', 'location').order_by('pk')
+        return PurchaseReceiveForm(data, items=list(items))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('form', self.get_form())
+        return context
+
     def post(self, request, *args, **kwargs):
-        order = self.get_object()
+        self.object = order = self.get_object()
 
         # Проверяем, что заказ не был уже полностью получен
         if order.status == 'received':
             messages.warning(request, 'This order has already been fully received')
             return redirect('purchase_detail', pk=order.pk)
 
-        # Получаем все неполученные позиции заказа
-        items_to_receive = order.items.filter(received__lt=F('quantity'))
-
-        if not items_to_receive.exists():
-            messages.warning(request, 'All items have already been received')
-            return redirect('purchase_detail', pk=order.pk)
-
-        # Помечаем позиции как полученные
-        for item in items_to_receive:
-            item.received = item.quantity
-            item.save()
-
-            # Создаем движение товара на склад
-            StockMovement.objects.create(
-                product=item.product,
-                to_location=item.location,
-                quantity=item.quantity,
-                movement_type='purchase',
-                reference=order.order_number,
-                created_by=request.user
-            )
+        form = self.get_form(request.POST)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
 
-        # Обновляем статус заказа
-        if order.items.filter(received__lt=F('quantity')).exists():
-            order.status = 'partial'
-        else:
-            order.status = 'received'
-        order.save()
+        try:
+            received = receive_purchase_order(order, request.user, form.get_lines())
+        except ReceiveError as exc:
+            messages.error(request, str(exc))
+            return self.render_to_response(self.get_context_data(form=form))
 
-        messages.success(request, 'Items have been successfully received')
-        return redirect('purchase_detail', pk=order.pk)
\ No newline at end of file
+        messages.success(request, f'{received} line(s) have been successfully received')
+        return redirect('purchase_detail', pk=order.pk)
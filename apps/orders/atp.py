@@ -0,0 +1,170 @@
+"""Time-phased available-to-promise (ATP).
+
+For each product the timeline starts with today's on-hand stock (expired
+batches excluded), adds open purchase order quantities on their expected
+delivery date and subtracts open sales order quantities on their expected
+shipment date. Past-due and undated sales demand lands on today;
+purchase lines without a delivery date cannot be promised and are only
+reported. ``projected`` is the running balance and ``atp`` the quantity
+that can still be promised on a date without starving a later order,
+i.e. the minimum projected balance from that date on.
+
+Timelines for any number of products come from three grouped queries;
+the running sums are ``itertools.accumulate`` over per-date buckets.
+Single-product answers are served from an in-process LRU cache that
+order, item and stock changes evict (after commit) for just the products
+they touch, so the next lookup rebuilds only those. Evictions reach the
+current process only; ``ATP_CACHE_TTL`` bounds how stale another
+worker's cache can get.
+"""
+import time
+from collections import defaultdict
+from decimal import Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from apps.inventory.models import Inventory, PurchaseOrderItem
+from apps.inventory.scan import LRUCache
+from .models import SalesOrderItem
+
+SUPPLY_STATUSES = ('approved', 'ordered', 'partial')
+DEMAND_STATUSES = ('confirmed', 'processing', 'partial')
+
+ZERO = Decimal('0.00')
+
+atp_cache = LRUCache(getattr(settings, 'ATP_CACHE_SIZE', 10000))
+
+
+def _on_hand(company_id, product_ids, today):
+    return dict(Inventory.objects.filter(
+        Q(expiry_date__isnull=True) | Q(expiry_date__gte=today),
+        product__company_id=company_id,
+        product_id__in=product_ids
+    ).values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total').order_by())
+
+
+def _supply(company_id, product_ids):
+    return PurchaseOrderItem.objects.filter(
+        order__company_id=company_id,
+        order__status__in=SUPPLY_STATUSES,
+        product_id__in=product_ids,
+        received__lt=F('quantity')
+    ).values('product_id', day=F('order__expected_delivery')).annotate(
+        total=Sum(F('quantity') - F('received'))
+    ).values_list('product_id', 'day', 'total').order_by()
+
+
+def _demand(company_id, product_ids):
+    return SalesOrderItem.objects.filter(
+        order__company_id=company_id,
+        order__status__in=DEMAND_STATUSES,
+        product_id__in=product_ids,
+        shipped__lt=F('quantity')
+    ).values('product_id', day=F('order__expected_shipment')).annotate(
+        total=Sum(F('quantity') - F('shipped'))
+    ).values_list('product_id', 'day', 'total').order_by()
+
+
+def timeline(product_id, on_hand, supply, demand, today, undated_supply=ZERO):
+    """Build one product's timeline from ``{date: quantity}`` supply and demand."""
+    days = sorted(set(supply) | set(demand) | {today})
+    receipts = [supply.get(day, ZERO) for day in days]
+    issues = [demand.get(day, ZERO) for day in days]
+    projected = [
+        on_hand + received - issued
+        for received, issued in zip(accumulate(receipts), accumulate(issues))
+    ]
+    promisable = list(accumulate(reversed(projected), min))[::-1]
+    return {
+        'id': product_id,
+        'today': today,
+        'built': time.monotonic(),
+        'on_hand': on_hand,
+        'undated_supply': undated_supply,
+        'days': days,
+        'supply': receipts,
+        'demand': issues,
+        'projected': projected,
+        'atp': promisable,
+    }
+
+
+def build_timelines(company_id, product_ids, today=None):
+    """``{product_id: timeline}`` for ``product_ids`` with three grouped queries."""
+    product_ids = set(product_ids)
+    today = today or timezone.localdate()
+    supply = defaultdict(lambda: defaultdict(Decimal))
+    demand = defaultdict(lambda: defaultdict(Decimal))
+    undated = defaultdict(Decimal)
+
+    for product_id, day, total in _supply(company_id, product_ids):
+        if day is None:
+            undated[product_id] += total
+        else:
+            supply[product_id][max(day, today)] += total
+    for product_id, day, total in _demand(company_id, product_ids):
+        demand[product_id][max(day or today, today)] += total
+    on_hand = _on_hand(company_id, product_ids, today)
+
+    return {
+        product_id: timeline(
+            product_id,
+            on_hand.get(product_id) or ZERO,
+            supply.get(product_id, {}),
+            demand.get(product_id, {}),
+            today,
+            undated.get(product_id, ZERO)
+        )
+        for product_id in product_ids
+    }
+
+
+def _fresh(entry, today):
+    ttl = getattr(settings, 'ATP_CACHE_TTL', 300)
+    return entry is not None and entry['today'] == today and time.monotonic() - entry['built'] < ttl
+
+
+def atp_timelines(company_id, product_ids):
+    """Cached timelines; only missing or stale products are rebuilt, in one batch."""
+    today = timezone.localdate()
+    result, missing = {}, set()
+    for product_id in set(product_ids):
+        entry = atp_cache.get((company_id, product_id))
+        if _fresh(entry, today):
+            result[product_id] = entry
+        else:
+            missing.add(product_id)
+    if missing:
+        for product_id, entry in build_timelines(company_id, missing, today).items():
+            atp_cache.set((company_id, product_id), entry)
+            result[product_id] = entry
+    return result
+
+
+def atp_timeline(company_id, product_id):
+    return atp_timelines(company_id, [product_id])[product_id]
+
+
+def available_on(entry, quantity):
+    """Earliest day ``quantity`` can be promised, or ``None`` if it never can."""
+    for day, promisable in zip(entry['days'], entry['atp']):
+        if promisable >= quantity:
+            return day
+    return None
+
+
+def invalidate(product_ids):
+    """Evict ``product_ids`` once the current transaction commits."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    def evict():
+        for product_id in product_ids:
+            atp_cache.evict_product(product_id)
+
+    transaction.on_commit(evict)
@@ -0,0 +1,202 @@
+"""Customer credit exposure: the gross total of a customer's open orders.
+
+``Customer.credit_exposure`` is maintained incrementally instead of being
+summed at every confirmation. An order counts towards it while its status
+is in ``EXPOSURE_STATUSES``, from confirmation until it is completed or
+cancelled. Each change adds the difference between the order's new and
+old contribution with an ``F()`` update:
+
+- order saves and deletes go through signal handlers, which compare the
+  saved values with those the instance was loaded with;
+- stored totals recomputed in bulk arrive through ``totals_changed``;
+- bulk status changes call ``change_status``.
+
+``check_credit`` is then a comparison against one customer row. Writes
+check under a lock of that row (``check_order_credit``, ``credit_guard``),
+so concurrent orders for one customer cannot both pass against the same
+exposure. The orders are locked before their customers, the order every
+writer follows (see ``apps.inventory.services.lock_inventory``).
+``manage.py reconcile_credit_exposure`` rebuilds every figure with one
+grouped query and reports drift.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+
+from .models import Customer, SalesOrder
+
+EXPOSURE_STATUSES = ('confirmed', 'processing', 'partial', 'shipped', 'invoiced')
+CREDIT_FIELDS = {'customer', 'customer_id', 'status', 'gross_total'}
+
+ZERO = Decimal('0.00')
+
+
+class CreditLimitError(Exception):
+    pass
+
+
+def contribution(status, gross_total):
+    return gross_total if status in EXPOSURE_STATUSES else ZERO
+
+
+def order_state(order):
+    """``(customer_id, status, gross_total)`` as loaded, or ``None`` when deferred."""
+    values = order.__dict__
+    if 'customer_id' not in values or 'status' not in values or 'gross_total' not in values:
+        return None
+    return values['customer_id'], values['status'], values['gross_total']
+
+
+def apply_exposure_deltas(deltas):
+    """Add ``{customer_id: delta}`` to the stored exposures in one UPDATE."""
+    deltas = {customer_id: delta for customer_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Customer.objects.filter(pk__in=deltas).update(credit_exposure=F('credit_exposure') + Case(
+        *[When(pk=customer_id, then=Value(delta)) for customer_id, delta in deltas.items()],
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    ))
+
+
+def order_saved(order, created, update_fields=None):
+    old, new = getattr(order, '_credit_state', None), order_state(order)
+    order._credit_state = new
+    if update_fields and not CREDIT_FIELDS & set(update_fields):
+        return
+    if created:
+        old = None
+    elif old is None or new is None:
+        # Loaded with deferred fields: the previous contribution is unknown
+        rebuild_exposures(customer_ids={order.customer_id})
+        return
+
+    deltas = defaultdict(Decimal)
+    if old is not None:
+        deltas[old[0]] -= contribution(old[1], old[2])
+    deltas[new[0]] += contribution(new[1], new[2])
+    apply_exposure_deltas(deltas)
+
+
+def order_deleted(order):
+    state = getattr(order, '_credit_state', None) or order_state(order)
+    if state is not None:
+        apply_exposure_deltas({state[0]: -contribution(state[1], state[2])})
+
+
+def totals_recomputed(changes):
+    """``totals_changed`` handler: ``changes`` is ``[(order_id, old_gross, new_gross)]``."""
+    changes = {order_id: new - old for order_id, old, new in changes}
+    deltas = defaultdict(Decimal)
+    for order_id, customer_id in SalesOrder.objects.filter(
+        pk__in=changes,
+        status__in=EXPOSURE_STATUSES
+    ).values_list('pk', 'customer_id'):
+        deltas[customer_id] += changes[order_id]
+    apply_exposure_deltas(deltas)
+
+
+def change_status(orders, status, **fields):
+    """``orders.update(status=status, **fields)`` keeping exposures in step."""
+    deltas = defaultdict(Decimal)
+    rows = list(orders.values_list('pk', 'customer_id', 'status', 'gross_total'))
+    for _, customer_id, old_status, gross_total in rows:
+        deltas[customer_id] += contribution(status, gross_total) - contribution(old_status, gross_total)
+    updated = SalesOrder.objects.filter(pk__in=[row[0] for row in rows]).update(status=status, **fields)
+    apply_exposure_deltas(deltas)
+    return updated
+
+
+def credit_increase(order, status, customer=None):
+    """Exposure ``customer`` would gain if ``order`` moved to ``status``.
+
+    Compared with the values ``order`` was loaded with, so forms and
+    serializers may already have assigned the new ones.
+    """
+    customer_id = customer.pk if customer is not None else order.customer_id
+    state = getattr(order, '_credit_state', None) if order.pk else None
+    added = contribution(status, order.gross_total)
+    if state is not None and state[0] == customer_id:
+        added -= contribution(state[1], state[2])
+    return added
+
+
+def check_credit(customer, amount):
+    """Raise CreditLimitError if ``amount`` more would exceed the customer's limit."""
+    if amount <= 0 or customer.credit_limit is None:
+        return
+    if customer.credit_exposure + amount > customer.credit_limit:
+        raise CreditLimitError(
+            f'{customer.name}: open orders {customer.credit_exposure} + {amount} '
+            f'exceed the credit limit of {customer.credit_limit}'
+        )
+
+
+def lock_orders(order_ids):
+    """Lock the orders, then their customers, each in primary key order.
+
+    Returns the locked customers.
+    """
+    list(SalesOrder.objects.select_for_update().filter(pk__in=order_ids).order_by('pk').values_list('pk', flat=True))
+    return list(Customer.objects.select_for_update().filter(
+        pk__in=SalesOrder.objects.filter(pk__in=order_ids).values('customer_id')
+    ).order_by('pk'))
+
+
+def check_order_credit(order, status=None, customer=None):
+    """``check_credit`` for ``order`` moving to ``status`` (default: its
+    current one) with the order and then the customer row locked; call
+    inside the transaction that saves the order. Returns the locked customer.
+    """
+    customer_id = customer.pk if customer is not None else order.customer_id
+    if order.pk:
+        lock_orders([order.pk])
+    locked = Customer.objects.select_for_update().get(pk=customer_id)
+    check_credit(locked, credit_increase(order, order.status if status is None else status, locked))
+    return locked
+
+
+@contextmanager
+def credit_guard(order_ids):
+    """Lock ``order_ids`` and their customers around a write that changes the
+    exposure indirectly (item writes recomputing the totals) and raise
+    CreditLimitError on exit for any customer whose exposure grew past the
+    limit. Use inside the write's transaction.
+    """
+    customers = lock_orders(order_ids)
+    customer_ids = [customer.pk for customer in customers]
+    yield
+    exposures = dict(Customer.objects.filter(pk__in=customer_ids).values_list('pk', 'credit_exposure'))
+    for customer in customers:
+        check_credit(customer, exposures[customer.pk] - customer.credit_exposure)
+
+
+def rebuild_exposures(company=None, customer_ids=None, fix=True):
+    """Recompute exposures from the orders with one grouped query.
+
+    Returns ``[(customer, stored, actual)]`` for every customer whose stored
+    figure was off; those are corrected unless ``fix`` is false.
+    """
+    orders = SalesOrder.objects.filter(status__in=EXPOSURE_STATUSES)
+    customers = Customer.objects.all()
+    if company is not None:
+        orders = orders.filter(company=company)
+        customers = customers.filter(company=company)
+    if customer_ids is not None:
+        orders = orders.filter(customer_id__in=customer_ids)
+        customers = customers.filter(pk__in=customer_ids)
+
+    actual = dict(
+        orders.values('customer_id').annotate(total=Sum('gross_total')).values_list('customer_id', 'total').order_by()
+    )
+    drift = []
+    for customer in customers.only('pk', 'company_id', 'name', 'code', 'credit_exposure').iterator(chunk_size=1000):
+        total = actual.get(customer.pk) or ZERO
+        if total != customer.credit_exposure:
+            drift.append((customer, customer.credit_exposure, total))
+            customer.credit_exposure = total
+
+    if fix:
+        Customer.objects.bulk_update([customer for customer, _, _ in drift], ['credit_exposure'], batch_size=1000)
+    return drift
@@ -1,4 +1,5 @@
 from django import forms
+from .credit import CreditLimitError, check_credit, credit_increase
 from .models import Customer, SalesOrder, Shipment
 
 class CustomerForm(forms.ModelForm):
@@ -12,7 +13,7 @@ class SalesOrderForm(forms.ModelForm):
     class Meta:
         model = SalesOrder
         fields = ['order_number', 'customer', 'status', 'order_date',
-                 'expected_shipment', 'shipping_address', 'notes']
+                 'expected_shipment', 'shipping_address', 'carrier', 'notes']
 
     def __init__(self, *args, **kwargs):
         company = kwargs.pop('company', None)
@@ -20,6 +21,16 @@ class SalesOrderForm(forms.ModelForm):
         if company:
             self.fields['customer'].queryset = Customer.objects.filter(company=company)
 
+    def clean(self):
+        cleaned_data = super().clean()
+        customer, status = cleaned_data.get('customer'), cleaned_data.get('status')
+        if customer and status:
+            try:
+                check_credit(customer, credit_increase(self.instance, status, customer))
+            except CreditLimitError as exc:
+                self.add_error('status', str(exc))
+        return cleaned_data
+
 class ShipmentForm(forms.ModelForm):
     class Meta:
         model = Shipment
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.inventory.models import Inventory
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.reservations import ALLOCATION_ORDER, allocate_order
+
+
+class Command(BaseCommand):
+    help = (
+        'Allocate orders of increasing size (every line split over two batches) '
+        'and report time and queries per order (data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', nargs='+', type=int, default=[10, 100, 500, 2000])
+        parser.add_argument('--strategy', choices=sorted(ALLOCATION_ORDER), default='fefo')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=20)
+        # Each order gets its own products so earlier runs do not drain later ones
+        products = seed_products(company, sum(options['lines']))
+        # Two batches per product in different locations, the later one
+        # expiring first, so FEFO and FIFO pick them in opposite order
+        seed_stock(products, locations, quantity=Decimal('2'))
+        seed_stock(products, locations[1:] + locations[:1], quantity=Decimal('2'))
+        today = timezone.localdate()
+        Inventory.objects.filter(product__company=company).update(expiry_date=today + timedelta(days=90))
+        Inventory.objects.filter(
+            product__company=company,
+            location__in=locations[1:] + locations[:1]
+        ).update(expiry_date=today + timedelta(days=30))
+        customer = seed_customer(company)
+
+        self.stdout.write(f'{"lines":>8} {"ms":>10} {"ms/line":>9} {"queries":>9} {"reservations":>13}')
+        offset = 0
+        for lines in options['lines']:
+            order = seed_sales_orders(
+                company, user, customer, products[offset:offset + lines],
+                lines=lines, quantity=Decimal('3')
+            )[0]
+            offset += lines
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                reservations = allocate_order(order, options['strategy'])
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{lines:>8} {elapsed * 1000:>10.1f} {elapsed * 1000 / lines:>9.3f} '
+                f'{len(ctx.captured_queries):>9} {len(reservations):>13}'
+            )
@@ -0,0 +1,109 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.inventory.models import PurchaseOrder, PurchaseOrderItem, Supplier
+from apps.orders.atp import atp_cache, atp_timeline, build_timelines
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder
+
+DAYS = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Build ATP timelines for many products with open purchase and sales '
+        'orders spread over a month, then time cold and cached single-SKU '
+        'lookups (data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=1000, help='Sales and purchase orders each')
+        parser.add_argument('--lines', type=int, default=5, help='Lines per order')
+        parser.add_argument('--lookups', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=100)
+        products = seed_products(company, options['products'])
+        seed_stock(products, locations, quantity=Decimal('20'))
+        today = timezone.localdate()
+
+        customer = seed_customer(company)
+        orders = seed_sales_orders(
+            company, user, customer, products,
+            orders=options['orders'], lines=options['lines'], quantity=Decimal('3')
+        )
+        for day in range(DAYS):
+            SalesOrder.objects.filter(pk__in=[order.pk for order in orders[day::DAYS]]).update(
+                expected_shipment=today + timedelta(days=day)
+            )
+
+        tag = uuid.uuid4().hex[:8]
+        supplier = Supplier.objects.create(company=company, name=f'Bench {tag}', code=f'S{tag}')
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                company=company,
+                order_number=f'PO-{tag}-{i:06d}',
+                supplier=supplier,
+                status='ordered',
+                order_date=today,
+                expected_delivery=today + timedelta(days=i % DAYS),
+                created_by=user
+            )
+            for i in range(options['orders'])
+        ])
+        purchase_orders = list(PurchaseOrder.objects.filter(order_number__startswith=f'PO-{tag}-').order_by('pk'))
+        PurchaseOrderItem.objects.bulk_create([
+            PurchaseOrderItem(
+                order=order,
+                product=products[(n * options['lines'] + i) % len(products)],
+                quantity=Decimal('4'),
+                unit_price=Decimal('1.00')
+            )
+            for n, order in enumerate(purchase_orders)
+            for i in range(options['lines'])
+        ], batch_size=1000)
+
+        product_ids = [product.pk for product in products]
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            timelines = build_timelines(company.pk, product_ids)
+            elapsed = time.perf_counter() - started
+        days = sum(len(entry['days']) for entry in timelines.values())
+        self.stdout.write(
+            f'{len(timelines)} timelines ({days} product-days) in {elapsed * 1000:.1f} ms, '
+            f'{len(ctx.captured_queries)} queries'
+        )
+
+        sample = product_ids[:options['lookups']]
+        atp_cache.clear()
+        for label in ('cold', 'cached'):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                for product_id in sample:
+                    atp_timeline(company.pk, product_id)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<7} {len(sample) / elapsed:>12,.0f} lookups/s '
+                f'{len(ctx.captured_queries):>6} queries'
+            )
+        atp_cache.clear()
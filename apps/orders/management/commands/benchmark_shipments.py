@@ -0,0 +1,83 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder, SalesOrderItem, Shipment, ShipmentItem
+from apps.orders.reservations import reserve_items
+from apps.orders.shipping import confirm_shipments
+
+
+class Command(BaseCommand):
+    help = (
+        'Confirm an end-of-day pickup of many allocated single-shipment orders '
+        'in one call and report time and queries (data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shipments', nargs='+', type=int, default=[1, 100, 1000, 5000])
+        parser.add_argument('--lines', type=int, default=3, help='Lines per order')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=200)
+        products = seed_products(company, 500)
+        seed_stock(products, locations)
+        customer = seed_customer(company)
+
+        self.stdout.write(f'{"shipments":>10} {"lines":>8} {"ms":>10} {"ms/shipment":>12} {"queries":>8}')
+        for count in options['shipments']:
+            orders = seed_sales_orders(
+                company, user, customer, products,
+                orders=count, lines=options['lines'], quantity=Decimal('2')
+            )
+            items = list(SalesOrderItem.objects.filter(order__in=orders).select_related('product'))
+            reserve_items(items, company.pk)
+
+            Shipment.objects.bulk_create([
+                Shipment(
+                    company=company,
+                    shipment_number=f'SH-{order.order_number}',
+                    order=order,
+                    status='ready',
+                    carrier='DHL',
+                    created_by=user
+                )
+                for order in orders
+            ], batch_size=1000)
+            shipments = {
+                shipment.order_id: shipment
+                for shipment in Shipment.objects.filter(order__in=orders)
+            }
+            ShipmentItem.objects.bulk_create([
+                ShipmentItem(shipment=shipments[item.order_id], order_item=item, quantity=item.quantity)
+                for item in items
+            ], batch_size=1000)
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                confirmed = confirm_shipments(shipments.values(), user)
+                elapsed = time.perf_counter() - started
+
+            if len(confirmed) != count or SalesOrder.objects.filter(
+                pk__in=[order.pk for order in orders]
+            ).exclude(status='shipped').exists():
+                raise CommandError(f'Pickup of {count} shipments left orders unshipped')
+            self.stdout.write(
+                f'{count:>10} {len(items):>8} {elapsed * 1000:>10.1f} '
+                f'{elapsed * 1000 / count:>12.3f} {len(ctx.captured_queries):>8}'
+            )
@@ -0,0 +1,74 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.inventory.management.fixtures import (
+    Rollback, seed_products, seed_stock, seed_tenant, seed_warehouse
+)
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder, SalesOrderItem
+from apps.orders.reservations import reserve_items
+from apps.orders.waves import plan_waves
+
+CARRIERS = ('DHL', 'UPS', 'FedEx')
+
+
+class Command(BaseCommand):
+    help = (
+        'Allocate a batch of orders over two warehouses and three carriers, '
+        'then time wave planning over them (data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=5000, help='Order lines in total')
+        parser.add_argument('--lines-per-order', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        company, user = seed_tenant()
+        locations = []
+        for _ in range(2):
+            locations += seed_warehouse(company, locations=400)[1]
+        products = seed_products(company, 2000)
+        seed_stock(products, locations)
+        customer = seed_customer(company)
+
+        orders = seed_sales_orders(
+            company, user, customer, products,
+            orders=options['lines'] // options['lines_per_order'],
+            lines=options['lines_per_order'],
+            quantity=Decimal('2')
+        )
+        for n, carrier in enumerate(CARRIERS):
+            SalesOrder.objects.filter(pk__in=[order.pk for order in orders[n::len(CARRIERS)]]).update(carrier=carrier)
+        reserve_items(
+            SalesOrderItem.objects.filter(order__company=company).select_related('product'),
+            company.pk
+        )
+
+        best = None
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                plan = plan_waves(company.pk)
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        waves = plan['waves']
+        self.stdout.write(
+            f'{len(orders)} orders, {sum(wave["order_lines"] for wave in waves)} lines -> '
+            f'{len(waves)} waves, {sum(len(wave["picks"]) for wave in waves)} picks, '
+            f'{len(plan["unplanned"])} unplanned'
+        )
+        self.stdout.write(f'best of {options["repeat"]}: {best * 1000:.1f} ms, {len(ctx.captured_queries)} queries')
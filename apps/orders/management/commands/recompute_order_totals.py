@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.inventory.models import PurchaseOrder
+from apps.inventory.totals import recompute_totals
+from apps.orders.models import SalesOrder
+from apps.tenants.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored net/tax/gross totals and line counts of sales and purchase orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Company slug (default: all companies)')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(slug=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Company '{options['company']}' does not exist")
+
+        for label, model in (('sales', SalesOrder), ('purchase', PurchaseOrder)):
+            with transaction.atomic():
+                changed = recompute_totals(model, company=company)
+            self.stdout.write(self.style.SUCCESS(f'Updated totals of {changed} {label} order(s)'))
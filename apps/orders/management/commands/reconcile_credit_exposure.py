@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.orders.credit import rebuild_exposures
+from apps.tenants.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Rebuild customer credit exposures from open orders and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Company slug (default: all companies)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(slug=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Company '{options['company']}' does not exist")
+
+        with transaction.atomic():
+            drift = rebuild_exposures(company=company, fix=not options['dry_run'])
+
+        for customer, stored, actual in drift:
+            self.stdout.write(
+                f'{customer.code:<20} stored {stored:>14} actual {actual:>14} drift {stored - actual:>14}'
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('No drift'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} customer(s) drifted (not fixed)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} customer(s)'))
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from apps.inventory.management.fixtures import seed_tenant
+from apps.tenants.numbering import NumberAllocator
+
+
+class Command(BaseCommand):
+    help = (
+        'Hand out sales order numbers from several allocators at once (each '
+        'standing in for a worker process), check that none is duplicated and '
+        'report numbers/s and database round trips. The sequence row is '
+        'committed and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--numbers', type=int, default=5000, help='Numbers per worker')
+        parser.add_argument('--block', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write('SQLite serialises writers; use PostgreSQL for meaningful numbers.')
+
+        company, _ = seed_tenant()
+        try:
+            self._run(company, options)
+        finally:
+            company.delete()
+
+    def _run(self, company, options):
+        allocators = [NumberAllocator(options['block']) for _ in range(options['workers'])]
+        issued = []
+        lock = threading.Lock()
+
+        def worker(allocator):
+            try:
+                numbers = [
+                    allocator.next_number(company.pk, 'sales_order')
+                    for _ in range(options['numbers'])
+                ]
+                with lock:
+                    issued.extend(numbers)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(allocator,)) for allocator in allocators]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        expected = options['workers'] * options['numbers']
+        blocks = sum(allocator.reserved_blocks for allocator in allocators)
+        self.stdout.write(
+            f'{len(issued)} numbers in {elapsed:.2f}s ({len(issued) / elapsed:,.0f}/s), '
+            f'{blocks} round trips ({blocks / max(len(issued), 1):.4f} per number)'
+        )
+        if len(issued) != expected:
+            raise CommandError(f'Expected {expected} numbers, got {len(issued)}')
+        if len(set(issued)) != len(issued):
+            raise CommandError(f'{len(issued) - len(set(issued))} duplicate numbers')
+        self.stdout.write(self.style.SUCCESS('No duplicates'))
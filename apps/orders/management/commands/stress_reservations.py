@@ -0,0 +1,101 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import F, Sum
+
+from apps.inventory.management.fixtures import seed_products, seed_stock, seed_tenant, seed_warehouse
+from apps.inventory.models import Inventory
+from apps.orders.management.fixtures import delete_seeded, seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder, StockReservation
+from apps.orders.reservations import ReservationError, reserve_order
+
+
+class Command(BaseCommand):
+    help = (
+        'Reserve many orders for one product from concurrent threads, verify '
+        'that nothing is oversold and report throughput. Seeded rows are '
+        'committed (threads need their own connections) and deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--stock', type=int, default=300, help='Units on hand, spread over 3 locations')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write('SQLite serialises writers; use PostgreSQL for meaningful numbers.')
+
+        company, user = seed_tenant()
+        try:
+            self._run(company, user, options)
+        finally:
+            delete_seeded(company)
+
+    def _run(self, company, user, options):
+        _, locations = seed_warehouse(company, locations=3)
+        product = seed_products(company, 1)[0]
+        seed_stock([product] * 3, locations, quantity=Decimal(options['stock']) / 3)
+        customer = seed_customer(company)
+        order_ids = [order.pk for order in seed_sales_orders(
+            company, user, customer, [product], orders=options['orders']
+        )]
+
+        queue = list(order_ids)
+        lock = threading.Lock()
+        results = {'reserved': 0, 'rejected': 0, 'errors': 0}
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        order_id = queue.pop()
+                    try:
+                        reserve_order(SalesOrder.objects.get(pk=order_id))
+                        outcome = 'reserved'
+                    except ReservationError:
+                        outcome = 'rejected'
+                    except Exception:
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stock = Inventory.objects.filter(product=product).aggregate(
+            quantity=Sum('quantity'),
+            reserved=Sum('reserved')
+        )
+        active = StockReservation.objects.filter(
+            order_item__product=product,
+            status='active'
+        ).aggregate(total=Sum('quantity'))['total'] or Decimal('0')
+        oversold = Inventory.objects.filter(product=product, reserved__gt=F('quantity')).count()
+
+        self.stdout.write(
+            f"orders={options['orders']} threads={options['threads']} "
+            f"reserved={results['reserved']} rejected={results['rejected']} errors={results['errors']}"
+        )
+        self.stdout.write(
+            f"on hand={stock['quantity']} reserved={stock['reserved']} active reservations={active}"
+        )
+        self.stdout.write(f"{options['orders'] / elapsed:.1f} reservation attempts/s ({elapsed:.2f}s)")
+
+        if oversold or stock['reserved'] != active or stock['reserved'] > stock['quantity']:
+            raise CommandError('Oversell detected')
+        if stock['reserved'] != results['reserved']:
+            raise CommandError('Reserved total does not match successful reservations')
+        self.stdout.write(self.style.SUCCESS('No oversell'))
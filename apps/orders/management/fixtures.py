@@ -0,0 +1,62 @@
+"""Sales order seeding for the orders benchmark commands.
+
+See apps.inventory.management.fixtures for tenants, products and stock.
+"""
+import uuid
+from decimal import Decimal
+
+from django.utils import timezone
+
+from apps.inventory.totals import recompute_totals
+from apps.orders.models import Customer, SalesOrder, SalesOrderItem
+
+
+def seed_customer(company):
+    tag = uuid.uuid4().hex[:8]
+    return Customer.objects.create(company=company, name=f'Bench {tag}', code=f'C{tag}')
+
+
+def seed_sales_orders(company, user, customer, products, orders=1, lines=1,
+                      quantity=Decimal('1'), status='confirmed'):
+    """Create ``orders`` orders of ``lines`` lines each, cycling through ``products``."""
+    tag = uuid.uuid4().hex[:8]
+    today = timezone.localdate()
+    SalesOrder.objects.bulk_create([
+        SalesOrder(
+            company=company,
+            order_number=f'SO-{tag}-{i:06d}',
+            customer=customer,
+            status=status,
+            order_date=today,
+            expected_shipment=today,
+            created_by=user
+        )
+        for i in range(orders)
+    ])
+    created = list(SalesOrder.objects.filter(order_number__startswith=f'SO-{tag}-').order_by('pk'))
+
+    SalesOrderItem.objects.bulk_create([
+        SalesOrderItem(
+            order=order,
+            product=products[(n * lines + i) % len(products)],
+            quantity=quantity,
+            unit_price=Decimal('2.00')
+        )
+        for n, order in enumerate(created)
+        for i in range(lines)
+    ], batch_size=1000)
+    recompute_totals(SalesOrder, [order.pk for order in created])
+    return created
+
+
+def delete_seeded(company):
+    """Remove everything a committed (non-rolled-back) benchmark created."""
+    from apps.inventory.models import StockMovement
+    from apps.orders.models import StockReservation
+
+    StockReservation.objects.filter(order_item__order__company=company).delete()
+    SalesOrderItem.objects.filter(order__company=company).delete()
+    SalesOrder.objects.filter(company=company).delete()
+    Customer.objects.filter(company=company).delete()
+    StockMovement.objects.filter(company=company).delete()
+    company.delete()
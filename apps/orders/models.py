@@ -46,8 +46,16 @@ class Customer(models.Model):
         null=True,
         blank=True
     )
+    # Gross total of open orders, maintained by apps.orders.credit
+    credit_exposure = models.DecimalField(
+        _('Credit Exposure'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
     notes = models.TextField(_('Notes'), blank=True)
     is_active = models.BooleanField(_('Active'), default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _('Customer')
@@ -76,10 +84,12 @@ class SalesOrder(models.Model):
         related_name='sales_orders',
         verbose_name=_('Company')
     )
+    # Left blank, filled from apps.tenants.numbering on save
     order_number = models.CharField(
         _('Order Number'),
         max_length=50,
-        unique=True
+        unique=True,
+        blank=True
     )
     customer = models.ForeignKey(
         Customer,
@@ -103,6 +113,11 @@ class SalesOrder(models.Model):
         _('Shipping Address'),
         blank=True
     )
+    carrier = models.CharField(
+        _('Carrier'),
+        max_length=100,
+        blank=True
+    )
     notes = models.TextField(_('Notes'), blank=True)
     created_by = models.ForeignKey(
         'tenants.User',
@@ -110,6 +125,26 @@ class SalesOrder(models.Model):
         related_name='created_sales_orders',
         verbose_name=_('Created By')
     )
+    # Maintained from the items by apps.inventory.totals
+    net_total = models.DecimalField(
+        _('Net Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    tax_total = models.DecimalField(
+        _('Tax Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    gross_total = models.DecimalField(
+        _('Gross Total'),
+        max_digits=14,
+        decimal_places=2,
+        default=0
+    )
+    line_count = models.PositiveIntegerField(_('Lines'), default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -117,6 +152,13 @@ class SalesOrder(models.Model):
         verbose_name = _('Sales Order')
         verbose_name_plural = _('Sales Orders')
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['company', 'status', 'order_date'], name='so_company_status_date_idx'),
+            models.Index(fields=['company', 'order_date'], name='so_company_date_idx'),
+            models.Index(fields=['company', 'created_at'], name='so_company_created_idx'),
+            models.Index(fields=['company', 'updated_at'], name='so_company_updated_idx'),
+            models.Index(fields=['company', 'gross_total'], name='so_company_gross_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order_number} - {self.customer}"
@@ -192,7 +234,8 @@ class Shipment(models.Model):
     shipment_number = models.CharField(
         _('Shipment Number'),
         max_length=50,
-        unique=True
+        unique=True,
+        blank=True
     )
     order = models.ForeignKey(
         SalesOrder,
@@ -234,6 +277,9 @@ class Shipment(models.Model):
         verbose_name = _('Shipment')
         verbose_name_plural = _('Shipments')
         ordering = ['-shipment_date']
+        indexes = [
+            models.Index(fields=['company', 'status', 'shipment_date'], name='shipment_company_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.shipment_number} - {self.order}"
@@ -273,4 +319,50 @@ class ShipmentItem(models.Model):
         verbose_name_plural = _('Shipment Items')
 
     def __str__(self):
-        return f"{self.shipment.shipment_number} - {self.order_item.product}"
\ No newline at end of file
+        return f"{self.shipment.shipment_number} - {self.order_item.product}"
+
+
+class StockReservation(models.Model):
+    STATUS_CHOICES = (
+        ('active', _('Active')),
+        ('released', _('Released')),
+        ('committed', _('Committed')),
+    )
+
+    order_item = models.ForeignKey(
+        SalesOrderItem,
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        verbose_name=_('Order Item')
+    )
+    inventory = models.ForeignKey(
+        'inventory.Inventory',
+        on_delete=models.PROTECT,
+        related_name='reservations',
+        verbose_name=_('Inventory')
+    )
+    quantity = models.DecimalField(
+        _('Quantity'),
+        max_digits=10,
+        decimal_places=2
+    )
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='active'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Stock Reservation')
+        verbose_name_plural = _('Stock Reservations')
+        indexes = [
+            models.Index(fields=['order_item', 'status'], name='reservation_item_status_idx'),
+            models.Index(fields=['inventory', 'status'], name='reservation_inventory_idx'),
+            models.Index(fields=['updated_at'], name='reservation_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_item} x{self.quantity} ({self.get_status_display()})"
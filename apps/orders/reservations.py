@@ -0,0 +1,279 @@
+"""Stock reservations against Inventory.reserved.
+
+Reserving never reads a quantity, adds to it in Python and writes it
+back. Every change to ``Inventory.reserved`` is a conditional UPDATE
+(``quantity >= reserved + n``) executed by the database. A concurrent
+reservation that would oversell simply matches no row, and the caller
+moves on to the next candidate.
+
+Allocation walks the candidate rows of each product in FEFO order
+(earliest expiry first, undated stock last) or FIFO order (receipt order,
+i.e. the order Inventory rows were created) and splits a line over as
+many locations and batches as it needs. Expired stock is never allocated.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from apps.inventory.changes import record_changes
+from apps.inventory.models import Inventory, StockMovement
+from apps.inventory.services import StockError, apply_stock_deltas, lock_inventory
+from . import atp
+from .credit import check_order_credit
+from .models import SalesOrder, SalesOrderItem, StockReservation
+
+ALLOCATION_ORDER = {
+    'fefo': (F('expiry_date').asc(nulls_last=True), 'pk'),
+    'fifo': ('pk',),
+}
+PROCESSABLE_STATUSES = ('draft', 'confirmed')
+
+
+class ReservationError(StockError):
+    pass
+
+
+def _try_reserve(inventory_id, quantity):
+    return Inventory.objects.filter(
+        pk=inventory_id,
+        quantity__gte=F('reserved') + quantity
+    ).update(reserved=F('reserved') + quantity) == 1
+
+
+def _reserve_from(row, quantity):
+    """Reserve up to ``quantity`` on ``row``; returns the amount reserved."""
+    for _ in range(3):
+        take = min(quantity, row.quantity - row.reserved)
+        if take <= 0:
+            return Decimal('0')
+        if _try_reserve(row.pk, take):
+            row.reserved += take
+            return take
+        # Lost a race; look at the current figures and try again
+        row.quantity, row.reserved = Inventory.objects.filter(pk=row.pk).values_list(
+            'quantity', 'reserved'
+        ).get()
+    return Decimal('0')
+
+
+def outstanding_quantities(items):
+    """Quantity still to reserve per item: ordered - shipped - actively reserved."""
+    reserved = dict(
+        StockReservation.objects.filter(
+            order_item__in=items,
+            status='active'
+        ).values('order_item_id').annotate(total=Sum('quantity')).values_list('order_item_id', 'total')
+    )
+    return {
+        item.pk: item.quantity - item.shipped - reserved.get(item.pk, Decimal('0'))
+        for item in items
+    }
+
+
+def candidate_queryset(product_ids, company_id, strategy=None):
+    """Allocatable Inventory rows for ``product_ids`` in allocation order."""
+    strategy = strategy or getattr(settings, 'ALLOCATION_STRATEGY', 'fefo')
+    try:
+        ordering = ALLOCATION_ORDER[strategy]
+    except KeyError:
+        raise ValueError(f'Unknown allocation strategy: {strategy}')
+
+    return Inventory.objects.filter(
+        Q(expiry_date__isnull=True) | Q(expiry_date__gte=timezone.localdate()),
+        product_id__in=set(product_ids),
+        location__warehouse__company_id=company_id,
+        location__is_active=True,
+        quantity__gt=F('reserved')
+    ).select_related('location').order_by(*ordering)
+
+
+def candidate_stock(product_ids, company_id, strategy=None):
+    """``candidate_queryset`` grouped by product: one query for a whole order."""
+    candidates = defaultdict(list)
+    for row in candidate_queryset(product_ids, company_id, strategy):
+        candidates[row.product_id].append(row)
+    return candidates
+
+
+def reserve_items(items, company_id, candidates=None, strategy=None):
+    """Reserve stock for ``items`` (SalesOrderItem list) all-or-nothing.
+
+    Candidate stock for every product is fetched with one query (see
+    ``candidate_stock``); pass ``candidates`` (product_id -> Inventory rows
+    with ``location`` selected) to impose a different allocation order.
+    The orders and their lines are locked first, so concurrent calls for
+    the same lines queue up instead of both reserving them; candidate rows
+    are then locked in primary key order. Returns the created
+    StockReservation objects.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    with transaction.atomic():
+        list(SalesOrder.objects.select_for_update().filter(
+            pk__in={item.order_id for item in items}
+        ).order_by('pk').values_list('pk', flat=True))
+        # Re-read under the lock: ``shipped`` and the active reservations may have moved on
+        items = list(SalesOrderItem.objects.select_for_update().filter(
+            pk__in=[item.pk for item in items]
+        ).prefetch_related('product').order_by('pk'))
+        needed = outstanding_quantities(items)
+
+        if candidates is None:
+            product_ids = {item.product_id for item in items}
+            lock_inventory(candidate_queryset(product_ids, company_id, strategy))
+            candidates = candidate_stock(product_ids, company_id, strategy)
+        else:
+            lock_inventory(Inventory.objects.filter(pk__in={row.pk for rows in candidates.values() for row in rows}))
+
+        reservations = []
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        shortages = []
+
+        for item in items:
+            remaining = needed[item.pk]
+            for row in candidates.get(item.product_id, ()):
+                if remaining <= 0:
+                    break
+                if item.location_id and row.location_id != item.location_id:
+                    continue
+                taken = _reserve_from(row, remaining)
+                if not taken:
+                    continue
+                remaining -= taken
+                reservations.append(StockReservation(order_item=item, inventory=row, quantity=taken))
+                deltas[(item.product_id, row.location.warehouse_id)][1] += taken
+            if remaining > 0:
+                shortages.append(f'{item.product.name} (short by {remaining})')
+
+        if shortages:
+            # Rolls back every conditional update made above
+            raise ReservationError('Not enough available stock for: ' + ', '.join(shortages))
+
+        StockReservation.objects.bulk_create(reservations)
+        apply_stock_deltas(company_id, deltas)
+        record_changes(company_id, 'inventory', [reservation.inventory_id for reservation in reservations])
+
+    return reservations
+
+
+def reserve_order(order, strategy=None):
+    return reserve_items(order.items.select_related('product'), order.company_id, strategy=strategy)
+
+
+def allocate_order(order, strategy=None):
+    """Allocate every line of a draft/confirmed order and mark it processing."""
+    with transaction.atomic():
+        order = SalesOrder.objects.select_for_update().get(pk=order.pk)
+        if order.status not in PROCESSABLE_STATUSES:
+            raise ReservationError(f'Order {order.order_number} is {order.get_status_display()}')
+        check_order_credit(order, 'processing')
+        reservations = reserve_order(order, strategy)
+        order.status = 'processing'
+        order.save(update_fields=['status', 'updated_at'])
+    return reservations
+
+
+def _settle(reservations, status):
+    # Same lock order as reserve_items and confirm_shipments: orders, their
+    # lines, Inventory rows (all by primary key), then the reservations
+    ids = [reservation.pk for reservation in reservations]
+    active = StockReservation.objects.filter(pk__in=ids, status='active')
+    list(SalesOrder.objects.select_for_update().filter(
+        pk__in=active.values('order_item__order_id')
+    ).order_by('pk').values_list('pk', flat=True))
+    list(SalesOrderItem.objects.select_for_update().filter(
+        pk__in=active.values('order_item_id')
+    ).order_by('pk').values_list('pk', flat=True))
+    lock_inventory(Inventory.objects.filter(pk__in=active.values('inventory_id')))
+    reservations = list(
+        active.select_for_update(of=('self',)).select_related(
+            'inventory__location__warehouse', 'order_item__order'
+        ).order_by('pk')
+    )
+    if not reservations:
+        return []
+
+    per_row = defaultdict(Decimal)
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for reservation in reservations:
+        inventory = reservation.inventory
+        per_row[inventory.pk] += reservation.quantity
+        key = (inventory.product_id, inventory.location.warehouse_id)
+        deltas[key][1] -= reservation.quantity
+        if status == 'committed':
+            deltas[key][0] -= reservation.quantity
+
+    for inventory_id, quantity in sorted(per_row.items()):
+        if status == 'committed':
+            Inventory.objects.filter(pk=inventory_id).update(
+                quantity=F('quantity') - quantity,
+                reserved=F('reserved') - quantity
+            )
+        else:
+            Inventory.objects.filter(pk=inventory_id).update(reserved=F('reserved') - quantity)
+
+    StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(
+        status=status,
+        updated_at=timezone.now()
+    )
+
+    company_id = reservations[0].inventory.location.warehouse.company_id
+    apply_stock_deltas(company_id, deltas)
+    record_changes(company_id, 'inventory', per_row)
+    return reservations
+
+
+def release_reservations(reservations):
+    """Give reserved stock back without moving it."""
+    with transaction.atomic():
+        return _settle(reservations, 'released')
+
+
+def commit_reservations(reservations, user):
+    """Consume reserved stock: on-hand and reserved drop together, the order
+    lines count it as shipped and a sale movement is written."""
+    with transaction.atomic():
+        settled = _settle(reservations, 'committed')
+        shipped = defaultdict(Decimal)
+        for reservation in settled:
+            shipped[reservation.order_item_id] += reservation.quantity
+        for item_id, quantity in sorted(shipped.items()):
+            SalesOrderItem.objects.filter(pk=item_id).update(shipped=F('shipped') + quantity)
+        atp.invalidate(reservation.inventory.product_id for reservation in settled)
+        now = timezone.now()
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                company_id=reservation.order_item.order.company_id,
+                movement_type='sale',
+                reference=reservation.order_item.order.order_number,
+                product_id=reservation.inventory.product_id,
+                from_location_id=reservation.inventory.location_id,
+                quantity=reservation.quantity,
+                batch=reservation.inventory.batch,
+                expiry_date=reservation.inventory.expiry_date,
+                date=now,
+                created_by=user
+            )
+            for reservation in settled
+        ])
+        return settled
+
+
+def release_order(order):
+    """Release every active reservation of ``order``, e.g. when it is cancelled."""
+    return release_reservations(
+        StockReservation.objects.filter(order_item__order=order, status='active')
+    )
+
+
+def release_items(items):
+    """Release the active reservations of ``items`` before they are deleted."""
+    return release_reservations(
+        StockReservation.objects.filter(order_item__in=items, status='active')
+    )
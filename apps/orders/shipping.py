@@ -0,0 +1,276 @@
+"""Shipment confirmation.
+
+Confirming applies every ShipmentItem of one or many shipments in a single
+transaction: ``SalesOrderItem.shipped`` goes up, stock leaves the shelf
+batch by batch, a sale movement is written per row touched and the orders
+roll forward to partially or fully shipped. Stock is taken from the
+item's active reservations first (see ``apps.orders.reservations``), then
+from unreserved stock in FEFO order, honouring the shipment line's batch
+and the item's source location when set. Reservations an item no longer
+needs (it shipped from other stock) are released. A line drawn from
+several batches keeps its batch empty; the movements record each batch.
+
+Everything is locked and read up front and written with bulk queries, so
+confirming the whole end-of-day pickup costs the same dozen queries as a
+single parcel.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from apps.inventory.changes import record_changes
+from apps.inventory.models import Inventory, StockMovement
+from apps.inventory.services import StockError, apply_stock_deltas, lock_inventory
+from . import atp
+from .credit import change_status, lock_orders
+from .models import SalesOrder, SalesOrderItem, Shipment, ShipmentItem, StockReservation
+
+CONFIRMABLE_STATUSES = ('preparing', 'ready')
+# Orders past shipping are never rolled back to partial/shipped
+SHIPPABLE_ORDER_STATUSES = ('draft', 'confirmed', 'processing', 'partial')
+
+
+class ShipmentError(StockError):
+    pass
+
+
+def _take(row, quantity, reserved=False):
+    """Take up to ``quantity`` from ``row``; reserved stock lowers ``reserved`` too."""
+    available = min(row.quantity, row.reserved) if reserved else row.quantity - row.reserved
+    take = min(quantity, available)
+    if take <= 0:
+        return Decimal('0')
+    row.quantity -= take
+    if reserved:
+        row.reserved -= take
+    return take
+
+
+def confirm_shipments(shipments, user):
+    """Ship every line of ``shipments`` (Shipment objects or ids) all-or-nothing.
+
+    Shipments already shipped, delivered or cancelled are skipped. Raises
+    ShipmentError listing every line that cannot be shipped. Returns the
+    confirmed Shipment objects.
+    """
+    shipment_ids = {getattr(shipment, 'pk', shipment) for shipment in shipments}
+    if not shipment_ids:
+        return []
+
+    with transaction.atomic():
+        confirmed = list(Shipment.objects.select_for_update().filter(
+            pk__in=shipment_ids,
+            status__in=CONFIRMABLE_STATUSES
+        ).order_by('pk'))
+        if not confirmed:
+            return []
+        company_id = confirmed[0].company_id
+
+        lines = list(ShipmentItem.objects.filter(
+            shipment__in=confirmed
+        ).select_related('shipment').order_by('shipment_id', 'pk'))
+        # Orders and their customers (change_status moves the exposure)
+        # before the lines, as every writer takes them; the joined rows are
+        # not locked again
+        item_ids = {line.order_item_id for line in lines}
+        lock_orders(SalesOrderItem.objects.filter(pk__in=item_ids).values('order_id'))
+        items = {
+            item.pk: item
+            for item in SalesOrderItem.objects.select_for_update(of=('self',)).select_related(
+                'order', 'product'
+            ).filter(pk__in=item_ids).order_by('pk')
+        }
+
+        shipped_ids = {line.shipment_id for line in lines}
+        errors = [
+            f'{shipment.shipment_number}: no items'
+            for shipment in confirmed
+            if shipment.pk not in shipped_ids
+        ]
+        errors += [
+            f'{shipment.shipment_number}: belongs to another company'
+            for shipment in confirmed
+            if shipment.company_id != company_id
+        ]
+        outstanding = {pk: item.quantity - item.shipped for pk, item in items.items()}
+        for line in lines:
+            item = items[line.order_item_id]
+            if item.order_id != line.shipment.order_id:
+                errors.append(f'{line.shipment.shipment_number}: {item.product.name} is not on its order')
+            elif line.quantity <= 0:
+                errors.append(f'{line.shipment.shipment_number}: {item.product.name} quantity must be positive')
+            elif line.quantity > outstanding[item.pk]:
+                errors.append(
+                    f'{line.shipment.shipment_number}: {item.product.name} '
+                    f'{line.quantity} exceeds outstanding {outstanding[item.pk]}'
+                )
+            outstanding[item.pk] -= line.quantity
+        if errors:
+            raise ShipmentError('; '.join(errors))
+
+        # Every candidate row once, locked in primary key order like allocation
+        # does, then walked in FEFO order per product
+        candidates = Inventory.objects.filter(
+            product_id__in={item.product_id for item in items.values()},
+            location__warehouse__company_id=company_id,
+            quantity__gt=0
+        )
+        lock_inventory(candidates)
+        rows = {}
+        by_product = defaultdict(list)
+        for row in candidates.select_related('location').order_by(F('expiry_date').asc(nulls_last=True), 'pk'):
+            rows[row.pk] = row
+            by_product[row.product_id].append(row)
+
+        reservations = defaultdict(list)
+        for reservation in StockReservation.objects.select_for_update().filter(
+            order_item_id__in=items,
+            status='active'
+        ).order_by('pk'):
+            reservations[reservation.order_item_id].append(reservation)
+
+        now = timezone.now()
+        changed_rows = {}
+        changed_reservations = {}
+        settled = []
+        drawn = defaultdict(set)
+        movements = []
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        shortages = []
+
+        def consume(line, item, row, take, reserved):
+            changed_rows[row.pk] = row
+            key = (item.product_id, row.location.warehouse_id)
+            deltas[key][0] -= take
+            if reserved:
+                deltas[key][1] -= take
+            drawn[line.pk].add((row.batch, row.expiry_date))
+            movements.append(StockMovement(
+                company_id=company_id,
+                movement_type='sale',
+                reference=line.shipment.shipment_number,
+                product_id=item.product_id,
+                from_location_id=row.location_id,
+                quantity=take,
+                batch=row.batch,
+                expiry_date=row.expiry_date,
+                date=now,
+                created_by=user,
+                notes=f'Order {item.order.order_number}'
+            ))
+
+        for line in lines:
+            item = items[line.order_item_id]
+            batch = line.batch
+            remaining = line.quantity
+
+            for reservation in reservations[item.pk]:
+                if remaining <= 0:
+                    break
+                row = rows.get(reservation.inventory_id)
+                if reservation.status != 'active' or row is None or (batch and row.batch != batch):
+                    continue
+                take = _take(row, min(remaining, reservation.quantity), reserved=True)
+                if not take:
+                    continue
+                remaining -= take
+                if take == reservation.quantity:
+                    reservation.status = 'committed'
+                else:
+                    reservation.quantity -= take
+                    settled.append(StockReservation(
+                        order_item=item, inventory_id=row.pk, quantity=take, status='committed'
+                    ))
+                reservation.updated_at = now
+                changed_reservations[reservation.pk] = reservation
+                consume(line, item, row, take, reserved=True)
+
+            for row in by_product[item.product_id]:
+                if remaining <= 0:
+                    break
+                if (batch and row.batch != batch) or (item.location_id and row.location_id != item.location_id):
+                    continue
+                take = _take(row, remaining)
+                if take:
+                    remaining -= take
+                    consume(line, item, row, take, reserved=False)
+
+            if remaining > 0:
+                shortages.append(f'{line.shipment.shipment_number}: {item.product.name} (short by {remaining})')
+            item.shipped += line.quantity
+
+        if shortages:
+            raise ShipmentError('Not enough stock for: ' + '; '.join(shortages))
+
+        for line in lines:
+            if not line.batch and len(drawn[line.pk]) == 1:
+                line.batch, line.expiry_date = next(iter(drawn[line.pk]))
+
+        # Reserved stock the items shipped around would otherwise stay held forever
+        for item in items.values():
+            active = [reservation for reservation in reservations[item.pk] if reservation.status == 'active']
+            held = sum((reservation.quantity for reservation in active), Decimal('0'))
+            excess = held - (item.quantity - item.shipped)
+            for reservation in reversed(active):
+                if excess <= 0:
+                    break
+                row = rows.get(reservation.inventory_id)
+                if row is None:
+                    continue
+                release = min(excess, reservation.quantity, row.reserved)
+                if release <= 0:
+                    continue
+                excess -= release
+                row.reserved -= release
+                changed_rows[row.pk] = row
+                deltas[(item.product_id, row.location.warehouse_id)][1] -= release
+                if release == reservation.quantity:
+                    reservation.status = 'released'
+                else:
+                    reservation.quantity -= release
+                    settled.append(StockReservation(
+                        order_item=item, inventory_id=row.pk, quantity=release, status='released'
+                    ))
+                reservation.updated_at = now
+                changed_reservations[reservation.pk] = reservation
+
+        Inventory.objects.bulk_update(changed_rows.values(), ['quantity', 'reserved'], batch_size=1000)
+        StockReservation.objects.bulk_update(
+            changed_reservations.values(), ['quantity', 'status', 'updated_at'], batch_size=1000
+        )
+        StockReservation.objects.bulk_create(settled, batch_size=1000)
+        SalesOrderItem.objects.bulk_update(items.values(), ['shipped'], batch_size=1000)
+        ShipmentItem.objects.bulk_update(lines, ['batch', 'expiry_date'], batch_size=1000)
+        StockMovement.objects.bulk_create(movements, batch_size=1000)
+        apply_stock_deltas(company_id, deltas)
+        record_changes(company_id, 'inventory', changed_rows)
+        atp.invalidate(item.product_id for item in items.values())
+
+        today = timezone.localdate()
+        for shipment in confirmed:
+            shipment.status = 'shipped'
+            shipment.shipment_date = shipment.shipment_date or today
+            shipment.updated_at = now
+        Shipment.objects.bulk_update(confirmed, ['status', 'shipment_date', 'updated_at'], batch_size=1000)
+
+        # Roll orders forward: shipped when no line is left open, partial otherwise
+        order_ids = {shipment.order_id for shipment in confirmed}
+        open_lines = dict(
+            SalesOrderItem.objects.filter(order_id__in=order_ids).values('order_id').annotate(
+                open=Count('pk', filter=Q(shipped__lt=F('quantity')))
+            ).values_list('order_id', 'open').order_by()
+        )
+        orders = SalesOrder.objects.filter(pk__in=order_ids, status__in=SHIPPABLE_ORDER_STATUSES)
+        change_status(
+            orders.filter(pk__in=[pk for pk in order_ids if not open_lines.get(pk)]),
+            'shipped', updated_at=now
+        )
+        change_status(
+            orders.filter(pk__in=[pk for pk in order_ids if open_lines.get(pk)]),
+            'partial', updated_at=now
+        )
+
+    return confirmed
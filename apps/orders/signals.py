@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.inventory.changes import record_change
+from apps.inventory.models import Inventory, PurchaseOrder, PurchaseOrderItem
+from apps.inventory.totals import item_changed, totals_changed
+from apps.tenants.models import Company
+from apps.tenants.numbering import assign_number
+from . import atp, credit, reservations
+from .models import Customer, SalesOrder, SalesOrderItem, Shipment
+
+
+@receiver(pre_save, sender=SalesOrder)
+def number_sales_order(sender, instance, raw=False, **kwargs):
+    if not raw:
+        assign_number(instance, 'order_number', 'sales_order', instance.company_id)
+
+
+@receiver(pre_save, sender=Shipment)
+def number_shipment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        assign_number(instance, 'shipment_number', 'shipment', instance.company_id)
+
+
+@receiver(post_delete, sender=SalesOrder)
+def log_order_deleted(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), Company):
+        return
+    record_change(instance.company_id, 'order', instance.pk, 'deleted')
+
+
+@receiver(post_save, sender=SalesOrder)
+def release_cancelled_order(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Reserved stock of a cancelled order would otherwise stay held forever
+    if raw or created or instance.status != 'cancelled':
+        return
+    if update_fields is None or 'status' in update_fields:
+        reservations.release_order(instance)
+
+
+@receiver(pre_delete, sender=SalesOrderItem)
+def release_deleted_item(sender, instance, **kwargs):
+    # Deleting the line cascades to its reservations; give the stock back first
+    if not isinstance(kwargs.get('origin'), Company):
+        reservations.release_items([instance])
+
+
+@receiver(post_save, sender=SalesOrderItem)
+@receiver(post_delete, sender=SalesOrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    item_changed(sender, instance, **kwargs)
+
+
+@receiver(post_init, sender=SalesOrder)
+def remember_credit_state(sender, instance, **kwargs):
+    instance._credit_state = credit.order_state(instance)
+
+
+@receiver(post_save, sender=SalesOrder)
+def update_credit_exposure(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        credit.order_saved(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=SalesOrder)
+def release_credit_exposure(sender, instance, **kwargs):
+    # Company deletes take the customers with them
+    if not isinstance(kwargs.get('origin'), (Company, Customer)):
+        credit.order_deleted(instance)
+
+
+@receiver(totals_changed, sender=SalesOrder)
+def update_credit_exposure_totals(sender, changes, **kwargs):
+    credit.totals_recomputed(changes)
+
+
+@receiver(post_save, sender=SalesOrderItem)
+@receiver(post_delete, sender=SalesOrderItem)
+@receiver(post_save, sender=PurchaseOrderItem)
+@receiver(post_delete, sender=PurchaseOrderItem)
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def evict_atp_product(sender, instance, **kwargs):
+    atp.invalidate([instance.product_id])
+
+
+@receiver(post_save, sender=SalesOrder)
+@receiver(post_save, sender=PurchaseOrder)
+def evict_atp_order(sender, instance, created, update_fields=None, **kwargs):
+    # Status and dates move the order's lines on or off the timeline
+    if created or (update_fields and not {'status', 'expected_shipment', 'expected_delivery'} & set(update_fields)):
+        return
+    atp.invalidate(instance.items.values_list('product_id', flat=True))
@@ -0,0 +1,190 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.db import OperationalError, connections
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase
+
+from apps.inventory.management.fixtures import seed_products, seed_stock, seed_tenant, seed_warehouse
+from apps.inventory.models import Inventory, StockBalance
+from apps.orders.management.fixtures import seed_customer, seed_sales_orders
+from apps.orders.models import SalesOrder, SalesOrderItem, Shipment, ShipmentItem, StockReservation
+from apps.orders.reservations import (
+    ReservationError, _try_reserve, commit_reservations, reserve_items, reserve_order
+)
+from apps.orders.shipping import confirm_shipments
+
+
+def active_reserved(product):
+    return StockReservation.objects.filter(
+        order_item__product=product,
+        status='active'
+    ).aggregate(total=Sum('quantity'))['total'] or Decimal('0')
+
+
+def reserved_on_hand(product):
+    return Inventory.objects.filter(product=product).aggregate(total=Sum('reserved'))['total']
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.company, self.user = seed_tenant()
+        _, self.locations = seed_warehouse(self.company, locations=2)
+        self.products = seed_products(self.company, 2)
+        self.customer = seed_customer(self.company)
+
+    def orders(self, products, quantity, orders=1):
+        return seed_sales_orders(
+            self.company, self.user, self.customer, products,
+            orders=orders, lines=len(products), quantity=Decimal(quantity)
+        )
+
+    def test_try_reserve_never_exceeds_on_hand(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('5'))
+        row = Inventory.objects.get(product=self.products[0])
+
+        self.assertTrue(_try_reserve(row.pk, Decimal('3')))
+        self.assertFalse(_try_reserve(row.pk, Decimal('3')))
+        self.assertTrue(_try_reserve(row.pk, Decimal('2')))
+        row.refresh_from_db()
+        self.assertEqual(row.reserved, Decimal('5'))
+
+    def test_reserve_items_splits_lines_over_rows(self):
+        seed_stock([self.products[0]] * 2, self.locations, quantity=Decimal('4'))
+        order = self.orders(self.products[:1], '6')[0]
+
+        reservations = reserve_items(order.items.all(), self.company.pk)
+
+        self.assertEqual(sorted(r.quantity for r in reservations), [Decimal('2'), Decimal('4')])
+        self.assertEqual(reserved_on_hand(self.products[0]), Decimal('6'))
+        self.assertEqual(active_reserved(self.products[0]), Decimal('6'))
+        self.assertEqual(
+            StockBalance.objects.filter(product=self.products[0]).aggregate(total=Sum('reserved'))['total'],
+            Decimal('6')
+        )
+
+    def test_reserve_items_is_idempotent(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('10'))
+        order = self.orders(self.products[:1], '4')[0]
+
+        reserve_order(order)
+        self.assertEqual(reserve_order(order), [])
+        self.assertEqual(reserved_on_hand(self.products[0]), Decimal('4'))
+
+    def test_shortage_rolls_back_every_line(self):
+        seed_stock(self.products, self.locations, quantity=Decimal('5'))
+        order = self.orders(self.products, '5')[0]
+        SalesOrderItem.objects.filter(order=order, product=self.products[1]).update(quantity=Decimal('6'))
+
+        with self.assertRaises(ReservationError):
+            reserve_order(order)
+
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertFalse(Inventory.objects.filter(reserved__gt=0).exists())
+
+    def test_cancelling_releases_reservations(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('10'))
+        order = self.orders(self.products[:1], '4')[0]
+        reserve_order(order)
+
+        order.status = 'cancelled'
+        order.save()
+
+        self.assertEqual(reserved_on_hand(self.products[0]), Decimal('0'))
+        self.assertEqual(active_reserved(self.products[0]), Decimal('0'))
+
+    def test_deleting_a_line_releases_its_reservations(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('10'))
+        order = self.orders(self.products[:1], '4')[0]
+        reserve_order(order)
+
+        order.items.get().delete()
+
+        self.assertEqual(reserved_on_hand(self.products[0]), Decimal('0'))
+
+    def test_commit_consumes_stock_and_marks_shipped(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('10'))
+        order = self.orders(self.products[:1], '4')[0]
+        reservations = reserve_order(order)
+
+        commit_reservations(reservations, self.user)
+
+        row = Inventory.objects.get(product=self.products[0])
+        self.assertEqual((row.quantity, row.reserved), (Decimal('6'), Decimal('0')))
+        self.assertEqual(order.items.get().shipped, Decimal('4'))
+        self.assertEqual(reserve_order(order), [])
+
+    def test_confirm_shipments_ships_reserved_stock(self):
+        seed_stock(self.products[:1], self.locations, quantity=Decimal('10'))
+        orders = self.orders(self.products[:1], '4', orders=2)
+        reserve_order(orders[0])
+        shipments = []
+        for order in orders:
+            shipment = Shipment.objects.create(company=self.company, order=order, created_by=self.user)
+            ShipmentItem.objects.create(shipment=shipment, order_item=order.items.get(), quantity=Decimal('4'))
+            shipments.append(shipment)
+
+        self.assertEqual(len(confirm_shipments(shipments, self.user)), 2)
+
+        row = Inventory.objects.get(product=self.products[0])
+        self.assertEqual((row.quantity, row.reserved), (Decimal('2'), Decimal('0')))
+        self.assertEqual(active_reserved(self.products[0]), Decimal('0'))
+        self.assertEqual(
+            set(SalesOrder.objects.filter(pk__in=[order.pk for order in orders]).values_list('status', flat=True)),
+            {'shipped'}
+        )
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    threads = 6
+    orders = 40
+
+    def test_concurrent_reservations_never_oversell(self):
+        company, user = seed_tenant()
+        _, locations = seed_warehouse(company, locations=3)
+        product = seed_products(company, 1)[0]
+        seed_stock([product] * 3, locations, quantity=Decimal('10'))
+        customer = seed_customer(company)
+        queue = [order.pk for order in seed_sales_orders(
+            company, user, customer, [product], orders=self.orders
+        )]
+
+        lock = threading.Lock()
+        results = {'reserved': 0, 'rejected': 0, 'errors': 0}
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        order_id = queue.pop()
+                    for _ in range(1000):
+                        try:
+                            reserve_order(SalesOrder.objects.get(pk=order_id))
+                            outcome = 'reserved'
+                        except ReservationError:
+                            outcome = 'rejected'
+                        except OperationalError:
+                            # SQLite allows one writer at a time
+                            time.sleep(0.01)
+                            continue
+                        break
+                    else:
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertFalse(Inventory.objects.filter(product=product, reserved__gt=F('quantity')).exists())
+        self.assertEqual(reserved_on_hand(product), active_reserved(product))
+        self.assertEqual(reserved_on_hand(product), results['reserved'])
+        self.assertEqual(results, {'reserved': 30, 'rejected': 10, 'errors': 0})
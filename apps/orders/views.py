@@ -1,8 +1,14 @@
+from django.contrib import messages
+from django.db import transaction
 from django.shortcuts import redirect
 from django.views.generic import ListView, CreateView, UpdateView, DetailView
 from django.urls import reverse_lazy
-from .models import Customer, SalesOrder, Shipment
+from apps.inventory.conditional import ConditionalDetailMixin, Fingerprint
+from .models import Customer, SalesOrder, SalesOrderItem, Shipment, ShipmentItem
 from .forms import CustomerForm, SalesOrderForm, ShipmentForm
+from .credit import CreditLimitError, check_order_credit
+from .reservations import ReservationError, allocate_order
+from .shipping import ShipmentError, confirm_shipments
 
 
 # Customer Views
@@ -44,6 +50,20 @@ class CustomerUpdateView(UpdateView):
 
 
 # Sales Order Views
+class CreditCheckedSaveMixin:
+    """Saves the order with its customer locked, repeating the credit check
+    ``SalesOrderForm.clean`` made without a lock."""
+
+    def form_valid(self, form):
+        try:
+            with transaction.atomic():
+                check_order_credit(form.instance)
+                return super().form_valid(form)
+        except CreditLimitError as exc:
+            form.add_error('status', str(exc))
+            return self.form_invalid(form)
+
+
 class SalesOrderListView(ListView):
     model = SalesOrder
     template_name = 'orders/sales_list.html'
@@ -52,7 +72,7 @@ class SalesOrderListView(ListView):
         return SalesOrder.objects.filter(company=self.request.user.company)
 
 
-class SalesOrderCreateView(CreateView):
+class SalesOrderCreateView(CreditCheckedSaveMixin, CreateView):
     model = SalesOrder
     form_class = SalesOrderForm
     template_name = 'orders/sales_form.html'
@@ -64,15 +84,19 @@ class SalesOrderCreateView(CreateView):
         return super().form_valid(form)
 
 
-class SalesOrderDetailView(DetailView):
+class SalesOrderDetailView(ConditionalDetailMixin, DetailView):
     model = SalesOrder
     template_name = 'orders/sales_detail.html'
+    conditional_related = (
+        lambda pk: Customer.objects.filter(orders=pk),
+        lambda pk: Fingerprint(SalesOrderItem.objects.filter(order_id=pk)),
+    )
 
     def get_queryset(self):
         return SalesOrder.objects.filter(company=self.request.user.company)
 
 
-class SalesOrderUpdateView(UpdateView):
+class SalesOrderUpdateView(CreditCheckedSaveMixin, UpdateView):
     model = SalesOrder
     form_class = SalesOrderForm
     template_name = 'orders/sales_form.html'
@@ -86,9 +110,19 @@ class SalesOrderProcessView(DetailView):
     model = SalesOrder
     template_name = 'orders/sales_process.html'
 
+    def get_queryset(self):
+        return SalesOrder.objects.filter(company=self.request.user.company)
+
     def post(self, request, *args, **kwargs):
         order = self.get_object()
-        # Логика обработки заказа
+
+        try:
+            reservations = allocate_order(order, request.POST.get('strategy') or None)
+        except (CreditLimitError, ReservationError, ValueError) as exc:
+            messages.error(request, str(exc))
+            return redirect('sales_detail', pk=order.pk)
+
+        messages.success(request, f'Order allocated to {len(reservations)} stock row(s)')
         return redirect('sales_detail', pk=order.pk)
 
 
@@ -113,9 +147,10 @@ class ShipmentCreateView(CreateView):
         return kwargs
 
 
-class ShipmentDetailView(DetailView):
+class ShipmentDetailView(ConditionalDetailMixin, DetailView):
     model = Shipment
     template_name = 'orders/shipment_detail.html'
+    conditional_related = (lambda pk: Fingerprint(ShipmentItem.objects.filter(shipment_id=pk)),)
 
     def get_queryset(self):
         return Shipment.objects.filter(order__company=self.request.user.company)
@@ -137,7 +172,20 @@ class ShipmentProcessView(DetailView):
     model = Shipment
     template_name = 'orders/shipment_process.html'
 
+    def get_queryset(self):
+        return Shipment.objects.filter(company=self.request.user.company)
+
     def post(self, request, *args, **kwargs):
         shipment = self.get_object()
-        # Логика обработки отгрузки
+
+        try:
+            confirmed = confirm_shipments([shipment], request.user)
+        except ShipmentError as exc:
+            messages.error(request, str(exc))
+            return redirect('shipment_detail', pk=shipment.pk)
+
+        if confirmed:
+            messages.success(request, 'Shipment confirmed')
+        else:
+            messages.warning(request, f'Shipment is already {shipment.get_status_display().lower()}')
         return redirect('shipment_detail', pk=shipment.pk)
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""Wave planning: released orders picked together in one walk.
+
+Confirmed and processing orders are grouped into waves by warehouse,
+carrier and cutoff (the order's expected shipment date); a group larger
+than ``WAVE_MAX_ORDERS`` is split, earliest cutoff first. Within a wave
+the demand of every order is consolidated per location, product and
+batch, and the resulting pick list follows the walk path: aisles in
+order, up one aisle and back down the next (shelf, then bin).
+
+Lines are picked where they were allocated (active reservations); lines
+without a reservation fall back to the item's source location and are
+reported as unplanned when they have none. The whole plan comes from two
+queries, whatever the number of orders, and is grouped in memory.
+"""
+import re
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import SalesOrderItem, StockReservation
+
+WAVE_STATUSES = ('confirmed', 'processing')
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+@lru_cache(maxsize=4096)
+def _natural(value):
+    """Sort key comparing runs of digits as numbers: aisle 2 before aisle 10."""
+    return tuple(
+        (0, int(part), '') if part.isdigit() else (1, 0, part.lower())
+        for part in _DIGITS.split(value or '') if part
+    )
+
+
+def walk_path(picks):
+    """Order ``picks`` aisle by aisle, reversing every second aisle."""
+    aisles = defaultdict(list)
+    for pick in picks:
+        aisles[pick['aisle']].append(pick)
+
+    ordered = []
+    for n, aisle in enumerate(sorted(aisles, key=_natural)):
+        stops = sorted(aisles[aisle], key=lambda pick: (
+            _natural(pick['shelf']), _natural(pick['bin']), _natural(pick['location']), pick['sku']
+        ))
+        if n % 2:
+            stops.reverse()
+        ordered.extend(stops)
+    for sequence, pick in enumerate(ordered, 1):
+        pick['sequence'] = sequence
+    return ordered
+
+
+def _wave_items(company_id, carrier=None, cutoff=None):
+    items = SalesOrderItem.objects.filter(
+        order__company_id=company_id,
+        order__status__in=WAVE_STATUSES
+    )
+    if carrier is not None:
+        items = items.filter(order__carrier=carrier)
+    if cutoff is not None:
+        items = items.filter(order__expected_shipment__lte=cutoff)
+    return items, StockReservation.objects.filter(order_item__in=items, status='active')
+
+
+def plan_waves(company_id, warehouse_ids=None, carrier=None, cutoff=None, max_orders=None):
+    """Waves and their pick lists for the company's released orders.
+
+    ``carrier`` and ``cutoff`` (orders due on or before that date) narrow
+    the orders considered; ``warehouse_ids`` the stock picked. Returns
+    ``{'waves': [...], 'unplanned': [...]}``.
+    """
+    max_orders = max_orders or getattr(settings, 'WAVE_MAX_ORDERS', 100)
+    warehouse_ids = set(map(int, warehouse_ids)) if warehouse_ids else None
+    items, reservations = _wave_items(company_id, carrier, cutoff)
+
+    # (order_id, number, carrier, cutoff, warehouse_id, warehouse, location, aisle,
+    #  shelf, bin, product_id, sku, name, batch, expiry_date, quantity)
+    lines = []
+    reserved = defaultdict(Decimal)
+    for row in reservations.values_list(
+        'order_item_id', 'order_item__order_id', 'order_item__order__order_number',
+        'order_item__order__carrier', 'order_item__order__expected_shipment',
+        'inventory__location__warehouse_id', 'inventory__location__warehouse__code',
+        'inventory__location__code', 'inventory__location__aisle', 'inventory__location__shelf',
+        'inventory__location__bin', 'inventory__product_id', 'inventory__product__sku',
+        'inventory__product__name', 'inventory__batch', 'inventory__expiry_date', 'quantity'
+    ).order_by():
+        # Reserved elsewhere still counts against the item's outstanding quantity
+        reserved[row[0]] += row[-1]
+        if warehouse_ids is None or row[5] in warehouse_ids:
+            lines.append(row[1:])
+
+    unplanned = []
+    for (item_id, order_id, number, order_carrier, order_cutoff, quantity, shipped, location_id,
+         warehouse_id, warehouse, location, aisle, shelf, bin_, product_id, sku, name) in items.values_list(
+        'pk', 'order_id', 'order__order_number', 'order__carrier', 'order__expected_shipment',
+        'quantity', 'shipped', 'location_id', 'location__warehouse_id', 'location__warehouse__code',
+        'location__code', 'location__aisle', 'location__shelf', 'location__bin',
+        'product_id', 'product__sku', 'product__name'
+    ).order_by():
+        outstanding = quantity - shipped - reserved.get(item_id, Decimal('0'))
+        if outstanding <= 0:
+            continue
+        if location_id is None:
+            unplanned.append({'order': number, 'item': item_id, 'sku': sku, 'quantity': outstanding})
+            continue
+        if warehouse_ids is not None and warehouse_id not in warehouse_ids:
+            continue
+        lines.append((
+            order_id, number, order_carrier, order_cutoff, warehouse_id, warehouse, location,
+            aisle, shelf, bin_, product_id, sku, name, '', None, outstanding
+        ))
+
+    # Group lines per warehouse/carrier/cutoff, then per order
+    groups = defaultdict(lambda: defaultdict(list))
+    for line in lines:
+        order_id, number, order_carrier, order_cutoff, warehouse_id, warehouse = line[:6]
+        groups[(order_cutoff, warehouse, warehouse_id, order_carrier)][(number, order_id)].append(line)
+
+    waves = []
+    for (order_cutoff, warehouse, warehouse_id, order_carrier), orders in sorted(
+        groups.items(),
+        key=lambda group: (group[0][0] is None, group[0][0] or 0, group[0][1], group[0][3])
+    ):
+        numbers = sorted(orders, key=lambda order: order[1])
+        for start in range(0, len(numbers), max_orders):
+            batch = numbers[start:start + max_orders]
+            picks = {}
+            for order in batch:
+                for (_, number, _, _, _, _, location, aisle, shelf, bin_,
+                     product_id, sku, name, lot, expiry_date, quantity) in orders[order]:
+                    pick = picks.get((location, product_id, lot))
+                    if pick is None:
+                        pick = picks[(location, product_id, lot)] = {
+                            'location': location, 'aisle': aisle, 'shelf': shelf, 'bin': bin_,
+                            'product': product_id, 'sku': sku, 'name': name,
+                            'batch': lot, 'expiry_date': expiry_date,
+                            'quantity': Decimal('0'), 'orders': defaultdict(Decimal),
+                        }
+                    pick['quantity'] += quantity
+                    pick['orders'][number] += quantity
+            for pick in picks.values():
+                pick['orders'] = [
+                    {'order': number, 'quantity': quantity} for number, quantity in pick['orders'].items()
+                ]
+            waves.append({
+                'warehouse': warehouse_id,
+                'warehouse_code': warehouse,
+                'carrier': order_carrier,
+                'cutoff': order_cutoff,
+                'orders': [number for number, _ in batch],
+                'order_lines': sum(len(orders[order]) for order in batch),
+                'picks': walk_path(picks.values()),
+            })
+
+    return {'waves': waves, 'unplanned': unplanned}
@@ -0,0 +1,90 @@
+"""Streaming CSV/XLSX exports for the report views.
+
+Rows are read with ``values_list().iterator()`` so no model instances
+are built and the queryset is never held in memory. CSV is streamed as
+it is produced; XLSX is written by openpyxl in write-only mode to a
+temporary file, which is then streamed back.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'tzinfo') and value.tzinfo is not None:
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def iter_rows(queryset, columns):
+    fields = [field for _, field in columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE):
+        yield [_cell(value) for value in row]
+
+
+def csv_response(queryset, columns, filename):
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow([label for label, _ in columns])
+        for row in iter_rows(queryset, columns):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(queryset, columns, filename):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise Http404('XLSX export requires openpyxl')
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append([label for label, _ in columns])
+    for row in iter_rows(queryset, columns):
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+class ExportMixin:
+    """Adds ``export_columns`` based CSV/XLSX export to a report ListView."""
+    export_columns = []
+    export_filename = 'report'
+
+    def export(self, fmt):
+        queryset = self.get_queryset().order_by('pk')
+        if fmt == 'csv':
+            return csv_response(queryset, self.export_columns, self.export_filename)
+        if fmt == 'xlsx':
+            return xlsx_response(queryset, self.export_columns, self.export_filename)
+        raise Http404(f'Unknown export format: {fmt}')
+
+    def get(self, request, *args, **kwargs):
+        if 'fmt' in kwargs:
+            return self.export(kwargs['fmt'])
+        return super().get(request, *args, **kwargs)
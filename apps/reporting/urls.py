@@ -6,8 +6,12 @@ app_name = 'reporting'
 urlpatterns = [
     path('', views.ReportListView.as_view(), name='report_list'),
     path('inventory/', views.InventoryReportView.as_view(), name='inventory_report'),
+    path('inventory/export/<str:fmt>/', views.InventoryReportView.as_view(), name='inventory_export'),
     path('sales/', views.SalesReportView.as_view(), name='sales_report'),
+    path('sales/export/<str:fmt>/', views.SalesReportView.as_view(), name='sales_export'),
     path('purchases/', views.PurchaseReportView.as_view(), name='purchase_report'),
     path('movements/', views.MovementReportView.as_view(), name='movement_report'),
+    path('movements/export/<str:fmt>/', views.MovementReportView.as_view(), name='movement_export'),
+    path('stock-as-of/', views.StockAsOfReportView.as_view(), name='stock_as_of_report'),
     path('custom/', views.CustomReportView.as_view(), name='custom_report'),
 ]
\ No newline at end of file
@@ -1,31 +1,82 @@
+from django.core.paginator import Paginator
 from django.views.generic import ListView, TemplateView
-from django.db.models import F  # Добавьте этот импорт
-from apps.inventory.models import Product, Inventory, StockMovement  # Измените импорт
+from django.db.models import Count, F, Sum  # Добавьте этот импорт
+from apps.inventory.models import Product, Inventory, StockBalance, StockMovement  # Измените импорт
+from apps.inventory.snapshots import parse_moment, stock_as_of_rows
+from apps.reporting.exports import ExportMixin
 from apps.orders.models import SalesOrder  # Измените импорт
+from django.utils import timezone
 
 class ReportListView(TemplateView):
     template_name = 'reporting/report_list.html'
 
-class InventoryReportView(ListView):
+class InventoryReportView(ExportMixin, ListView):
     template_name = 'reporting/inventory_report.html'
     model = Inventory
     context_object_name = 'inventory_items'
+    export_filename = 'inventory'
+    export_columns = [
+        ('SKU', 'product__sku'),
+        ('Product', 'product__name'),
+        ('Warehouse', 'location__warehouse__name'),
+        ('Location', 'location__name'),
+        ('Batch', 'batch'),
+        ('Expiry Date', 'expiry_date'),
+        ('Quantity', 'quantity'),
+        ('Reserved', 'reserved'),
+    ]
+
+    # The full data set is only available through the streamed export
+    paginate_by = 100
 
     def get_queryset(self):
         return self.model.objects.filter(
             location__warehouse__company=self.request.user.company
-        ).select_related('product', 'location')
+        ).select_related('product', 'location', 'location__warehouse').order_by(
+            'product__name', 'location__warehouse__name', 'location__name', 'pk'
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        balances = StockBalance.objects.filter(
+            company=self.request.user.company
+        ).select_related('product', 'warehouse').order_by('product__name', 'warehouse__name', 'pk')
+        context['balances'] = Paginator(balances, self.paginate_by).get_page(self.request.GET.get('balance_page'))
+        return context
 
-class SalesReportView(ListView):
+class SalesReportView(ExportMixin, ListView):
     template_name = 'reporting/sales_report.html'
     model = SalesOrder
     context_object_name = 'sales_orders'
+    export_filename = 'sales'
+    export_columns = [
+        ('Order Number', 'order_number'),
+        ('Customer', 'customer__name'),
+        ('Status', 'status'),
+        ('Order Date', 'order_date'),
+        ('Expected Shipment', 'expected_shipment'),
+        ('Lines', 'line_count'),
+        ('Net', 'net_total'),
+        ('Tax', 'tax_total'),
+        ('Gross', 'gross_total'),
+        ('Created At', 'created_at'),
+    ]
 
     def get_queryset(self):
         return self.model.objects.filter(
             company=self.request.user.company
         ).select_related('customer')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['totals'] = self.object_list.aggregate(
+            orders=Count('pk'),
+            net=Sum('net_total'),
+            tax=Sum('tax_total'),
+            gross=Sum('gross_total')
+        )
+        return context
+
 class PurchaseReportView(ListView):
     template_name = 'reporting/purchase_report.html'
     model = StockMovement
@@ -37,15 +88,41 @@ class PurchaseReportView(ListView):
             to_location__warehouse__company=self.request.user.company
         ).select_related('product', 'to_location')
 
-class MovementReportView(ListView):
+class MovementReportView(ExportMixin, ListView):
     template_name = 'reporting/movement_report.html'
     model = StockMovement
     context_object_name = 'movements'
+    export_filename = 'movements'
+    export_columns = [
+        ('Date', 'date'),
+        ('Type', 'movement_type'),
+        ('Reference', 'reference'),
+        ('SKU', 'product__sku'),
+        ('Product', 'product__name'),
+        ('From', 'from_location__name'),
+        ('To', 'to_location__name'),
+        ('Batch', 'batch'),
+        ('Quantity', 'quantity'),
+    ]
 
     def get_queryset(self):
+        # Outgoing movements have no to_location; scope on the movement itself
         return self.model.objects.filter(
-            to_location__warehouse__company=self.request.user.company
+            company=self.request.user.company
         ).select_related('product', 'from_location', 'to_location')
 
+class StockAsOfReportView(TemplateView):
+    template_name = 'reporting/stock_as_of_report.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            moment = parse_moment(self.request.GET.get('date', ''))
+        except ValueError:
+            moment = timezone.now()
+        context['as_of'] = moment
+        context['rows'] = stock_as_of_rows(self.request.user.company, moment)
+        return context
+
 class CustomReportView(TemplateView):
     template_name = 'reporting/custom_report.html'
\ No newline at end of file
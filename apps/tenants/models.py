@@ -128,4 +128,40 @@ class AuditLog(models.Model):
         ordering = ['-timestamp']
 
     def __str__(self):
-        return f"{self.user} - {self.get_action_display()} - {self.model}"
\ No newline at end of file
+        return f"{self.user} - {self.get_action_display()} - {self.model}"
+
+
+class DocumentSequence(models.Model):
+    """Next free number per company and document type.
+
+    Handed out in blocks by apps.tenants.numbering, so ``next_value`` is
+    the start of the next unreserved block, not the next document.
+    """
+    DOCUMENT_TYPES = (
+        ('sales_order', _('Sales Order')),
+        ('purchase_order', _('Purchase Order')),
+        ('shipment', _('Shipment')),
+        ('transfer', _('Transfer')),
+    )
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='document_sequences',
+        verbose_name=_('Company')
+    )
+    document_type = models.CharField(
+        _('Document Type'),
+        max_length=20,
+        choices=DOCUMENT_TYPES
+    )
+    next_value = models.PositiveBigIntegerField(_('Next Value'), default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Document Sequence')
+        verbose_name_plural = _('Document Sequences')
+        unique_together = ('company', 'document_type')
+
+    def __str__(self):
+        return f"{self.company} {self.get_document_type_display()}: {self.next_value}"
@@ -0,0 +1,223 @@
+"""Document numbers from per-company, per-type sequences.
+
+Each process reserves a block of ``DOCUMENT_NUMBER_BLOCK`` numbers with
+one locked UPDATE of the DocumentSequence row and then hands them out
+from memory, so a number costs a database round trip only once per
+block. Blocks never overlap, which makes duplicates impossible; numbers
+left in a block when a process exits are simply never used (gaps are
+allowed).
+
+A block must be committed on its own: if it were reserved inside a
+transaction that later rolls back, another process could reserve the
+same range. Inside ``atomic()`` the block is therefore reserved on a
+separate connection. That connection cannot see a sequence row (or a
+company) the caller has created but not committed yet; the first number
+of such a sequence is then taken in the caller's transaction, uncached.
+SQLite allows one writer at a time, so there a number requested inside a
+transaction is always taken straight from the sequence row in that
+transaction and no block is cached.
+
+Numbers are rendered with ``DOCUMENT_NUMBER_FORMATS``; ``{company}``
+(id), ``{year}`` and ``{number}`` are available. Keep ``{company}`` in
+the format: the number fields are unique across all companies.
+
+A new document may carry a number set by the caller. If it matches the
+format it must lie beyond every number the sequence has reserved, and
+the sequence then moves past it; otherwise DocumentNumberError is
+raised, as the number may already belong to a block. Numbers in any
+other shape cannot collide with allocated ones and are kept as given.
+"""
+import re
+import string
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+DEFAULT_FORMATS = {
+    'sales_order': 'SO-{company}-{number:06d}',
+    'purchase_order': 'PO-{company}-{number:06d}',
+    'shipment': 'SH-{company}-{number:06d}',
+    'transfer': 'TR-{company}-{number:06d}',
+}
+
+
+class DocumentNumberError(ValueError):
+    pass
+
+
+def _locked_sequence(company_id, document_type, create):
+    sequences = DocumentSequence.objects.select_for_update()
+    if create:
+        return sequences.get_or_create(company_id=company_id, document_type=document_type)[0]
+    return sequences.filter(company_id=company_id, document_type=document_type).first()
+
+
+def reserve_block(company_id, document_type, size, create=True):
+    """Reserve ``size`` numbers; returns ``(first, last + 1)``.
+
+    Without ``create`` a missing sequence row is not inserted and ``None``
+    is returned instead.
+    """
+    with transaction.atomic():
+        sequence = _locked_sequence(company_id, document_type, create)
+        if sequence is None:
+            return None
+        start = sequence.next_value
+        sequence.next_value = start + size
+        sequence.save(update_fields=['next_value', 'updated_at'])
+    return start, start + size
+
+
+def claim_value(company_id, document_type, value, create=True):
+    """Move the sequence past ``value``, set by hand on a new document.
+
+    Raises DocumentNumberError if ``value`` may already have been handed
+    out. Without ``create`` returns ``None`` when the row is missing.
+    """
+    with transaction.atomic():
+        sequence = _locked_sequence(company_id, document_type, create)
+        if sequence is None:
+            return None
+        if value < sequence.next_value:
+            raise DocumentNumberError(
+                f'Number {value} is already reserved for {document_type} documents; '
+                f'use {sequence.next_value} or higher, or leave it empty'
+            )
+        sequence.next_value = value + 1
+        sequence.save(update_fields=['next_value', 'updated_at'])
+    return value
+
+
+def _on_own_connection(func, *args):
+    """Run ``func`` in a worker thread, which gets its own connection and commits on its own."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['value'] = func(*args)
+        except Exception as exc:
+            outcome['error'] = exc
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+class NumberAllocator:
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.reserved_blocks = 0
+        self._blocks = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def next_value(self, company_id, document_type):
+        if document_type not in dict(DocumentSequence.DOCUMENT_TYPES):
+            raise ValueError(f'Unknown document type: {document_type}')
+
+        key = (company_id, document_type)
+        with self._key_lock(key):
+            block = self._blocks.get(key)
+            if block is not None and block[0] < block[1]:
+                value = block[0]
+                block[0] += 1
+                return value
+
+            connection = transaction.get_connection()
+            if connection.in_atomic_block and connection.vendor == 'sqlite':
+                # Rolls back with the caller; nothing cached
+                return reserve_block(company_id, document_type, 1)[0]
+            if connection.in_atomic_block:
+                block = _on_own_connection(reserve_block, company_id, document_type, self.block_size, False)
+                if block is None:
+                    # The sequence is only visible to the caller's transaction so far
+                    return reserve_block(company_id, document_type, 1)[0]
+                start, end = block
+            else:
+                start, end = reserve_block(company_id, document_type, self.block_size)
+            self.reserved_blocks += 1
+            self._blocks[key] = [start + 1, end]
+            return start
+
+    def claim(self, company_id, document_type, value):
+        """``claim_value`` on the connection ``next_value`` would use for a block."""
+        with self._key_lock((company_id, document_type)):
+            connection = transaction.get_connection()
+            if connection.in_atomic_block and connection.vendor != 'sqlite':
+                if _on_own_connection(claim_value, company_id, document_type, value, False) is not None:
+                    return value
+            return claim_value(company_id, document_type, value)
+
+    def next_number(self, company_id, document_type):
+        return _formats()[document_type].format(
+            company=company_id,
+            year=timezone.localdate().year,
+            number=self.next_value(company_id, document_type)
+        )
+
+    def clear(self):
+        """Forget cached blocks; their remaining numbers become gaps."""
+        with self._lock:
+            self._blocks.clear()
+            self.reserved_blocks = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'block_size': self.block_size,
+                'reserved_blocks': self.reserved_blocks,
+                'cached': {
+                    f'{company_id}:{document_type}': end - start
+                    for (company_id, document_type), (start, end) in self._blocks.items()
+                },
+            }
+
+
+document_numbers = NumberAllocator(getattr(settings, 'DOCUMENT_NUMBER_BLOCK', 100))
+
+
+def _formats():
+    return getattr(settings, 'DOCUMENT_NUMBER_FORMATS', None) or DEFAULT_FORMATS
+
+
+def parse_number(document_type, number, company_id):
+    """The sequence value behind ``number``, or ``None`` if it is not in this company's format."""
+    pattern = []
+    for literal, name, _, _ in string.Formatter().parse(_formats()[document_type]):
+        pattern.append(re.escape(literal))
+        if name == 'company':
+            pattern.append(re.escape(str(company_id)))
+        elif name == 'year':
+            pattern.append(r'\d{4}')
+        elif name == 'number':
+            pattern.append(r'(?P<number>\d+)')
+    match = re.fullmatch(''.join(pattern), number)
+    return int(match.group('number')) if match and 'number' in match.groupdict() else None
+
+
+def assign_number(instance, field, document_type, company_id):
+    """Fill ``instance.<field>`` with the next number unless the caller set one.
+
+    A number the caller set on a new document is checked against the
+    sequence (see the module docstring).
+    """
+    number = getattr(instance, field)
+    if not number:
+        setattr(instance, field, document_numbers.next_number(company_id, document_type))
+    elif instance._state.adding:
+        value = parse_number(document_type, number, company_id)
+        if value is not None:
+            document_numbers.claim(company_id, document_type, value)
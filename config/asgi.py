@@ -0,0 +1,12 @@
+"""ASGI entry point, e.g. ``uvicorn config.asgi:application --workers 2``.
+
+Async views (apps.api.async_views) run on the event loop; sync views and
+middleware keep working through Django's thread adapter.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
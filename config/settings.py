@@ -67,6 +67,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 DATABASES = {
@@ -134,11 +135,43 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
         'rest_framework.filters.SearchFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.api.pagination.HybridPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
 }
 
+# Barcode/SKU scan lookups: max cached codes per process
+SCAN_CACHE_SIZE = 10000
+
+# Stock snapshots (day, week or month)
+STOCK_SNAPSHOT_PERIOD = 'month'
+
+# Sales order allocation: 'fefo' (earliest expiry first) or 'fifo' (receipt order)
+ALLOCATION_STRATEGY = 'fefo'
+
+# Wave planning: max orders per wave before a warehouse/carrier/cutoff group is split
+WAVE_MAX_ORDERS = 100
+
+# Available-to-promise timelines cached per product (entries, seconds)
+ATP_CACHE_SIZE = 10000
+ATP_CACHE_TTL = 300
+
+# Document numbers: blocks reserved per process and formats per document type
+# ({company} id, {year}, {number}); see apps.tenants.numbering
+DOCUMENT_NUMBER_BLOCK = 100
+DOCUMENT_NUMBER_FORMATS = {
+    'sales_order': 'SO-{company}-{number:06d}',
+    'purchase_order': 'PO-{company}-{number:06d}',
+    'shipment': 'SH-{company}-{number:06d}',
+    'transfer': 'TR-{company}-{number:06d}',
+}
+
+# API bulk endpoints: max items per request
+BULK_MAX_ITEMS = 5000
+
+# Change feed: days of ChangeLog kept by prune_change_log; older checkpoints need a full download
+CHANGE_LOG_RETENTION_DAYS = 30
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'smtp.example.com'